@@ -0,0 +1,86 @@
+"""
+Bounded LRU cache of resized country flags and club badges
+ذاكرة مؤقتة محدودة لأعلام الدول وشعارات الأندية بعد تغيير حجمها
+"""
+
+import threading
+from collections import OrderedDict
+
+# default memory cap for the decoded RGBA images held by the cache
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def image_nbytes(img):
+    """Approximate memory held by a decoded image"""
+    return img.width * img.height * len(img.getbands())
+
+
+class AssetCache:
+    """
+    Least recently used cache of ready to paste RGBA assets, bounded by total image memory
+
+    Cached images are shared between renders and must only ever be used as a paste source.
+    sizeof gives the memory held by a cached value, for caches of something else than images.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, sizeof=image_nbytes):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, loader):
+        """
+        Return the image cached under key, calling loader() to build it on a miss
+
+        Exceptions raised by loader are passed through and nothing is cached.
+        """
+        with self._lock:
+            img = self._images.get(key)
+            if img is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return img
+            self.misses += 1
+
+        # build outside the lock so a slow load doesn't block other renders
+        img = loader()
+        nbytes = self.sizeof(img)
+
+        with self._lock:
+            if key in self._images or nbytes > self.max_bytes:
+                return img
+            self._images[key] = img
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, evicted_img = self._images.popitem(last=False)
+                self.current_bytes -= self.sizeof(evicted_img)
+                self.evictions += 1
+        return img
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Return the cache counters as a dict"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._images),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+# cache shared by every render in the process
+flag_and_badge_cache = AssetCache()
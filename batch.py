@@ -0,0 +1,301 @@
+"""
+Render many cards at once on a pool of worker processes
+إنشاء عدد كبير من البطاقات دفعة واحدة باستخدام عدة عمليات
+
+Usage:
+    python batch.py players.csv
+    python batch.py players.json --workers 4 --card-code RARE_GOLD
+    python batch.py players.csv --output web
+    python batch.py players.csv --renditions none
+
+Input rows use the same fields as the /api/create-card endpoint (name, position, club, country,
+overall, pac, dri, sho, def, pas, phy, cardType) plus the optional id, language, image
+(local path or URL) and dynamic fields. CSV files need a header row; JSON files may hold a list
+of objects or one object per line.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from card_templates import warm_up_card_templates
+from cardcreator import render_card
+from database import add_cards_to_database, card_metadata, write_card_metadata
+from image_fetcher import prefetch_images_sync
+from job_ids import new_job_id
+from output_encoder import OUTPUT_PRESETS, get_output_options
+from render_metrics import collect_timings, record
+from renditions import RENDITION_WIDTHS, parse_rendition_widths
+from resources.player import Player
+
+# number of renders queued per worker process, keeps memory flat for very large inputs
+IN_FLIGHT_PER_WORKER = 4
+# rendered cards written to the database at once by render_batch
+INDEX_BATCH_SIZE = 100
+# how worker processes are started: 'forkserver' where available, else 'spawn' (never a plain fork, see create_render_pool)
+RENDER_START_METHOD = os.environ.get('RENDER_START_METHOD',
+                                     'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+# a line of a JSON lines file that isn't valid JSON; line_number counts every line of the file from 1
+InvalidLine = namedtuple('InvalidLine', 'line_number text error')
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def read_players(path, on_invalid_line=None):
+    """
+    Yield player rows (dicts) one at a time from a CSV or JSON / JSON lines file
+
+    A JSON line that can't be parsed is skipped and passed to on_invalid_line as an InvalidLine (printed
+    without on_invalid_line), so one bad line doesn't end the file.
+    """
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+        return
+
+    with open(path, encoding='utf-8') as f:
+        first_char = f.read(1)
+        f.seek(0)
+        if first_char == '[':
+            yield from json.load(f)
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    invalid_line = InvalidLine(line_number, line.rstrip('\r\n'), str(e))
+                    if on_invalid_line is None:
+                        print(f"❌ line {line_number}: Invalid JSON: {e}", file=sys.stderr)
+                    else:
+                        on_invalid_line(invalid_line)
+                    continue
+                yield row
+
+
+def player_from_row(row):
+    """Build a Player from an input row"""
+    return Player(
+        name=str(row['name']).upper(),
+        pos=row['position'],
+        club=str(row['club']),
+        country=row['country'],
+        overall=int(row['overall']),
+        pac=int(row['pac']),
+        dri=int(row['dri']),
+        sho=int(row['sho']),
+        deff=int(row['def']),
+        pas=int(row['pas']),
+        phy=int(row['phy']),
+        language=(row.get('language') or 'EN').upper()
+    )
+
+
+def is_truthy(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def render_row(index, row, status_id, default_card_code=None, output_options=None, rendition_widths=RENDITION_WIDTHS):
+    """
+    Render a single row, returning a result dict instead of raising so one bad card can't abort a batch
+
+    Runs inside the worker processes; card templates and asset caches are per process.
+    """
+    start = time.perf_counter()
+    result = {'index': index, 'id': status_id}
+    try:
+        card_code = row.get('cardType') or default_card_code
+        if not card_code:
+            raise ValueError('Missing required field: cardType')
+        with collect_timings() as result['timings']:
+            output_path = render_card(
+                player=player_from_row(row),
+                card_code=card_code,
+                player_image_url=row.get('image') or None,
+                dynamic_img_fl=is_truthy(row.get('dynamic', False)),
+                status_id=status_id,
+                output_options=output_options,
+                rendition_widths=rendition_widths
+            )
+        result.update({'success': True, 'path': output_path, 'filename': os.path.basename(output_path)})
+    except KeyError as e:
+        result.update({'success': False, 'error': f'Missing required field: {e.args[0]}'})
+    except Exception as e:
+        result.update({'success': False, 'error': str(e)})
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def init_worker():
+    """Load every card template once when a worker process starts"""
+    warm_up_card_templates()
+
+
+def create_render_pool(max_workers=None):
+    """
+    Create a process pool sized to the number of cores (or max_workers)
+
+    Workers are started with RENDER_START_METHOD rather than forked from the caller: the web server
+    starts them lazily from request threads, and a child forked while another thread holds a lock
+    (metrics, asset caches) would inherit it locked and deadlock.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), initializer=init_worker,
+                               mp_context=multiprocessing.get_context(RENDER_START_METHOD))
+
+
+def get_render_pool():
+    """Return the process wide render pool, creating it on first use"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = create_render_pool()
+        return _render_pool
+
+
+def is_url(value):
+    return isinstance(value, str) and value.lower().startswith(('http://', 'https://'))
+
+
+def render_batch(rows, pool, id_prefix=None, default_card_code=None, max_in_flight=None, prefetch=True,
+                 output_options=None, rendition_widths=RENDITION_WIDTHS, save_metadata=True):
+    """
+    Render rows on a process pool and yield result dicts in completion order
+
+    Only a few rows per worker are submitted at a time, so rows may be a lazy iterator over a huge file.
+    Each rendered card gets its metadata file and database entry from this (the parent) process, the
+    entries written INDEX_BATCH_SIZE at a time, so card listings see batch cards like web ones.
+
+    Args:
+        rows: Iterable of input rows (dicts)
+        pool (concurrent.futures.Executor): Pool to render on (or a render_pool.BoundedRenderPool view)
+        id_prefix (str): Prefix of generated card ids for rows without an id
+        default_card_code (str): Card code for rows without a cardType
+        max_in_flight (int): Maximum number of submitted but unfinished rows
+        prefetch (bool): Download the image URLs of each group of rows concurrently into the image
+                         cache before submitting them, so workers read them from disk
+        output_options: Output format of every card (see cardcreator.render_card)
+        rendition_widths: Widths of the smaller renditions written next to each card, () for none
+        save_metadata (bool): Write the metadata file and database entry of each rendered card
+
+    Yields:
+        dict: index, id, success, path/filename or error, and render seconds for each row
+    """
+    if id_prefix is None:
+        id_prefix = new_job_id('batch')
+
+    if max_in_flight is None:
+        max_in_flight = (os.cpu_count() or 1) * IN_FLIGHT_PER_WORKER
+    rows = iter(enumerate(rows))
+    in_flight = set()
+    # rows being rendered by index, and rendered cards not written to the database yet
+    pending_rows = {}
+    index_entries = []
+
+    try:
+        while True:
+            new_rows = list(itertools.islice(rows, max_in_flight - len(in_flight)))
+
+            if prefetch:
+                urls = [row.get('image') for _, row in new_rows if isinstance(row, dict) and is_url(row.get('image'))]
+                if urls:
+                    prefetch_images_sync(urls)
+
+            for index, row in new_rows:
+                status_id = (row.get('id') if isinstance(row, dict) else None) or f'{id_prefix}_{index}'
+                in_flight.add(pool.submit(render_row, index, row, status_id, default_card_code, output_options,
+                                          rendition_widths))
+                pending_rows[index] = row
+
+            if not in_flight:
+                return
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                timings = result.pop('timings', ())
+                # renders in other processes reach this process's metrics only through their results
+                if isinstance(getattr(pool, 'executor', pool), ProcessPoolExecutor):
+                    for timing in timings:
+                        record(timing)
+                row = pending_rows.pop(result['index'])
+                if save_metadata and result['success']:
+                    try:
+                        index_entries.append((result['id'], save_row_metadata(row, result, default_card_code)))
+                    except Exception as e:
+                        print(f"Warning: Could not save metadata of {result['id']}: {e}")
+                    if len(index_entries) >= INDEX_BATCH_SIZE:
+                        add_cards_to_database(index_entries)
+                        index_entries.clear()
+                yield result
+    finally:
+        add_cards_to_database(index_entries)
+
+
+def save_row_metadata(row, result, default_card_code=None):
+    """Write the metadata file of a rendered row next to its card and return the metadata"""
+    metadata = card_metadata(dict(row, cardType=row.get('cardType') or default_card_code), result['path'],
+                             bool(row.get('image')))
+    write_card_metadata(result['path'], metadata)
+    return metadata
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render FUT cards for every player in a CSV or JSON file')
+    parser.add_argument('input', help='CSV or JSON / JSON lines file of players')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: all cores)')
+    parser.add_argument('--card-code', default=None, help='card code for rows without a cardType')
+    parser.add_argument('--id-prefix', default=None, help='prefix for the ids of rows without an id')
+    parser.add_argument('--no-prefetch', action='store_true', help="don't download image URLs ahead of rendering")
+    parser.add_argument('--output', default=None,
+                        help=f"output preset or format ({', '.join(OUTPUT_PRESETS)}, png, webp, jpeg, avif)")
+    parser.add_argument('--renditions', default='all',
+                        help=f"comma separated widths of the smaller renditions written next to each card "
+                             f"({', '.join(str(width) for width in RENDITION_WIDTHS)}), all or none (default: all)")
+    args = parser.parse_args(argv)
+
+    try:
+        output_options = get_output_options(args.output)
+        rendition_widths = parse_rendition_widths(args.renditions)
+    except ValueError as e:
+        parser.error(str(e))
+
+    workers = args.workers or os.cpu_count()
+    max_in_flight = workers * IN_FLIGHT_PER_WORKER
+    rendered = failed = 0
+    start = time.perf_counter()
+
+    def on_invalid_line(invalid_line):
+        nonlocal failed
+        failed += 1
+        print(f"❌ line {invalid_line.line_number}: Invalid JSON: {invalid_line.error}", file=sys.stderr)
+
+    with create_render_pool(workers) as pool:
+        for result in render_batch(read_players(args.input, on_invalid_line), pool, args.id_prefix, args.card_code, max_in_flight,
+                                   not args.no_prefetch, output_options, rendition_widths):
+            if result['success']:
+                rendered += 1
+                print(f"✅ {result['id']}: {result['path']}")
+            else:
+                failed += 1
+                print(f"❌ {result['id']} (row {result['index']}): {result['error']}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    total = rendered + failed
+    print(f'Rendered {rendered}/{total} cards in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.1f} cards/sec), '
+          f'{failed} failed')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Concurrency stress run: hundreds of parallel renders through render_card and /api/create-card
+
+Checks that every job gets its own id, that every card and metadata file is complete and valid,
+and that no partial file is left behind. Cards, the render cache and the databases are written to a
+temporary directory, removed afterwards. Exits with status 1 on any failure.
+
+Run from the repository root:
+    python -m benchmarks.concurrency_stress
+    python -m benchmarks.concurrency_stress --jobs 500 --threads 64
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+import cardcreator
+import database
+import web_server
+from cardcreator import render_card
+from job_ids import PARTIAL_SUFFIX, new_job_id
+from render_cache import DiskLRUCache
+from resources.player import Player
+
+CARD_CODES = ('RARE_GOLD', 'TOTY', 'RARE_UCL', 'IF_GOLD')
+
+
+def render_direct(index):
+    status_id = new_job_id('stress')
+    player = Player(f'PLAYER {index}', 'ST', '1', 'eg', overall=index % 100)
+    # bypass the render cache so every job really draws and writes its card
+    path = render_card(player, CARD_CODES[index % len(CARD_CODES)], None, False, status_id, use_render_cache=False)
+    return status_id, path
+
+
+def render_web(index):
+    client = web_server.app.test_client()
+    response = client.post('/api/create-card?mode=url', json={
+        'name': f'WEB {index}', 'position': 'CM', 'club': '10', 'country': 'eg',
+        'overall': index % 100, 'pac': 80, 'dri': 80, 'sho': 80, 'def': 80, 'pas': 80, 'phy': 80,
+        'cardType': CARD_CODES[index % len(CARD_CODES)]
+    })
+    body = response.get_json()
+    if response.status_code != 200:
+        raise RuntimeError(body.get('error'))
+    return os.path.splitext(body['filename'])[0], body['path']
+
+
+def check_card(path):
+    with Image.open(path) as img:
+        img.load()
+
+
+def partial_files():
+    """Partial files in the output directories"""
+    files = set()
+    for directory in {cardcreator.OUTPUT_DIR, web_server.OUTPUT_DIR}:
+        if os.path.isdir(directory):
+            files.update(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(PARTIAL_SUFFIX))
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render many cards in parallel and check for collisions')
+    parser.add_argument('--jobs', type=int, default=300, help='renders per entry point')
+    parser.add_argument('--threads', type=int, default=32)
+    args = parser.parse_args()
+
+    # cards, metadata, the render cache and both databases all go to a temporary directory
+    tmp_dir = tempfile.mkdtemp()
+    saved = (cardcreator.OUTPUT_DIR, cardcreator.render_cache, web_server.OUTPUT_DIR, database.DATABASE_FILE,
+             database.SQLITE_DATABASE_FILE)
+    cardcreator.OUTPUT_DIR = web_server.OUTPUT_DIR = os.path.join(tmp_dir, 'finished-fut-cards')
+    cardcreator.render_cache = DiskLRUCache(os.path.join(tmp_dir, 'render-cache'))
+    database.DATABASE_FILE = os.path.join(tmp_dir, 'cards_database.json')
+    database.SQLITE_DATABASE_FILE = os.path.join(tmp_dir, 'cards_database.sqlite3')
+    try:
+        failures, outputs, elapsed = stress(args.jobs, args.threads)
+    finally:
+        (cardcreator.OUTPUT_DIR, cardcreator.render_cache, web_server.OUTPUT_DIR, database.DATABASE_FILE,
+         database.SQLITE_DATABASE_FILE) = saved
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    ids = [status_id for status_id, _ in outputs]
+    print(f'{len(outputs)} renders on {args.threads} threads in {elapsed:.1f}s '
+          f'({len(outputs) / elapsed:.1f} cards/sec), {len(set(ids))} unique ids')
+    for failure in failures[:20]:
+        print(f'❌ {failure}')
+    if failures:
+        return 1
+    print('✅ no collisions, every card and metadata file is complete')
+    return 0
+
+
+def stress(jobs, threads):
+    """Run the renders and checks, returning (failures, (status id, path) of each render, seconds)"""
+    failures = []
+    outputs = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [executor.submit(render_direct, i) for i in range(jobs)]
+        futures += [executor.submit(render_web, i) for i in range(jobs)]
+        for future in futures:
+            try:
+                outputs.append(future.result())
+            except Exception as e:
+                failures.append(f'render failed: {e}')
+    elapsed = time.perf_counter() - start
+
+    ids = [status_id for status_id, _ in outputs]
+    if len(set(ids)) != len(ids):
+        failures.append(f'{len(ids) - len(set(ids))} duplicate job ids')
+
+    for status_id, path in outputs:
+        try:
+            check_card(path)
+        except Exception as e:
+            failures.append(f'{path} is not a valid card: {e}')
+
+    web_ids = [status_id for status_id, _ in outputs if status_id.startswith('web_')]
+    stored_ids = {card['id'] for card in database.get_all_cards()}
+    missing = [status_id for status_id in web_ids if status_id not in stored_ids]
+    if missing:
+        failures.append(f'{len(missing)} web cards missing from the database')
+    for status_id in web_ids:
+        metadata_path = os.path.join(web_server.OUTPUT_DIR, f'{status_id}_metadata.json')
+        try:
+            with open(metadata_path, encoding='utf-8') as f:
+                json.load(f)
+        except Exception as e:
+            failures.append(f'{metadata_path} is not valid: {e}')
+
+    left_behind = partial_files()
+    if left_behind:
+        failures.append(f'{len(left_behind)} partial files left behind')
+    return failures, outputs, elapsed
+
+
+if __name__ == '__main__':
+    sys.exit(main())
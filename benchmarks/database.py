@@ -0,0 +1,115 @@
+"""
+Benchmark of the card database operations with the JSON and SQLite backends
+
+Run from the repository root:
+    python -m benchmarks.database
+    python -m benchmarks.database --sizes 10000 --backends sqlite
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import database
+from sqlite_store import SqliteCardStore
+
+DEFAULT_SIZES = (10000, 1000000)
+BACKENDS = ('json', 'sqlite')
+POSITIONS = ('GK', 'LB', 'CB', 'RB', 'CDM', 'CM', 'CAM', 'LW', 'RW', 'ST')
+CARD_TYPES = ('RARE_GOLD', 'TOTY', 'IF_GOLD', 'COMMON_SILVER', 'RARE_UCL')
+
+
+def make_card_entry(index, rng):
+    return database.build_card_entry(f'bench_{index}', {
+        'name': f'PLAYER {index}',
+        'position': rng.choice(POSITIONS),
+        'overall': rng.randint(45, 99),
+        'pac': rng.randint(30, 99),
+        'sho': rng.randint(30, 99),
+        'pas': rng.randint(30, 99),
+        'dri': rng.randint(30, 99),
+        'def': rng.randint(30, 99),
+        'phy': rng.randint(30, 99),
+        'club': str(rng.randint(1, 2000)),
+        'country': 'eg',
+        'cardType': rng.choice(CARD_TYPES),
+        'filename': f'bench_{index}.png',
+        'hasImage': False
+    })
+
+
+def populate(backend, size, tmp_dir):
+    """Fill a fresh database of the given backend with size synthetic cards"""
+    rng = random.Random(size)
+    entries = (make_card_entry(i, rng) for i in range(size))
+
+    if backend == 'json':
+        database.DATABASE_FILE = os.path.join(tmp_dir, f'cards_{size}.json')
+        with open(database.DATABASE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'cards': list(entries)}, f, indent=2, ensure_ascii=False)
+    else:
+        database.SQLITE_DATABASE_FILE = os.path.join(tmp_dir, f'cards_{size}.sqlite3')
+        store = SqliteCardStore(database.SQLITE_DATABASE_FILE)
+        store.put_many(entries)
+        store.close()
+    database.DATABASE_BACKEND = backend
+
+
+def timed(func, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats
+
+
+def benchmark(backend, size, tmp_dir):
+    start = time.perf_counter()
+    populate(backend, size, tmp_dir)
+    populate_s = time.perf_counter() - start
+
+    # the slow JSON operations at large sizes are only run a couple of times
+    repeats = 3 if backend == 'json' and size > 100000 else 50
+    rng = random.Random(0)
+    next_id = [size]
+
+    def add_new():
+        database.add_card_to_database(f'bench_{next_id[0]}', make_card_entry(next_id[0], rng))
+        next_id[0] += 1
+
+    results = {
+        'populate': populate_s,
+        'add (new id)': timed(add_new, repeats),
+        'add (existing id)': timed(lambda: database.add_card_to_database('bench_0', make_card_entry(0, rng)),
+                                   repeats),
+        'get_card_by_id': timed(lambda: database.get_card_by_id(f'bench_{rng.randrange(size)}'), repeats),
+        'get_random_cards(6)': timed(lambda: database.get_random_cards(6), repeats),
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the card database backends')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='comma separated database sizes')
+    parser.add_argument('--backends', default=','.join(BACKENDS), help='comma separated backends')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for size in (int(size) for size in args.sizes.split(',')):
+            for backend in args.backends.split(','):
+                results = benchmark(backend, size, tmp_dir)
+                print(f'{backend} backend, {size} cards:')
+                for operation, seconds in results.items():
+                    unit, value = ('s', seconds) if seconds >= 1 else ('ms', seconds * 1000)
+                    print(f'    {operation:<20} {value:>10.3f} {unit}')
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Encode time versus file size of every output preset, on cards with and without a player image
+
+Run from the repository root:
+    python -m benchmarks.encode
+    python -m benchmarks.encode --card-codes RARE_GOLD,TOTY --repeats 10
+"""
+
+import argparse
+import time
+from io import BytesIO
+
+from benchmarks.stamp_player_image import make_synthetic_player_image
+from cardcreator import render_card_image
+from output_encoder import OUTPUT_PRESETS, get_output_options
+from resources.player import Player
+
+DEFAULT_CARD_CODES = ('RARE_GOLD', 'TOTY', 'RARE_UCL')
+REPEATS = 5
+
+
+def make_cards(card_codes):
+    buffer = BytesIO()
+    make_synthetic_player_image((600, 800)).save(buffer, 'PNG')
+    player_image = buffer.getvalue()
+    player = Player('BENCH', 'ST', '10', 'eg', overall=90)
+    cards = []
+    for card_code in card_codes:
+        cards.append((f'{card_code} plain', render_card_image(player, card_code, None, False)))
+        cards.append((f'{card_code} image', render_card_image(player, card_code, player_image, False)))
+    return cards
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the encode time and size of the output presets')
+    parser.add_argument('--card-codes', default=','.join(DEFAULT_CARD_CODES))
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    args = parser.parse_args()
+
+    cards = make_cards(args.card_codes.split(','))
+    default_total_kb = None
+
+    print(f'{"preset":<10} {"format":<6} {"encode ms":>10} {"size KB":>9} {"vs default":>11}')
+    for preset in OUTPUT_PRESETS:
+        options = get_output_options(preset)
+        seconds = 0.0
+        total_bytes = 0
+        for _, card_img in cards:
+            best = None
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                card_bytes = options.encode(card_img)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            seconds += best
+            total_bytes += len(card_bytes)
+
+        encode_ms = seconds / len(cards) * 1000
+        size_kb = total_bytes / len(cards) / 1024
+        if default_total_kb is None:
+            default_total_kb = size_kb
+        print(f'{preset:<10} {options.format:<6} {encode_ms:>10.1f} {size_kb:>9.1f} '
+              f'{size_kb / default_total_kb:>10.0%}')
+
+
+if __name__ == '__main__':
+    main()
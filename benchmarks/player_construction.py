@@ -0,0 +1,75 @@
+"""
+Micro-benchmark of Player construction, as done by batch imports for every row
+
+Compares the current Player (cached Position enums, __slots__) with the previous constructor,
+which built a new Position enum on every call (twice for English positions in other languages).
+The previous constructor is only timed on --legacy-count players, it is far slower.
+
+Run from the repository root:
+    python -m benchmarks.player_construction
+    python -m benchmarks.player_construction --count 200000 --legacy-count 5000
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from enum import Enum
+
+from resources.en_position import EnPosition
+from resources.languages_dictionary import languages_dict
+from resources.player import Player
+
+DEFAULT_COUNT = 1_000_000
+DEFAULT_LEGACY_COUNT = 20_000
+# (position, language): a native position, and English positions translated to other languages
+ROWS = (('ST', 'EN'), ('CB', 'EN'), ('GK', 'EN'), ('BU', 'FR'), ('ST', 'FR'), ('CAM', 'DE'), ('POR', 'ES'))
+
+
+def legacy_position(pos, language):
+    """Position lookup of the previous Player constructor"""
+    try:
+        position = Enum('Position', languages_dict.get(language).get('positions'))
+        return position[pos.upper()]
+    except KeyError:
+        en_position = EnPosition[pos.upper()]
+        position = Enum('Position', languages_dict.get(language).get('positions'))
+        return position[languages_dict.get(language).get('positions')[en_position.value - 1]]
+
+
+def time_players(build, count):
+    """Build count players, returns seconds per player"""
+    rows = [ROWS[i % len(ROWS)] for i in range(count)]
+    start = time.perf_counter()
+    for i, (pos, language) in enumerate(rows):
+        build(f'PLAYER {i}', pos, language)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the construction of many Player objects')
+    parser.add_argument('--count', type=int, default=DEFAULT_COUNT)
+    parser.add_argument('--legacy-count', type=int, default=DEFAULT_LEGACY_COUNT)
+    args = parser.parse_args()
+
+    def build(name, pos, language):
+        return Player(name, pos, '10', 'eg', overall=90, pac=91, dri=88, sho=85, deff=40, pas=80, phy=77,
+                      language=language)
+
+    current = time_players(build, args.count)
+    legacy = time_players(lambda name, pos, language: legacy_position(pos, language), args.legacy_count)
+
+    tracemalloc.start()
+    players = [build('PLAYER', pos, language) for pos, language in ROWS * 1000]
+    size = tracemalloc.get_traced_memory()[0] / len(players)
+    tracemalloc.stop()
+
+    print(f'Player: {args.count:,} players in {current * args.count:.2f}s ({current * 1e6:.2f} µs each), '
+          f'about {size:.0f} bytes each')
+    print(f'previous Position lookup alone: {legacy * 1e6:.2f} µs per player '
+          f'({legacy * args.count:.1f}s for {args.count:,})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Per-stage time and memory of the player image pipeline, downscale-first versus high quality
+
+Run from the repository root:
+    python -m benchmarks.player_image_pipeline
+"""
+
+from io import BytesIO
+
+from benchmarks.stamp_player_image import RESOLUTIONS, make_synthetic_player_image
+from player_image import prepare_player_image
+
+
+def encode(img, image_format):
+    buffer = BytesIO()
+    img.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def run_pipeline(encoded_img, high_quality):
+    stage_report = []
+    prepare_player_image(BytesIO(encoded_img), high_quality=high_quality, stage_report=stage_report)
+    return stage_report
+
+
+def main():
+    for megapixels, size in RESOLUTIONS.items():
+        upload_img = make_synthetic_player_image(size)
+
+        for image_format in ('JPEG', 'PNG'):
+            encoded_img = encode(upload_img, image_format)
+
+            for high_quality in (False, True):
+                mode = 'high quality' if high_quality else 'downscale first'
+                stage_report = run_pipeline(encoded_img, high_quality)
+                total_ms = sum(stage['seconds'] for stage in stage_report) * 1000
+                peak_mb = max(stage['bytes'] for stage in stage_report) / 1024 / 1024
+
+                print(f'{megapixels} MP {image_format} ({mode}): {total_ms:.1f} ms total, '
+                      f'largest working image {peak_mb:.1f} MB')
+                for stage in stage_report:
+                    width, height = stage['size']
+                    print(f'    {stage["stage"]:<8} {stage["seconds"] * 1000:>8.1f} ms  '
+                          f'{width:>5}x{height:<5} {stage["bytes"] / 1024 / 1024:>7.2f} MB')
+            print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark for stamp_player_image background keying at different upload sizes
+
+Run from the repository root:
+    python -m benchmarks.stamp_player_image
+"""
+
+import os
+import random
+import tempfile
+import time
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from cardcreator import stamp_player_image
+from keying import key_out_white_background
+from resources.cardcode_to_card import cardcode_to_card
+
+# megapixels -> (width, height) with a portrait 3:4 aspect ratio like phone uploads
+RESOLUTIONS = {
+    0.5: (612, 816),
+    2: (1224, 1632),
+    12: (3000, 4000),
+}
+
+REPEATS = 3
+
+
+def make_synthetic_player_image(size, seed=0):
+    """A white background with random coloured shapes and a soft grey gradient near the edges"""
+    rng = random.Random(seed)
+    img = Image.new('RGB', size, (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    width, height = size
+    for _ in range(40):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(1, width // 3), y0 + rng.randrange(1, height // 3)
+        colour = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x0, y0, x1, y1), fill=colour)
+    # near-white shades exercise the soft (partially transparent) threshold band
+    for i in range(0, 60, 2):
+        draw.rectangle((i, i, width - i, i + 1), fill=(255 - i // 2, 255 - i // 3, 255 - i // 4))
+    return img
+
+
+def legacy_key_out_white_background(player_img):
+    """The per-pixel loop stamp_player_image used before, kept as the reference implementation"""
+    new_data = []
+    for r, g, b, a in player_img.getdata():
+        white_distance = abs(r - 255) + abs(g - 255) + abs(b - 255)
+        if white_distance < 30:
+            new_data.append((255, 255, 255, 0))
+        elif white_distance < 60:
+            new_data.append((r, g, b, int((white_distance / 60) * 255)))
+        else:
+            new_data.append((r, g, b, a))
+    keyed_img = player_img.copy()
+    keyed_img.putdata(new_data)
+    return keyed_img
+
+
+def best_of(func, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    card_obj = cardcode_to_card['RARE_GOLD']
+    card_size = Image.open(card_obj.background_image_dir).size
+
+    print(f'{"MP":>5} {"size":>11} {"legacy key (ms)":>16} {"vectorized key (ms)":>20} {"speedup":>8} '
+          f'{"stamp_player_image (ms)":>24} {"identical":>10}')
+
+    tmp_dir = tempfile.mkdtemp()
+
+    for megapixels, size in RESOLUTIONS.items():
+        upload_img = make_synthetic_player_image(size)
+        upload_path = os.path.join(tmp_dir, f'{megapixels}mp.png')
+        upload_img.save(upload_path)
+        player_img = upload_img.convert('RGBA').filter(ImageFilter.SMOOTH_MORE)
+
+        legacy_s = best_of(lambda: legacy_key_out_white_background(player_img), repeats=1)
+        vectorized_s = best_of(lambda: key_out_white_background(player_img))
+        identical = (legacy_key_out_white_background(player_img).tobytes() ==
+                     key_out_white_background(player_img).tobytes())
+
+        def stamp():
+            card_bg_img = Image.new('RGBA', card_size)
+            stamp_player_image(card_bg_img, card_obj, upload_path)
+
+        stamp_s = best_of(stamp)
+
+        print(f'{megapixels:>5} {size[0]:>5}x{size[1]:<5} {legacy_s * 1000:>16.1f} {vectorized_s * 1000:>20.1f} '
+              f'{legacy_s / vectorized_s:>7.1f}x {stamp_s * 1000:>24.1f} {str(identical):>10}')
+
+        os.remove(upload_path)
+    os.rmdir(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
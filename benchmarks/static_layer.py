@@ -0,0 +1,77 @@
+"""
+Per-card drawing time with the cached static layer versus drawing the labels and lines on every card
+
+Both variants produce the same card; the live one copies the bare background and runs every
+operation of the draw plan, the cached one copies the static layer and only draws the player's
+fields. The full render_card_image time (with the static layer) is shown for scale.
+
+Run from the repository root:
+    python -m benchmarks.static_layer
+    python -m benchmarks.static_layer --card-codes RARE_GOLD,RARE_UCL --languages EN,FR --repeats 200
+"""
+
+import argparse
+import time
+
+from card_layout import get_draw_plan, new_card_canvas, run_draw_ops
+from card_templates import get_card_template
+from cardcreator import render_card_image
+from resources.player import Player
+
+DEFAULT_CARD_CODES = ('RARE_GOLD', 'TOTY', 'RARE_UCL')
+DEFAULT_LANGUAGES = ('EN', 'FR')
+REPEATS = 100
+
+
+def draw_live(card_template, draw_plan, player):
+    card_img = card_template.new_canvas()
+    run_draw_ops(card_img, draw_plan.static)
+    run_draw_ops(card_img, draw_plan.under_image, player)
+    run_draw_ops(card_img, draw_plan.over_image, player)
+    return card_img
+
+
+def draw_cached(card_template, draw_plan, player):
+    card_img = new_card_canvas(card_template, draw_plan)
+    run_draw_ops(card_img, draw_plan.under_image, player)
+    run_draw_ops(card_img, draw_plan.over_image, player)
+    return card_img
+
+
+def best_ms(func, repeats):
+    """Fastest of repeats runs of func, in ms"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare drawing cards with and without the cached static layer')
+    parser.add_argument('--card-codes', default=','.join(DEFAULT_CARD_CODES))
+    parser.add_argument('--languages', default=','.join(DEFAULT_LANGUAGES))
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    args = parser.parse_args()
+
+    print(f'{"card":<20} {"live ms":>9} {"cached ms":>10} {"saved ms":>9} {"render ms":>10}')
+    for card_code in args.card_codes.split(','):
+        for language in args.languages.split(','):
+            player = Player('BENCH', 'ST', '10', 'eg', overall=90, language=language)
+            card_template = get_card_template(card_code)
+            draw_plan = get_draw_plan(card_code, language)
+            # builds the static layer and warms the fonts
+            assert draw_cached(card_template, draw_plan, player).tobytes() == \
+                draw_live(card_template, draw_plan, player).tobytes()
+
+            live_ms = best_ms(lambda: draw_live(card_template, draw_plan, player), args.repeats)
+            cached_ms = best_ms(lambda: draw_cached(card_template, draw_plan, player), args.repeats)
+            render_ms = best_ms(lambda: render_card_image(player, card_code, None, False), args.repeats)
+            print(f'{card_code + "/" + language:<20} {live_ms:>9.2f} {cached_ms:>10.2f} '
+                  f'{live_ms - cached_ms:>9.2f} {render_ms:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
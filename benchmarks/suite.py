@@ -0,0 +1,276 @@
+"""
+Benchmark suite of the render, storage and HTTP hot paths, compared against a saved baseline
+
+Runs fully offline: players and player images are synthetic, and the database, render cache and
+output directories (cardcreator.OUTPUT_DIR, web_server.OUTPUT_DIR) are redirected to a temporary
+directory, so nothing in the repository's finished-fut-cards/ is written or removed. Each benchmark reports the median and
+minimum of its repeats in milliseconds, written as JSON so runs can be compared.
+
+Groups:
+    render    render_card for every card code, without an image, with an image and in dynamic mode
+    stamp     stamp_player_image at several upload resolutions
+    database  database.py operations on the JSON and SQLite backends at growing sizes
+    http      the Flask endpoints through the test client
+
+Run from the repository root:
+    python -m benchmarks.suite                                   # compare with benchmarks/baseline.json
+    python -m benchmarks.suite --groups render,stamp --repeats 5
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --save-baseline                   # record a new baseline
+
+Exits with status 1 when a benchmark is slower than the baseline by more than --tolerance.
+"""
+
+import argparse
+import base64
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import PIL
+from PIL import Image
+
+import cardcreator
+import database
+import web_server
+from benchmarks import database as database_benchmark
+from benchmarks.stamp_player_image import RESOLUTIONS, make_synthetic_player_image
+from card_templates import warm_up_card_templates
+from cardcreator import render_card, stamp_player_image
+from render_cache import DiskLRUCache
+from renditions import RENDITION_WIDTHS, rendition_filename
+from resources.cardcode_to_card import cardcode_to_card
+from resources.player import Player
+
+GROUPS = ('render', 'stamp', 'database', 'http')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_REPEATS = 5
+DEFAULT_DATABASE_SIZES = (1000, 10000)
+# a benchmark regressed if it is this much slower than the baseline (0.25 = 25% slower)
+DEFAULT_TOLERANCE = 0.25
+# ...and at least this many ms slower, so timer noise on sub-millisecond benchmarks isn't reported
+MIN_REGRESSION_MS = 1.0
+# results are compared on their fastest run, which varies much less between runs than the median
+COMPARE_KEY = 'min_ms'
+# size of the synthetic player image used by the render and http groups
+PLAYER_IMAGE_SIZE = (600, 800)
+
+CARD_FIELDS = {
+    'name': 'BENCH', 'position': 'ST', 'club': '10', 'country': 'eg', 'overall': 90,
+    'pac': 90, 'dri': 88, 'sho': 91, 'def': 40, 'pas': 80, 'phy': 77, 'cardType': 'RARE_GOLD'
+}
+
+
+def measure(func, repeats):
+    """Run func repeats times, returns its median and minimum durations in ms"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': statistics.median(timings), 'min_ms': min(timings), 'repeats': repeats}
+
+
+def encode_png(img):
+    buffer = BytesIO()
+    img.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def bench_render(results, repeats, tmp_dir):
+    warm_up_card_templates()
+    player_image = encode_png(make_synthetic_player_image(PLAYER_IMAGE_SIZE))
+    variants = (('plain', None, False), ('image', player_image, False), ('dynamic', player_image, True))
+    counter = [0]
+
+    def render(card_code, image, dynamic):
+        counter[0] += 1
+        status_id = f'bench_{counter[0]}'
+        path = render_card(Player('BENCH', 'ST', '10', 'eg', overall=90), card_code, image, dynamic, status_id,
+                           use_render_cache=False)
+        for width in RENDITION_WIDTHS:
+            os.remove(rendition_filename(path, width))
+        os.remove(path)
+
+    for card_code in cardcode_to_card:
+        for variant, image, dynamic in variants:
+            results[f'render/{card_code}/{variant}'] = measure(lambda: render(card_code, image, dynamic), repeats)
+
+
+def bench_stamp(results, repeats, tmp_dir):
+    card_obj = cardcode_to_card['RARE_GOLD']
+    card_size = Image.open(card_obj.background_image_dir).size
+    for megapixels, size in RESOLUTIONS.items():
+        upload = encode_png(make_synthetic_player_image(size))
+
+        def stamp():
+            stamp_player_image(Image.new('RGBA', card_size), card_obj, BytesIO(upload))
+
+        results[f'stamp_player_image/{megapixels}MP'] = measure(stamp, repeats)
+
+
+def bench_database(results, repeats, tmp_dir, sizes):
+    saved = (database.DATABASE_FILE, database.SQLITE_DATABASE_FILE, database.DATABASE_BACKEND)
+    try:
+        for size in sizes:
+            for backend in database_benchmark.BACKENDS:
+                for operation, seconds in database_benchmark.benchmark(backend, size, tmp_dir).items():
+                    results[f'database/{backend}/{size}/{operation}'] = {'median_ms': seconds * 1000,
+                                                                         'min_ms': seconds * 1000, 'repeats': 1}
+    finally:
+        database.DATABASE_FILE, database.SQLITE_DATABASE_FILE, database.DATABASE_BACKEND = saved
+
+
+def bench_http(results, repeats, tmp_dir):
+    saved = (web_server.OUTPUT_DIR, database.DATABASE_FILE, database.DATABASE_BACKEND)
+    web_server.OUTPUT_DIR = os.path.join(tmp_dir, 'finished-fut-cards')
+    database.DATABASE_FILE = os.path.join(tmp_dir, 'http_cards.json')
+    database.DATABASE_BACKEND = 'json'
+    client = web_server.app.test_client()
+    image_field = 'data:image/png;base64,' + base64.b64encode(
+        encode_png(make_synthetic_player_image(PLAYER_IMAGE_SIZE))).decode('utf-8')
+    counter = [0]
+
+    def create_card(mode, **extra):
+        # a new name each time so the render cache never answers
+        counter[0] += 1
+        response = client.post(f'/api/create-card?mode={mode}', json=dict(CARD_FIELDS, name=f'BENCH {counter[0]}',
+                                                                          **extra))
+        assert response.status_code == 200, response.get_json()
+        return response
+
+    try:
+        filename = create_card('url').get_json()['filename']
+        benchmarks = {
+            'POST /api/create-card?mode=url': lambda: create_card('url'),
+            'POST /api/create-card?mode=inline': lambda: create_card('inline'),
+            'POST /api/create-card image': lambda: create_card('url', image=image_field),
+            'GET /api/get-cards?mode=url': lambda: client.get('/api/get-cards?mode=url'),
+            'GET /api/get-cards?mode=inline': lambda: client.get('/api/get-cards'),
+            'GET /api/random-players': lambda: client.get('/api/random-players'),
+            'GET /api/preview': lambda: client.get(f'/api/preview/{filename}').close(),
+            'GET /api/cards': lambda: client.get('/api/cards'),
+            'GET /api/health': lambda: client.get('/api/health'),
+        }
+        for name, func in benchmarks.items():
+            results[f'http/{name}'] = measure(func, repeats)
+    finally:
+        web_server.OUTPUT_DIR, database.DATABASE_FILE, database.DATABASE_BACKEND = saved
+
+
+def run_suite(groups, repeats, database_sizes):
+    """Run the benchmark groups and return {benchmark name: {median_ms, min_ms, repeats}}"""
+    results = {}
+    tmp_dir = tempfile.mkdtemp()
+    saved = (cardcreator.render_cache, cardcreator.OUTPUT_DIR)
+    cardcreator.render_cache = DiskLRUCache(os.path.join(tmp_dir, 'render-cache'))
+    cardcreator.OUTPUT_DIR = os.path.join(tmp_dir, 'finished-fut-cards')
+    try:
+        for group in groups:
+            start = time.perf_counter()
+            if group == 'render':
+                bench_render(results, repeats, tmp_dir)
+            elif group == 'stamp':
+                bench_stamp(results, repeats, tmp_dir)
+            elif group == 'database':
+                bench_database(results, repeats, tmp_dir, database_sizes)
+            elif group == 'http':
+                bench_http(results, repeats, tmp_dir)
+            print(f'{group}: done in {time.perf_counter() - start:.1f}s', file=sys.stderr)
+    finally:
+        cardcreator.render_cache, cardcreator.OUTPUT_DIR = saved
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return results
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pillow': PIL.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print the fastest run of each benchmark next to its baseline, returns the names of the regressed ones"""
+    regressions = []
+    print(f'{"benchmark":<60} {"baseline ms":>12} {"current ms":>12} {"ratio":>7}')
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f'{name:<60} {"-":>12} {result[COMPARE_KEY]:>12.2f} {"new":>7}')
+            continue
+        ratio = result[COMPARE_KEY] / base[COMPARE_KEY] if base[COMPARE_KEY] else 1.0
+        flag = ''
+        if ratio > 1 + tolerance and result[COMPARE_KEY] - base[COMPARE_KEY] > MIN_REGRESSION_MS:
+            regressions.append(name)
+            flag = ' ❌'
+        elif ratio < 1 - tolerance:
+            flag = ' ✅'
+        print(f'{name:<60} {base[COMPARE_KEY]:>12.2f} {result[COMPARE_KEY]:>12.2f} {ratio:>6.2f}x{flag}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmark suite of the render, storage and HTTP paths')
+    parser.add_argument('--groups', default=','.join(GROUPS), help='comma separated groups to run')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--database-sizes', default=','.join(str(size) for size in DEFAULT_DATABASE_SIZES),
+                        help='comma separated database sizes')
+    parser.add_argument('--output', default=None, help='write the results to this JSON file')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed slowdown before a benchmark counts as a regression (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    groups = args.groups.split(',')
+    unknown = [group for group in groups if group not in GROUPS]
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(unknown)} (expected {', '.join(GROUPS)})")
+
+    results = run_suite(groups, args.repeats, [int(size) for size in args.database_sizes.split(',')])
+    report = {'environment': environment(), 'results': results}
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        # keep the baseline entries of the groups that weren't run
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f).get('results', {})
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment(), 'results': baseline}, f, indent=2)
+        print(f'Saved {len(results)} results to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(json.dumps(report, indent=2))
+        print(f'No baseline at {args.baseline}, record one with --save-baseline', file=sys.stderr)
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline.get('results', {}), args.tolerance)
+    if baseline.get('environment') != report['environment']:
+        print('⚠️  The baseline was recorded on a different environment, compare with care')
+    if regressions:
+        print(f'❌ {len(regressions)} benchmarks regressed by more than {args.tolerance:.0%}')
+        return 1
+    print('✅ no regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
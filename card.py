@@ -1,28 +1,39 @@
 from resources.dimensions.Fifa19StandardDimensions import Dimensions as fifa19_standard_dimensions
 from resources.dimensions.Fifa19UclDimensions import Dimensions as fifa19_ucl_dimensions
+from keying import DEFAULT_HARD_THRESHOLD, DEFAULT_SOFT_THRESHOLD, validate_thresholds
 
 
 class Card:
-    def __init__(self, background_image_dir, font_colour_tuple, fonts_tuple, dimensions):
+    def __init__(self, background_image_dir, font_colour_tuple, fonts_tuple, dimensions,
+                 key_thresholds_tuple=(DEFAULT_HARD_THRESHOLD, DEFAULT_SOFT_THRESHOLD)):
+        validate_thresholds(*key_thresholds_tuple)
+
         self.background_image_dir = background_image_dir
         self.font_colour_tuple = font_colour_tuple
         self.fonts_tuple = fonts_tuple
         self.dimensions = dimensions
+        # (hard, soft) white distance thresholds used to key out the player image background
+        self.key_thresholds_tuple = key_thresholds_tuple
 
-    def factory(card_type, background_image_dir, font_colour_tuple, fonts_tuple):
+    def factory(card_type, background_image_dir, font_colour_tuple, fonts_tuple,
+                key_thresholds_tuple=(DEFAULT_HARD_THRESHOLD, DEFAULT_SOFT_THRESHOLD)):
         if card_type == "FIFA19_UCL":
-            return Fifa19ChampionsLeagueCard(background_image_dir, font_colour_tuple, fonts_tuple)
+            return Fifa19ChampionsLeagueCard(background_image_dir, font_colour_tuple, fonts_tuple, key_thresholds_tuple)
         else:
-            return Fifa19StandardCard(background_image_dir, font_colour_tuple, fonts_tuple)
+            return Fifa19StandardCard(background_image_dir, font_colour_tuple, fonts_tuple, key_thresholds_tuple)
 
     factory = staticmethod(factory)
 
 
 class Fifa19StandardCard(Card):
-    def __init__(self, background_image_dir, font_colour_tuple, fonts_tuple):
-        Card.__init__(self, background_image_dir, font_colour_tuple, fonts_tuple, fifa19_standard_dimensions())
+    def __init__(self, background_image_dir, font_colour_tuple, fonts_tuple,
+                 key_thresholds_tuple=(DEFAULT_HARD_THRESHOLD, DEFAULT_SOFT_THRESHOLD)):
+        Card.__init__(self, background_image_dir, font_colour_tuple, fonts_tuple, fifa19_standard_dimensions(),
+                      key_thresholds_tuple)
 
 
 class Fifa19ChampionsLeagueCard(Card):
-    def __init__(self, background_image_dir, font_colour_tuple, fonts_tuple):
-        Card.__init__(self, background_image_dir, font_colour_tuple, fonts_tuple, fifa19_ucl_dimensions())
+    def __init__(self, background_image_dir, font_colour_tuple, fonts_tuple,
+                 key_thresholds_tuple=(DEFAULT_HARD_THRESHOLD, DEFAULT_SOFT_THRESHOLD)):
+        Card.__init__(self, background_image_dir, font_colour_tuple, fonts_tuple, fifa19_ucl_dimensions(),
+                      key_thresholds_tuple)
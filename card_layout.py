@@ -0,0 +1,255 @@
+"""
+Card layouts compiled into immutable draw plans
+تحويل تصميم البطاقة إلى خطة رسم جاهزة لكل نوع بطاقة ولغة
+
+A layout is data: the text and lines drawn on every card, with coordinates written as arithmetic
+expressions over the attributes of the card's Dimensions class (Fifa19StandardDimensions,
+Fifa19UclDimensions), "width" (of the card background) and, for text, "text_width" (the width of
+the text itself, to centre it). compile_layout resolves a layout once per (card code, language):
+coordinates, the translated attribute labels, fonts and colours, and returns a DrawPlan of flat
+TextOp and LineOp tuples. run_draw_ops draws them, reading only the player fields per card.
+
+The labels and lines are the same on every card of a (card code, language): they are drawn once on
+a copy of the background, the static layer, kept in a bounded cache. Renders start from a copy of
+that layer (new_card_canvas) and only draw the player's fields.
+
+Layout elements are dicts:
+    {'kind': 'field', 'field': 'pac', 'x': ..., 'y': ..., 'font': 'attribute_value', 'colour': 'bottom'}
+    {'kind': 'label', 'label': 0, 'x': ..., 'y': ..., 'font': 'attribute_label', 'colour': 'bottom'}
+    {'kind': 'line', 'points': (x1, y1, x2, y2), 'colour': 'top', 'width': 1}
+
+fields are the Player attributes (name, overall, position, pac, dri, sho, deff, pas, phy), labels
+index the language's attribute_labels, fonts are FONT_ROLES and colours "top" or "bottom" of the
+card's font_colour_tuple. Fields are pasted from the text sprite cache (see text_sprites) unless
+their element sets 'sprite': False, as the name does.
+"""
+
+import ast
+import operator
+import os
+import threading
+from collections import namedtuple
+
+from PIL import ImageDraw
+
+from asset_cache import AssetCache
+from card_templates import get_card_template
+from text_sprites import paste_text
+from resources.exceptions import InvalidLanguageError
+from resources.languages_dictionary import languages_dict
+
+# fonts of a card template, in the order of its fonts_tuple
+FONT_ROLES = ('overall', 'position', 'name', 'attribute_value', 'attribute_label')
+COLOURS = ('top', 'bottom')
+# memory cap of the static layer cache, one layer is a full RGBA card (about 1.7 MB)
+STATIC_LAYER_MAX_BYTES = int(os.environ.get('STATIC_LAYER_CACHE_MB', 64)) * 1024 * 1024
+
+
+def _attribute(x, y, field, label):
+    return (
+        {'kind': 'field', 'field': field, 'x': f'left_margin_attr_value_col{x}',
+         'y': f'top_margin_stats_row_{y}_values', 'font': 'attribute_value', 'colour': 'bottom'},
+        {'kind': 'label', 'label': label, 'x': f'left_margin_attr_label_col{x}',
+         'y': f'top_margin_stats_row_{y}_labels', 'font': 'attribute_label', 'colour': 'bottom'},
+    )
+
+
+# The FIFA 19 card: the attribute grid and separator lines are drawn under the player image,
+# the name, overall and position over it (a dynamic image covers the bottom of the card)
+FIFA19_LAYOUT = {
+    'under_image': (
+        *_attribute(1, 1, 'pac', 0),
+        *_attribute(1, 2, 'sho', 2),
+        *_attribute(1, 3, 'pas', 4),
+        *_attribute(2, 1, 'dri', 1),
+        *_attribute(2, 2, 'deff', 3),
+        *_attribute(2, 3, 'phy', 5),
+        # under the position
+        {'kind': 'line', 'colour': 'top', 'width': 1,
+         'points': ('left_point_x_coordinate_line_under_position', 'top_margin_line_under_position',
+                    'right_point_x_coordinate_line_under_position', 'top_margin_line_under_position')},
+        # under the country flag
+        {'kind': 'line', 'colour': 'top', 'width': 1,
+         'points': ('left_point_x_coordinate_line_under_position', 'top_margin_line_under_country_flag',
+                    'right_point_x_coordinate_line_under_position', 'top_margin_line_under_country_flag')},
+        # under the name
+        {'kind': 'line', 'colour': 'bottom', 'width': 1,
+         'points': ('margin_line_under_name', 'top_margin_line_under_name',
+                    'width - margin_line_under_name', 'top_margin_line_under_name')},
+        # under the attributes
+        {'kind': 'line', 'colour': 'bottom', 'width': 1,
+         'points': ('margin_line_under_stats', 'top_margin_line_under_stats',
+                    'width - margin_line_under_stats', 'top_margin_line_under_stats')},
+        # between the two attribute columns
+        {'kind': 'line', 'colour': 'bottom', 'width': 1,
+         'points': ('width / 2', 'top_margin_vertical_line_between_stats_columns',
+                    'width / 2', 'bottom_point_vertical_line_between_stats_columns')},
+    ),
+    'over_image': (
+        # names are rarely drawn twice, they are rasterized live instead of being cached as sprites
+        {'kind': 'field', 'field': 'name', 'x': '(width - text_width) / 3', 'y': 'top_margin_name',
+         'font': 'name', 'colour': 'bottom', 'sprite': False},
+        {'kind': 'field', 'field': 'overall', 'x': 'left_margin_overall', 'y': 'top_margin_player_overall',
+         'font': 'overall', 'colour': 'top'},
+        {'kind': 'field', 'field': 'position', 'x': 'left_margin + 50 - (text_width / 2)',
+         'y': 'top_margin_position', 'font': 'position', 'colour': 'top'},
+    ),
+}
+
+# text is None for fields, field is None for labels; x is a number, or a function of the text width;
+# sprite tells whether the text is pasted from the sprite cache instead of drawn
+TextOp = namedtuple('TextOp', 'x y text field fill font sprite')
+LineOp = namedtuple('LineOp', 'points fill width')
+# static holds the labels and lines drawn under the image, under_image the player fields drawn there
+DrawPlan = namedtuple('DrawPlan', 'card_code language static under_image over_image')
+
+# operators allowed in layout expressions
+_BINARY_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+                     ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv}
+_UNARY_OPERATORS = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+_plans = {}
+_lock = threading.Lock()
+
+# background with the static operations drawn, per (card code, language); shared, only ever copied
+static_layer_cache = AssetCache(STATIC_LAYER_MAX_BYTES)
+
+
+def compile_coordinate(expression, names):
+    """
+    Resolve a layout coordinate: a number, or an expression over names and "text_width"
+
+    Returns a number, or a function of text_width when the expression uses it. The parts that don't
+    use text_width are computed here and the rest is turned into nested closures, so a render only
+    does the arithmetic on text_width.
+
+    Raises:
+        ValueError: If the expression uses anything but numbers, names and + - * / //
+    """
+    if isinstance(expression, (int, float)):
+        return expression
+    return compile_node(ast.parse(str(expression), mode='eval').body, names, expression)
+
+
+def compile_node(node, names, expression):
+    """A number, or a function of text_width, computing a node of a layout expression (see compile_coordinate)"""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id == 'text_width':
+            return lambda text_width: text_width
+        if node.id not in names:
+            raise ValueError(f'Unknown dimension ({node.id}) in layout expression ({expression})')
+        return names[node.id]
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        apply = _UNARY_OPERATORS[type(node.op)]
+        operand = compile_node(node.operand, names, expression)
+        return (lambda text_width: apply(operand(text_width))) if callable(operand) else apply(operand)
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        apply = _BINARY_OPERATORS[type(node.op)]
+        left = compile_node(node.left, names, expression)
+        right = compile_node(node.right, names, expression)
+        if callable(left) and callable(right):
+            return lambda text_width: apply(left(text_width), right(text_width))
+        if callable(left):
+            return lambda text_width: apply(left(text_width), right)
+        if callable(right):
+            return lambda text_width: apply(left, right(text_width))
+        return apply(left, right)
+    raise ValueError(f'Invalid layout expression ({expression})')
+
+
+def compile_layout(card_template, language_code, layout=FIFA19_LAYOUT):
+    """
+    Turn a layout into the DrawPlan of a card template (see card_templates) in a language
+
+    Raises:
+        InvalidLanguageError: If the language is not in languages_dict
+        ValueError: If an element of the layout is invalid
+    """
+    language = languages_dict.get(language_code)
+    if language is None:
+        raise InvalidLanguageError(f'Language ({language_code}) is not a valid language.')
+    labels = language['attribute_labels']
+
+    card_obj = card_template.card_obj
+    names = dict(vars(card_obj.dimensions), width=card_template.background.width)
+    fonts = dict(zip(FONT_ROLES, (card_template.overall_font, card_template.position_font, card_template.name_font,
+                                  card_template.attribute_value_font, card_template.attribute_label_font)))
+    colours = dict(zip(COLOURS, card_obj.font_colour_tuple))
+
+    def compile_element(element):
+        kind = element['kind']
+        if kind == 'line':
+            points = tuple(compile_coordinate(point, names) for point in element['points'])
+            return LineOp(points, colours[element['colour']], element.get('width', 1))
+        if kind not in ('field', 'label'):
+            raise ValueError(f'Invalid layout element kind ({kind})')
+        return TextOp(compile_coordinate(element['x'], names), compile_coordinate(element['y'], names),
+                      labels[element['label']] if kind == 'label' else None,
+                      element['field'] if kind == 'field' else None,
+                      colours[element['colour']], fonts[element['font']],
+                      kind == 'field' and element.get('sprite', True))
+
+    under_image = [compile_element(element) for element in layout['under_image']]
+    return DrawPlan(card_template.card_code, language_code,
+                    tuple(op for op in under_image if type(op) is LineOp or op.field is None),
+                    tuple(op for op in under_image if type(op) is TextOp and op.field is not None),
+                    tuple(compile_element(element) for element in layout['over_image']))
+
+
+def get_draw_plan(card_code, language_code):
+    """
+    Return the DrawPlan of a card code in a language, compiling it on first use
+
+    Raises:
+        InvalidCardCodeError: If the card code is not in cardcode_to_card
+        InvalidLanguageError: If the language is not in languages_dict
+    """
+    card_code = card_code.upper()
+    key = (card_code, language_code)
+    plan = _plans.get(key)
+    if plan is None:
+        plan = compile_layout(get_card_template(card_code), language_code)
+        with _lock:
+            plan = _plans.setdefault(key, plan)
+    return plan
+
+
+def draw_static_layer(card_template, draw_plan):
+    """Draw the static operations of a plan on a copy of the card background"""
+    layer = card_template.new_canvas()
+    run_draw_ops(layer, draw_plan.static)
+    return layer
+
+
+def new_card_canvas(card_template, draw_plan):
+    """Return a private copy of the static layer of a plan (background, labels and lines) to draw a card on"""
+    layer = static_layer_cache.get((draw_plan.card_code, draw_plan.language),
+                                   lambda: draw_static_layer(card_template, draw_plan))
+    return layer.copy()
+
+
+def player_field(player, field):
+    """Text of a player field as drawn on the card"""
+    if field == 'position':
+        return player.position.name
+    return str(getattr(player, field))
+
+
+def run_draw_ops(card_img, ops, player=None):
+    """Draw plan operations on an RGBA card image, in order; player fills the field texts"""
+    draw = ImageDraw.Draw(card_img)
+    for op in ops:
+        if type(op) is LineOp:
+            draw.line(op.points, fill=op.fill, width=op.width)
+            continue
+        text = op.text if op.field is None else player_field(player, op.field)
+        x = op.x
+        if callable(x):
+            bbox = draw.textbbox((0, 0), text, op.font)
+            x = x(bbox[2] - bbox[0])
+        if op.sprite:
+            paste_text(card_img, (x, op.y), text, op.font, op.fill)
+        else:
+            draw.text((x, op.y), text, fill=op.fill, font=op.font)
@@ -0,0 +1,81 @@
+"""
+Registry of card templates with their backgrounds and fonts loaded once per process
+سجل قوالب البطاقات: تحميل الخلفيات والخطوط مرة واحدة فقط
+"""
+
+import threading
+
+from PIL import Image, ImageFont
+
+from resources.cardcode_to_card import cardcode_to_card
+from resources.exceptions import InvalidCardCodeError
+
+_fonts = {}
+_templates = {}
+_lock = threading.Lock()
+
+
+def get_font(font_path, size):
+    """Return the FreeType font for (font_path, size), parsing the font file only the first time"""
+    key = (font_path, size)
+    font = _fonts.get(key)
+    if font is None:
+        with _lock:
+            font = _fonts.get(key)
+            if font is None:
+                font = ImageFont.truetype(font_path, size)
+                _fonts[key] = font
+    return font
+
+
+class CardTemplate:
+    """
+    A card code with its decoded background and ready to use fonts
+
+    The background image is shared between renders and must never be drawn on; renders start
+    from new_canvas() instead.
+    """
+
+    def __init__(self, card_code, card_obj):
+        self.card_code = card_code
+        self.card_obj = card_obj
+
+        self.background = Image.open(card_obj.background_image_dir).convert('RGBA')
+
+        fonts = [get_font(font_path, size) for font_path, size in card_obj.fonts_tuple]
+        self.overall_font, self.position_font, self.name_font, self.attribute_value_font, \
+            self.attribute_label_font = fonts
+
+    def new_canvas(self):
+        """Return a private copy of the decoded background to draw a card on"""
+        return self.background.copy()
+
+
+def get_card_template(card_code):
+    """
+    Return the template for a card code, building it on first use
+
+    Raises:
+        InvalidCardCodeError: If the card code is not in cardcode_to_card
+    """
+    card_code = card_code.upper()
+    template = _templates.get(card_code)
+    if template is not None:
+        return template
+
+    card_obj = cardcode_to_card.get(card_code)
+    if card_obj is None:
+        raise InvalidCardCodeError(f'Card code ({card_code}) is invalid.')
+
+    template = CardTemplate(card_code, card_obj)
+    with _lock:
+        # another thread may have built the same template meanwhile, keep the first one
+        template = _templates.setdefault(card_code, template)
+    return template
+
+
+def warm_up_card_templates():
+    """Decode every card background and load every font up front, returns the number of templates"""
+    for card_code in cardcode_to_card:
+        get_card_template(card_code)
+    return len(_templates)
@@ -1,170 +1,239 @@
 import os
 from io import BytesIO
 
-import requests
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
-
-from resources.cardcode_to_card import cardcode_to_card
+from PIL import Image
+
+from asset_cache import flag_and_badge_cache
+from card_layout import get_draw_plan, new_card_canvas, run_draw_ops
+from card_templates import get_card_template
+from image_fetcher import fetch_image
+from job_ids import publish_file
+from output_encoder import get_output_options
+from player_image import prepare_player_image
+from render_cache import render_cache, render_cache_key
+from render_metrics import current_timing, render_timer, stage
+from renditions import RENDITION_WIDTHS, encode_renditions, rendition_filename
 from resources.exceptions import *
-from resources.languages_dictionary import languages_dict
 
+# directory of the finished cards written by render_card
+OUTPUT_DIR = 'finished-fut-cards'
 
-def render_card(player, card_code, player_image_url, dynamic_img_fl, status_id):
-    card_obj = cardcode_to_card.get(card_code.upper())
 
-    if card_obj is None:
-        raise InvalidCardCodeError(f'Card code ({card_code}) is invalid.')
-    
-    card_background = card_obj.background_image_dir
-    font_colour_top = card_obj.font_colour_tuple[0]
-    font_colour_bottom = card_obj.font_colour_tuple[1]
-    fonts_tuple = card_obj.fonts_tuple
-
-    card_bg_img = Image.open(card_background).convert('RGBA')
-    draw = ImageDraw.Draw(card_bg_img)
-
-    # prepare fonts ready for use
-    overall_font = ImageFont.truetype(fonts_tuple[0][0], fonts_tuple[0][1])
-    position_font = ImageFont.truetype(fonts_tuple[1][0], fonts_tuple[1][1])
-    name_font = ImageFont.truetype(fonts_tuple[2][0], fonts_tuple[2][1])
-    attribute_value_font = ImageFont.truetype(fonts_tuple[3][0], fonts_tuple[3][1])
-    attribute_label_font = ImageFont.truetype(fonts_tuple[4][0], fonts_tuple[4][1])
-
-    # Use textbbox instead of textsize for newer Pillow versions
-    bbox = draw.textbbox((0, 0), player.name, name_font)
-    w, h = bbox[2] - bbox[0], bbox[3] - bbox[1]
-    bbox2 = draw.textbbox((0, 0), player.position.name, position_font)
-    w2, h2 = bbox2[2] - bbox2[0], bbox2[3] - bbox2[1]
-
-    player_name_left_margin = (card_bg_img.width - w) / 3
-    player_position_left_margin = card_obj.dimensions.left_margin + 50 - (w2 / 2)
-
-    add_player_attributes_section(draw, card_obj, font_colour_bottom, player, attribute_value_font, attribute_label_font)
-
-    add_separator_lines(draw, card_obj, font_colour_top, font_colour_bottom)
-
-    if player_image_url is not None:
-        temp_path = 'temp'
-        if not os.path.exists(temp_path):
-            os.makedirs(temp_path)
-
-        temp_filename = f'{status_id}.png'
-        temp_file_path = os.path.join(temp_path, temp_filename)
-
-        # Check if it's a local file path or URL
-        if os.path.isfile(player_image_url):
-            # It's a local file, copy it
-            try:
-                i = Image.open(player_image_url)
-                i.save(temp_file_path)
-            except Exception as e:
-                print(f"Error loading local image: {str(e)}")
-                # If fails, skip image processing
-                player_image_url = None
+def render_card(player, card_code, player_image_url, dynamic_img_fl, status_id, high_quality_img=False,
+                use_render_cache=True, output_options=None, rendition_widths=RENDITION_WIDTHS):
+    """
+    Render a card to OUTPUT_DIR/<status_id>.<extension> and return its path
+
+    output_options picks the format and compression (an output_encoder preset or format name, a dict
+    or OutputOptions); the default is PNG with Pillow's default settings. A smaller rendition
+    (<status_id>_<width>w.<extension>) is written next to the card for each of rendition_widths.
+    """
+    output_options = get_output_options(output_options)
+    save_filename = f'{status_id}.{output_options.extension}'
+    output_file_path = os.path.join(OUTPUT_DIR, save_filename)
+
+    with render_timer(card_code):
+        card_bytes, renditions = render_card_with_renditions(player, card_code, player_image_url, dynamic_img_fl,
+                                                             high_quality_img, output_options, rendition_widths,
+                                                             use_render_cache)
+        with stage('save'):
+            # renditions first, so a card that is visible always has its renditions; each file is
+            # written privately and renamed into place, so readers never see a partial card
+            for width, rendition_bytes in renditions.items():
+                publish_file(os.path.join(OUTPUT_DIR, rendition_filename(save_filename, width)), rendition_bytes)
+            return publish_file(output_file_path, card_bytes)
+
+
+def render_card_to_bytes(player, card_code, player_image, dynamic_img_fl, high_quality_img=False, image_format='PNG',
+                         use_render_cache=True, output_options=None):
+    """
+    Render a card fully in memory and return the encoded image bytes
+
+    Nothing is written to temp/ or finished-fut-cards/. player_image may be a PIL image, raw image
+    bytes, a local file path, a URL or None. Unless use_render_cache is False, cards already rendered
+    with the same inputs are returned from the render cache and new ones are added to it.
+    output_options (see render_card) takes precedence over image_format.
+    """
+    output_options = output_options if output_options is not None else image_format
+    return render_card_with_renditions(player, card_code, player_image, dynamic_img_fl, high_quality_img,
+                                       output_options, (), use_render_cache)[0]
+
+
+def render_card_with_renditions(player, card_code, player_image, dynamic_img_fl, high_quality_img=False,
+                                output_options=None, rendition_widths=RENDITION_WIDTHS, use_render_cache=True):
+    """
+    Render a card in memory along with smaller renditions of it (see render_card_to_bytes)
+
+    Returns (card bytes, {width: rendition bytes}); widths not smaller than the card are left out.
+    The renditions are cached with the card.
+    """
+    output_options = get_output_options(output_options)
+    extension = output_options.extension
+    with render_timer(card_code):
+        if player_image is not None:
+            with stage('image_fetch'):
+                player_image = read_player_image_source(player_image)
+
+        card_bytes = None
+        if use_render_cache:
+            with stage('cache_lookup'):
+                cache_key = render_cache_key(player, card_code, player_image, dynamic=bool(dynamic_img_fl),
+                                             high_quality=bool(high_quality_img), **output_options.cache_fields())
+                card_bytes = render_cache.get_bytes(cache_key, extension)
+                renditions = {}
+                if card_bytes is not None:
+                    for width in rendition_widths:
+                        rendition_bytes = render_cache.get_bytes(f'{cache_key}_{width}w', extension)
+                        if rendition_bytes is None:
+                            break
+                        renditions[width] = rendition_bytes
+            if card_bytes is not None and len(renditions) == len(rendition_widths):
+                return card_bytes, renditions
+
+        if card_bytes is None:
+            card_bg_img = render_card_image(player, card_code, player_image, dynamic_img_fl, high_quality_img)
+            with stage('encode'):
+                card_bytes = output_options.encode(card_bg_img)
+            if use_render_cache:
+                with stage('cache_store'):
+                    store_in_render_cache(cache_key, card_bytes, extension)
         else:
-            # It's a URL, download it
-            try:
-                request = requests.get(player_image_url, stream=True)
-                if request.status_code == 200:
-                    # read data from downloaded bytes and returns a PIL.Image.Image object
-                    i = Image.open(BytesIO(request.content))
-                    # Saves the image under the given filename
-                    i.save(temp_file_path)
-                else:
-                    player_image_url = None
-            except Exception as e:
-                print(f"Error downloading image: {str(e)}")
-                player_image_url = None
-
-        if player_image_url is not None:
+            # cached before its renditions were: scale the cached card instead of drawing it again
+            card_bg_img = Image.open(BytesIO(card_bytes))
+
+        renditions = {}
+        if rendition_widths:
+            with stage('renditions'):
+                renditions = encode_renditions(card_bg_img, output_options, rendition_widths)
+            if use_render_cache:
+                with stage('cache_store'):
+                    for width, rendition_bytes in renditions.items():
+                        store_in_render_cache(f'{cache_key}_{width}w', rendition_bytes, extension)
+        return card_bytes, renditions
+
+
+def store_in_render_cache(key, data, extension):
+    """Add a rendered file to the render cache; a failed write (disk full, permissions) doesn't fail the render"""
+    try:
+        render_cache.put(key, data, extension)
+    except OSError as e:
+        print(f"Error writing to the render cache: {e}")
+
+
+def encode_card_image(card_bg_img, image_format):
+    """Encode a card with an output_encoder preset or format name, a dict or OutputOptions"""
+    return get_output_options(image_format).encode(card_bg_img)
+
+
+def render_card_image(player, card_code, player_image, dynamic_img_fl, high_quality_img=False):
+    """Draw a card and return it as a PIL image; every stage passes images in memory"""
+    with render_timer(card_code):
+        # backgrounds and fonts are decoded once per process and reused between renders
+        with stage('template'):
+            card_template = get_card_template(card_code)
+            card_obj = card_template.card_obj
+
+        with stage('text_layout'):
+            # coordinates, labels, fonts and colours are compiled once per (card code, language), see card_layout
+            draw_plan = get_draw_plan(card_code, player.language.name)
+
+        with stage('static_layer'):
+            # the background with the attribute labels and separator lines already drawn
+            card_bg_img = new_card_canvas(card_template, draw_plan)
+
+        with stage('attributes'):
+            run_draw_ops(card_bg_img, draw_plan.under_image, player)
+
+        player_img = None
+        if player_image is not None:
+            with stage('image_load'):
+                player_img = load_player_image(player_image)
+
+        if player_img is not None:
             if dynamic_img_fl:
-                card_bg_img = stamp_dynamic_player_image(card_bg_img, card_obj, temp_file_path, status_id)
-                draw = ImageDraw.Draw(card_bg_img)
+                with stage('image_dynamic'):
+                    card_bg_img = stamp_dynamic_player_image(card_bg_img, card_obj, player_img)
             else:
-                stamp_player_image(card_bg_img, card_obj, temp_file_path)
+                stamp_player_image(card_bg_img, card_obj, player_img, high_quality=high_quality_img,
+                                   stage_report=[] if current_timing() is not None else None)
+
+        with stage('name_overall_position'):
+            run_draw_ops(card_bg_img, draw_plan.over_image, player)
+
+        with stage('flag_and_badge'):
+            stamp_country_flag_and_club_badge(card_obj, card_bg_img, player)
+
+        return card_bg_img
+
+
+def load_player_image(player_image):
+    """
+    Open a player image given as a PIL image, bytes, a local file path or a URL
+
+    Returns None (and the card is rendered without an image) if the image can't be loaded
+    """
+    player_image = read_player_image_source(player_image)
+
+    if player_image is None or isinstance(player_image, Image.Image):
+        return player_image
 
-    add_player_name_overall_and_position(draw, card_obj, font_colour_top, font_colour_bottom, player_name_left_margin,
-                                         player_position_left_margin, player, name_font, overall_font, position_font)
+    try:
+        return Image.open(BytesIO(player_image))
+    except Exception as e:
+        print(f"Error loading image bytes: {str(e)}")
+        return None
 
-    stamp_country_flag_and_club_badge(card_obj, card_bg_img, player)
 
-    save_path = 'finished-fut-cards'
-    if not os.path.exists(save_path):
-        os.makedirs(save_path)
+def read_player_image_source(player_image):
+    """
+    Return the player image as a PIL image or encoded bytes, reading local files and downloading URLs
 
-    save_filename = f'{status_id}.png'
-    output_file_path = os.path.join(save_path, save_filename)
-    card_bg_img.save(output_file_path)
-    return output_file_path
+    Returns None if the file can't be read or the download fails
+    """
+    if isinstance(player_image, (Image.Image, bytes)):
+        return player_image
+
+    if isinstance(player_image, bytearray):
+        return bytes(player_image)
+
+    # Check if it's a local file path or URL
+    if os.path.isfile(player_image):
+        try:
+            with open(player_image, 'rb') as f:
+                return f.read()
+        except Exception as e:
+            print(f"Error loading local image: {str(e)}")
+            # If fails, skip image processing
+            return None
+
+    # It's a URL, download it (pooled connections, timeouts, size limit and disk cache)
+    try:
+        return fetch_image(player_image)
+    except Exception as e:
+        print(f"Error downloading image: {str(e)}")
+        return None
 
 
-def stamp_player_image(card_bg_img, card_obj, player_image_filename):
+def stamp_player_image(card_bg_img, card_obj, player_img, high_quality=False, stage_report=None):
     """
     دالة محسّنة لإضافة صورة اللاعب على البطاقة
     تتعامل مع الخلفية البيضاء والشفافية بشكل أفضل
     Improved function to add player image to card
     Better handling of white backgrounds and transparency
+
+    player_img may be a PIL image, a file path or a file object; high_quality keeps filtering/keying
+    at full resolution and stage_report collects per-stage timings (see player_image.prepare_player_image)
     """
-    player_img = Image.open(player_image_filename).convert('RGBA')
-    
-    # تطبيق فلتر خفيف لتنعيم الحواف
-    # Apply light filter to smooth edges
-    player_img = player_img.filter(ImageFilter.SMOOTH_MORE)
-    
-    # الطريقة المحسّنة لإزالة الخلفية البيضاء/الفاتحة
-    # Improved method for removing white/light backgrounds
-    datas = player_img.getdata()
-    newData = []
-    
-    for item in datas:
-        # تحسين عملية الكشف عن الخلفية البيضاء
-        # Improved white background detection
-        r, g, b, a = item[0], item[1], item[2], item[3] if len(item) == 4 else 255
-        
-        # حساب مدى قرب اللون من الأبيض
-        # Calculate how close the color is to white
-        white_distance = abs(r - 255) + abs(g - 255) + abs(b - 255)
-        
-        # إذا كان اللون قريب جداً من الأبيض (مجموع الفرق أقل من 30)
-        # If color is very close to white (sum of difference less than 30)
-        if white_distance < 30:
-            # نجعله شفاف تماماً
-            # Make it completely transparent
-            newData.append((255, 255, 255, 0))
-        # إذا كان قريب من الأبيض (30-60) - شفافية تدريجية
-        # If close to white (30-60) - gradual transparency
-        elif white_distance < 60:
-            # نقلل الشفافية تدريجياً
-            # Gradually reduce opacity
-            new_alpha = int((white_distance / 60) * 255)
-            newData.append((r, g, b, new_alpha))
-        else:
-            # نحتفظ بالبكسل كما هو
-            # Keep pixel as is
-            newData.append((r, g, b, a))
-    
-    player_img.putdata(newData)
-    
-    # حساب الحجم المناسب مع الحفاظ على نسبة الأبعاد
-    # Calculate appropriate size while maintaining aspect ratio
-    original_width, original_height = player_img.size
-    
-    # الحجم المطلوب للصورة على البطاقة
-    # Target size for image on card
-    target_height = 380
-    aspect_ratio = original_width / original_height
-    target_width = int(target_height * aspect_ratio)
-    
-    # إذا كان العرض كبير جداً، نعدل بناءً على العرض
-    # If width is too large, adjust based on width
-    max_width = 420
-    if target_width > max_width:
-        target_width = max_width
-        target_height = int(target_width / aspect_ratio)
-    
-    # تغيير حجم الصورة مع الحفاظ على الجودة
-    # Resize image while maintaining quality
-    player_img = player_img.resize((target_width, target_height), Image.Resampling.LANCZOS)
+    # تصغير الصورة أولاً ثم التنعيم وإزالة الخلفية البيضاء وتغيير الحجم النهائي
+    # Shrink the image first, then smooth it, remove the white background and resize it to its final size
+    hard_threshold, soft_threshold = card_obj.key_thresholds_tuple
+    player_img = prepare_player_image(player_img, hard_threshold, soft_threshold,
+                                      high_quality=high_quality, stage_report=stage_report)
+    timing = current_timing()
+    if timing is not None and stage_report is not None:
+        # the pipeline steps (decode, reduce, convert, smooth, key, resize) become image_* render stages
+        for step in stage_report:
+            timing.add(f"image_{step['stage']}", step['seconds'])
     
     # حساب الموضع المثالي للصورة
     # Calculate ideal position for image
@@ -178,14 +247,14 @@ def stamp_player_image(card_bg_img, card_obj, player_image_filename):
     
     # لصق الصورة مع الحفاظ على الشفافية
     # Paste image while preserving transparency
-    card_bg_img.paste(player_img, (x_position, y_position), player_img)
+    with stage('image_paste'):
+        card_bg_img.paste(player_img, (x_position, y_position), player_img)
 
 
-def stamp_dynamic_player_image(card_bg_img, card_obj, player_image_filename, status_id):
-    player_img = Image.open(player_image_filename).convert('RGBA')
+def stamp_dynamic_player_image(card_bg_img, card_obj, player_img):
+    player_img = player_img.convert('RGBA')
 
-    dynamic_img_path = paste_dynamic_player_image_on_blank_canvas(card_bg_img, card_obj, player_img, status_id)
-    dynamic_player_img = Image.open(dynamic_img_path)
+    dynamic_player_img = paste_dynamic_player_image_on_blank_canvas(card_bg_img, card_obj, player_img)
 
     final = Image.new("RGBA", card_bg_img.size)
     final = Image.alpha_composite(final, card_bg_img)
@@ -194,128 +263,47 @@ def stamp_dynamic_player_image(card_bg_img, card_obj, player_image_filename, sta
     return final
 
 
-def paste_dynamic_player_image_on_blank_canvas(card_bg_img, card_obj, player_img, status_id):
+def paste_dynamic_player_image_on_blank_canvas(card_bg_img, card_obj, player_img):
     canvas = Image.new("RGBA", card_bg_img.size)
     canvas.paste(player_img, (card_obj.dimensions.left_margin_dynamic_player_image,
                               card_bg_img.height - player_img.height - card_obj.dimensions.bottom_margin_dynamic_player_image),
                  player_img)
-    canvas.save('canvas.png')
-    tmp_save_path = 'temp'
-    if not os.path.exists(tmp_save_path):
-        os.makedirs(tmp_save_path)
-    save_filename = f'dynamic-img-{status_id}.png'
-    tmp_file_path = os.path.join(tmp_save_path, save_filename)
-    canvas.save(tmp_file_path)
-
-    return tmp_file_path
+    return canvas
 
 
 def stamp_country_flag_and_club_badge(card_obj, card_bg_img, player):
+    # resized flags and badges are cached per card type so repeated ones cost no file I/O or resampling
+    card_type = type(card_obj).__name__
+    country_flag_img = flag_and_badge_cache.get(('flag', player.country, card_type),
+                                                lambda: load_country_flag(player.country))
+    club_badge_img = flag_and_badge_cache.get(('badge', player.club, card_type),
+                                              lambda: load_club_badge(player.club))
+
+    # paste the country flag and club badge
+    card_bg_img.paste(country_flag_img, (card_obj.dimensions.left_margin + 10, 272), country_flag_img)
+    card_bg_img.paste(club_badge_img, (card_obj.dimensions.left_margin_club_badge, 350), club_badge_img)
+
+
+def load_country_flag(country):
     try:
-        country_flag_img = Image.open(f"assets/nations/png100px/{player.country}.png").convert('RGBA')
+        country_flag_img = Image.open(f"assets/nations/png100px/{country}.png").convert('RGBA')
     except FileNotFoundError:
-        raise InvalidCountryCodeError(f'Country code ({player.country}) is invalid.')
+        raise InvalidCountryCodeError(f'Country code ({country}) is invalid.')
 
     country_flag_img_width = 166
     country_flag_img_height = 99
     country_flag_img_width = int(country_flag_img_width * 0.48)
     country_flag_img_height = int(country_flag_img_height * 0.48)
-    country_flag_img = country_flag_img.resize((country_flag_img_width, country_flag_img_height))
+    return country_flag_img.resize((country_flag_img_width, country_flag_img_height))
 
+
+def load_club_badge(club):
     try:
-        club_badge_img = Image.open(f"assets/clubs/{player.club}.png").convert('RGBA')
+        club_badge_img = Image.open(f"assets/clubs/{club}.png").convert('RGBA')
     except FileNotFoundError:
-        raise InvalidClubNumberError(f'Club number ({player.club}) is invalid.')
+        raise InvalidClubNumberError(f'Club number ({club}) is invalid.')
 
     club_badge_img_width, club_badge_img_height = club_badge_img.size
     club_badge_img_width = int(club_badge_img_width * 0.55)
     club_badge_img_height = int(club_badge_img_height * 0.55)
-    club_badge_img = club_badge_img.resize((club_badge_img_width, club_badge_img_height), Image.LANCZOS)
-
-    # paste the country flag and club badge
-    card_bg_img.paste(country_flag_img, (card_obj.dimensions.left_margin + 10, 272), country_flag_img)
-    card_bg_img.paste(club_badge_img, (card_obj.dimensions.left_margin_club_badge, 350), club_badge_img)
-
-
-def add_player_attributes_section(draw, card_obj, font_colour, player, attribute_value_font, attribute_label_font):
-    language_code = player.language.name
-
-    atr1_label = languages_dict.get(language_code).get('attribute_labels')[0]
-    atr2_label = languages_dict.get(language_code).get('attribute_labels')[1]
-    atr3_label = languages_dict.get(language_code).get('attribute_labels')[2]
-    atr4_label = languages_dict.get(language_code).get('attribute_labels')[3]
-    atr5_label = languages_dict.get(language_code).get('attribute_labels')[4]
-    atr6_label = languages_dict.get(language_code).get('attribute_labels')[5]
-
-    '''
-    Draw the first column of stats and labels
-    '''
-    # PAC attr and label
-    draw.text((card_obj.dimensions.left_margin_attr_value_col1, card_obj.dimensions.top_margin_stats_row_1_values), str(player.pac), fill=font_colour,
-              font=attribute_value_font)
-    draw.text((card_obj.dimensions.left_margin_attr_label_col1, card_obj.dimensions.top_margin_stats_row_1_labels), atr1_label, fill=font_colour, font=attribute_label_font)
-    # SHO attr and label
-    draw.text((card_obj.dimensions.left_margin_attr_value_col1, card_obj.dimensions.top_margin_stats_row_2_values), str(player.sho), fill=font_colour,
-              font=attribute_value_font)
-    draw.text((card_obj.dimensions.left_margin_attr_label_col1, card_obj.dimensions.top_margin_stats_row_2_labels), atr3_label, fill=font_colour, font=attribute_label_font)
-    # PAS attr and label
-    draw.text((card_obj.dimensions.left_margin_attr_value_col1, card_obj.dimensions.top_margin_stats_row_3_values), str(player.pas), fill=font_colour,
-              font=attribute_value_font)
-    draw.text((card_obj.dimensions.left_margin_attr_label_col1, card_obj.dimensions.top_margin_stats_row_3_labels), atr5_label, fill=font_colour, font=attribute_label_font)
-
-    '''
-    Draw the second column of stats and labels
-    '''
-    # DRI attr and label
-    draw.text((card_obj.dimensions.left_margin_attr_value_col2, card_obj.dimensions.top_margin_stats_row_1_values), str(player.dri), fill=font_colour,
-              font=attribute_value_font)
-    draw.text((card_obj.dimensions.left_margin_attr_label_col2, card_obj.dimensions.top_margin_stats_row_1_labels), atr2_label, fill=font_colour, font=attribute_label_font)
-    # DEF attr and label
-    draw.text((card_obj.dimensions.left_margin_attr_value_col2, card_obj.dimensions.top_margin_stats_row_2_values), str(player.deff), fill=font_colour,
-              font=attribute_value_font)
-    draw.text((card_obj.dimensions.left_margin_attr_label_col2, card_obj.dimensions.top_margin_stats_row_2_labels), atr4_label, fill=font_colour, font=attribute_label_font)
-    # PHY attr and label
-    draw.text((card_obj.dimensions.left_margin_attr_value_col2, card_obj.dimensions.top_margin_stats_row_3_values), str(player.phy), fill=font_colour,
-              font=attribute_value_font)
-    draw.text((card_obj.dimensions.left_margin_attr_label_col2, card_obj.dimensions.top_margin_stats_row_3_labels), atr6_label, fill=font_colour, font=attribute_label_font)
-
-
-def add_player_name_overall_and_position(draw, card_obj, font_colour_top, font_colour_bottom, player_name_left_margin, player_position_left_margin,
-                                         player, namefont, overallfont, positionfont):
-    # add player name
-    draw.text((player_name_left_margin, card_obj.dimensions.top_margin_name), player.name.upper(), fill=font_colour_bottom, font=namefont)
-    # add player overall rating
-    draw.text((card_obj.dimensions.left_margin_overall, card_obj.dimensions.top_margin_player_overall), str(player.overall), fill=font_colour_top, font=overallfont)
-    # add player position
-    draw.text((player_position_left_margin, card_obj.dimensions.top_margin_position), player.position.name, fill=font_colour_top, font=positionfont)
-
-
-def add_separator_lines(draw, card_obj, font_colour_top, font_colour_bottom):
-    LINE_WIDTH = 1
-
-    # draw line under position
-    draw.line((card_obj.dimensions.left_point_x_coordinate_line_under_position, card_obj.dimensions.top_margin_line_under_position,
-               card_obj.dimensions.right_point_x_coordinate_line_under_position, card_obj.dimensions.top_margin_line_under_position),
-              fill=font_colour_top, width=LINE_WIDTH)
-
-    # draw line under country flag
-    draw.line((card_obj.dimensions.left_point_x_coordinate_line_under_position, card_obj.dimensions.top_margin_line_under_country_flag,
-               card_obj.dimensions.right_point_x_coordinate_line_under_position, card_obj.dimensions.top_margin_line_under_country_flag),
-              fill=font_colour_top, width=LINE_WIDTH)
-
-    # draw line under name
-    draw.line((card_obj.dimensions.margin_line_under_name, card_obj.dimensions.top_margin_line_under_name,
-               draw.im.size[0] - card_obj.dimensions.margin_line_under_name, card_obj.dimensions.top_margin_line_under_name),
-              fill=font_colour_bottom, width=LINE_WIDTH)
-
-    # draw line under stats
-    draw.line((card_obj.dimensions.margin_line_under_stats, card_obj.dimensions.top_margin_line_under_stats,
-               draw.im.size[0] - card_obj.dimensions.margin_line_under_stats, card_obj.dimensions.top_margin_line_under_stats),
-              fill=font_colour_bottom, width=LINE_WIDTH)
-
-    # draw vertical line between stats columns
-    draw.line(((draw.im.size[0] / 2), card_obj.dimensions.top_margin_vertical_line_between_stats_columns,
-               (draw.im.size[0] / 2), card_obj.dimensions.bottom_point_vertical_line_between_stats_columns),
-              fill=font_colour_bottom, width=LINE_WIDTH)
-
-              
+    return club_badge_img.resize((club_badge_img_width, club_badge_img_height), Image.LANCZOS)
@@ -1,13 +1,78 @@
 """
 Simple JSON-based database for storing player cards
 قاعدة بيانات بسيطة لتخزين بطاقات اللاعبين
+
+Cards can also be kept in an indexed SQLite database (O(1) lookups by id and single-row writes)
+by setting DATABASE_BACKEND to 'sqlite' or the CARDS_DATABASE_BACKEND environment variable.
+The functions below behave the same with either backend. To copy an existing JSON database:
+    python database.py migrate
+
+sample_cards draws random cards for formations (one per position slot, filtered and optionally
+weighted by overall) from the same per-value buckets, in O(k) for k cards.
+
+The database is also the index of the finished cards: query_cards pages through them newest
+first with filters, instead of scanning the output directory. The web server and batch.render_batch
+(so batch.py and ingest.py) add every card they render. Cards rendered before they were saved to
+the database, or by calling cardcreator.render_card directly, can be added from their metadata files:
+    python database.py reindex [finished-fut-cards]
 """
 
+import heapq
+import itertools
 import json
 import os
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left, insort
 from datetime import datetime
 
+from job_ids import publish_file
+from sqlite_store import (FILTER_COLUMNS, SqliteCardStore, card_filter_value, migrate_json_to_sqlite,
+                          normalize_filter_value)
+
 DATABASE_FILE = 'cards_database.json'
+SQLITE_DATABASE_FILE = 'cards_database.sqlite3'
+# 'json' or 'sqlite'
+DATABASE_BACKEND = os.environ.get('CARDS_DATABASE_BACKEND', 'json')
+
+# cards per page of query_cards
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# fields query_cards filters on by equality (overall is filtered by range)
+QUERY_FILTER_FIELDS = tuple(field for field, _ in FILTER_COLUMNS.values() if field != 'overall')
+
+# how sample_cards picks among matching cards: 'uniform', or 'overall' (chance proportional to the rating)
+SAMPLE_WEIGHTS = ('uniform', 'overall')
+# overall rating with the full chance of being kept by weighted sampling, lower ratings are kept proportionally less
+WEIGHT_FULL_OVERALL = 99
+# missed draws in a row after which sampling counts the matching cards, if they are few
+SAMPLE_MISSES_BEFORE_COUNT = 32
+
+_sqlite_stores = {}
+_sqlite_stores_lock = threading.Lock()
+
+# in-memory view of the JSON database, reloaded only when the file changes; read and changed under
+# _card_index_lock, and never handed out: callers get copies of its cards
+_card_index = None
+_card_index_lock = threading.RLock()
+
+
+def use_sqlite():
+    """True if the SQLite backend is selected"""
+    return DATABASE_BACKEND == 'sqlite'
+
+
+def get_sqlite_store():
+    """Return the SQLite store for SQLITE_DATABASE_FILE, opening it on first use"""
+    with _sqlite_stores_lock:
+        store = _sqlite_stores.get(SQLITE_DATABASE_FILE)
+        if store is None:
+            store = SqliteCardStore(SQLITE_DATABASE_FILE)
+            _sqlite_stores[SQLITE_DATABASE_FILE] = store
+        return store
+
 
 def load_database():
     """Load database from JSON file"""
@@ -21,15 +86,181 @@ def load_database():
     return {'cards': []}
 
 def save_database(db):
-    """Save database to JSON file"""
+    """Save database to JSON file, replaced atomically so readers and crashes never see a partial file"""
     try:
-        with open(DATABASE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(db, f, indent=2, ensure_ascii=False)
+        publish_file(DATABASE_FILE, json.dumps(db, indent=2, ensure_ascii=False).encode('utf-8'))
         return True
     except Exception as e:
         print(f"Error saving database: {e}")
         return False
 
+class CardIndex:
+    """
+    Parsed JSON database with its cards indexed by id
+
+    signature is the (path, mtime, size) of the file the index was loaded from, so changes made
+    by other processes are noticed with a single stat call.
+
+    postings maps each (filter field, normalized value) to the sorted positions of the cards
+    with that value, so filtered listings only visit matching cards. overall_postings holds the
+    ('overall', value) lists by value, the buckets an overall range is read from.
+    """
+
+    def __init__(self, db, signature):
+        self.db = db
+        self.cards = db['cards']
+        self.signature = signature
+        self.reindex()
+
+    def reindex(self):
+        self.positions = {card['id']: i for i, card in enumerate(self.cards)}
+        self.postings = {}
+        self.overall_postings = {}
+        for position, card in enumerate(self.cards):
+            for key in filter_keys(card):
+                self.key_postings(key).append(position)
+
+    def key_postings(self, key):
+        """Posting list of a key, created empty on first use"""
+        postings = self.postings.get(key)
+        if postings is None:
+            postings = self.postings[key] = []
+            if key[0] == 'overall':
+                self.overall_postings[key[1]] = postings
+        return postings
+
+    def overall_range_postings(self, min_overall=None, max_overall=None):
+        """Posting lists of the overall values between min_overall and max_overall (inclusive)"""
+        return [postings for value, postings in self.overall_postings.items()
+                if (min_overall is None or value >= min_overall) and (max_overall is None or value <= max_overall)]
+
+    def append(self, card):
+        position = len(self.cards)
+        self.positions[card['id']] = position
+        self.cards.append(card)
+        for key in filter_keys(card):
+            self.key_postings(key).append(position)
+
+    def replace(self, position, card):
+        for key in filter_keys(self.cards[position]):
+            postings = self.postings[key]
+            del postings[bisect_left(postings, position)]
+        self.cards[position] = card
+        for key in filter_keys(card):
+            insort(self.key_postings(key), position)
+
+
+def filter_keys(card):
+    """(field, normalized value) of each equality filter field of a card, and of its overall if it has one"""
+    keys = [(field, card_filter_value(card, field)) for field in QUERY_FILTER_FIELDS]
+    overall = card_filter_value(card, 'overall')
+    if overall is not None:
+        keys.append(('overall', overall))
+    return keys
+
+
+def in_postings(postings, position):
+    """Whether a sorted posting list holds a position"""
+    i = bisect_left(postings, position)
+    return i < len(postings) and postings[i] == position
+
+
+def positions_before(postings, end):
+    """Positions below end in a sorted posting list, largest first"""
+    return (postings[i] for i in range(bisect_left(postings, end) - 1, -1, -1))
+
+
+def descending_positions(postings_lists, end):
+    """Positions below end in any of the sorted posting lists, largest first"""
+    if len(postings_lists) == 1:
+        return positions_before(postings_lists[0], end)
+    return heapq.merge(*(positions_before(postings, end) for postings in postings_lists), reverse=True)
+
+
+def database_file_signature():
+    """(path, mtime in ns, size) of the JSON database file, or None if it doesn't exist"""
+    try:
+        stat = os.stat(DATABASE_FILE)
+    except OSError:
+        return None
+    return DATABASE_FILE, stat.st_mtime_ns, stat.st_size
+
+
+def get_card_index():
+    """Return the in-memory card index, re-parsing the JSON file only if it changed since the last load"""
+    global _card_index
+    with _card_index_lock:
+        signature = database_file_signature()
+        if _card_index is None or _card_index.signature != signature:
+            _card_index = CardIndex(load_database(), signature)
+        return _card_index
+
+
+def save_indexed_database(index):
+    """Write the index back to the JSON file and remember the new file signature"""
+    saved = save_database(index.db)
+    # if the write failed the file no longer matches memory, force a reload on the next read
+    index.signature = database_file_signature() if saved else None
+    return saved
+
+
+def add_cards_to_database(cards):
+    """
+    Add or update many cards with a single database write
+    
+    Args:
+        cards: Iterable of (card_id, player_data) pairs, as for add_card_to_database
+    
+    Returns:
+        bool: Success status
+    """
+    card_entries = [build_card_entry(card_id, player_data) for card_id, player_data in cards]
+    if not card_entries:
+        return True
+    
+    if use_sqlite():
+        try:
+            get_sqlite_store().put_many(card_entries)
+            return True
+        except Exception as e:
+            print(f"Error saving database: {e}")
+            return False
+    
+    with _card_index_lock:
+        index = get_card_index()
+        for card_entry in card_entries:
+            existing_index = index.positions.get(card_entry['id'])
+            if existing_index is not None:
+                index.replace(existing_index, card_entry)
+            else:
+                index.append(card_entry)
+        return save_indexed_database(index)
+
+def card_metadata(data, output_path, has_image):
+    """Metadata of a rendered card from its /api/create-card fields, as saved next to it and in the database"""
+    return {
+        'name': str(data['name']).upper(),
+        'position': data['position'],
+        'overall': int(data['overall']),
+        'pac': int(data['pac']),
+        'dri': int(data['dri']),
+        'sho': int(data['sho']),
+        'def': int(data['def']),
+        'pas': int(data['pas']),
+        'phy': int(data['phy']),
+        'club': data['club'],
+        'country': data['country'],
+        'cardType': data['cardType'],
+        'timestamp': int(time.time()),
+        'hasImage': has_image,
+        'filename': os.path.basename(output_path)
+    }
+
+def write_card_metadata(output_path, metadata):
+    """Write a card's metadata file (<card>_metadata.json, read back by reindex) next to its image"""
+    metadata_path = os.path.splitext(output_path)[0] + '_metadata.json'
+    publish_file(metadata_path, json.dumps(metadata, indent=2, ensure_ascii=False).encode('utf-8'))
+
 def add_card_to_database(card_id, player_data):
     """
     Add a card to the database
@@ -41,10 +272,35 @@ def add_card_to_database(card_id, player_data):
     Returns:
         bool: Success status
     """
-    db = load_database()
+    card_entry = build_card_entry(card_id, player_data)
     
-    # Create card entry
-    card_entry = {
+    if use_sqlite():
+        try:
+            get_sqlite_store().put(card_entry)
+            return True
+        except Exception as e:
+            print(f"Error saving database: {e}")
+            return False
+    
+    with _card_index_lock:
+        index = get_card_index()
+        
+        # Check if card already exists
+        existing_index = index.positions.get(card_id)
+        
+        if existing_index is not None:
+            # Update existing card
+            index.replace(existing_index, card_entry)
+        else:
+            # Add new card
+            index.append(card_entry)
+        
+        # Save to file
+        return save_indexed_database(index)
+
+def build_card_entry(card_id, player_data):
+    """Create the card entry stored in the database"""
+    return {
         'id': card_id,
         'name': player_data.get('name', ''),
         'position': player_data.get('position', ''),
@@ -62,55 +318,346 @@ def add_card_to_database(card_id, player_data):
         'filename': player_data.get('filename', ''),
         'hasImage': player_data.get('hasImage', False)
     }
-    
-    # Check if card already exists
-    existing_index = None
-    for i, card in enumerate(db['cards']):
-        if card['id'] == card_id:
-            existing_index = i
-            break
-    
-    if existing_index is not None:
-        # Update existing card
-        db['cards'][existing_index] = card_entry
-    else:
-        # Add new card
-        db['cards'].append(card_entry)
-    
-    # Save to file
-    return save_database(db)
 
 def get_card_by_id(card_id):
     """Get a card by its ID"""
-    db = load_database()
-    for card in db['cards']:
-        if card['id'] == card_id:
-            return card
-    return None
+    if use_sqlite():
+        return get_sqlite_store().get(card_id)
+    with _card_index_lock:
+        index = get_card_index()
+        position = index.positions.get(card_id)
+        return dict(index.cards[position]) if position is not None else None
 
 def get_all_cards():
     """Get all cards from database"""
-    db = load_database()
-    return db['cards']
+    if use_sqlite():
+        return get_sqlite_store().all()
+    with _card_index_lock:
+        return [dict(card) for card in get_card_index().cards]
 
 def get_random_cards(count=6):
     """Get random cards from database"""
     import random
-    db = load_database()
-    cards = db['cards']
+    if use_sqlite():
+        return get_sqlite_store().random(count)
+    with _card_index_lock:
+        cards = get_card_index().cards
+        
+        if len(cards) == 0:
+            return []
+        
+        # If we have fewer cards than requested, return all
+        if len(cards) <= count:
+            return [dict(card) for card in cards]
+        
+        # Return random selection
+        return [dict(card) for card in random.sample(cards, count)]
+
+def query_cards(filters=None, min_overall=None, max_overall=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Page through the cards newest first, keeping those matching every filter
+    
+    Args:
+        filters (dict): Wanted value of any of QUERY_FILTER_FIELDS (cardType, position, club, country)
+        min_overall (int): Lowest overall rating, inclusive
+        max_overall (int): Highest overall rating, inclusive
+        cursor (str): nextCursor of the previous page (the id of its last card), None for the first page
+        limit (int): Cards per page
+    
+    Returns:
+        tuple: (list of cards, cursor of the next page or None on the last page)
     
-    if len(cards) == 0:
-        return []
+    Raises:
+        ValueError: If the cursor is unknown or a filter value is invalid
+    """
+    filters = check_filters(filters)
+    
+    if use_sqlite():
+        return get_sqlite_store().query(filters, min_overall, max_overall, cursor, limit)
     
-    # If we have fewer cards than requested, return all
-    if len(cards) <= count:
-        return cards
+    matches = CardFilter(filters, min_overall, max_overall)
+    wanted = list(matches.wanted.items())
     
-    # Return random selection
-    return random.sample(cards, count)
+    with _card_index_lock:
+        index = get_card_index()
+        end = len(index.cards)
+        if cursor is not None:
+            end = index.positions.get(cursor)
+            if end is None:
+                raise ValueError(f'Invalid cursor ({cursor})')
+        
+        # walk the smallest candidate set backwards from the cursor, checking the other filters per card:
+        # the shortest posting list of the equality filters, or the overall buckets of the range
+        candidates = [min((index.postings.get(key, []) for key in wanted), key=len)] if wanted else None
+        if matches.min_overall is not None or matches.max_overall is not None:
+            overall_candidates = index.overall_range_postings(matches.min_overall, matches.max_overall)
+            if candidates is None or sum(map(len, overall_candidates)) < len(candidates[0]):
+                candidates = overall_candidates
+        if candidates is None:
+            positions = range(end - 1, -1, -1)
+        else:
+            positions = descending_positions(candidates, end)
+        
+        page = []
+        for position in positions:
+            card = index.cards[position]
+            if matches(card):
+                page.append(dict(card))
+                if len(page) > limit:
+                    break
+    
+    next_cursor = page[limit - 1]['id'] if len(page) > limit else None
+    return page[:limit], next_cursor
+
+def check_filters(filters):
+    """Drop unset filters, raising ValueError for fields that can't be filtered on"""
+    filters = {field: value for field, value in (filters or {}).items() if value is not None}
+    unknown = set(filters) - set(QUERY_FILTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+    return filters
+
+class CardFilter:
+    """
+    Callable telling whether a card has the filter values and an overall in the range
+    
+    Raises:
+        ValueError: If a filter value is invalid
+    """
+    
+    def __init__(self, filters=None, min_overall=None, max_overall=None):
+        self.wanted = {field: normalize_filter_value(field, value) for field, value in (filters or {}).items()}
+        self.min_overall = None if min_overall is None else normalize_filter_value('overall', min_overall)
+        self.max_overall = None if max_overall is None else normalize_filter_value('overall', max_overall)
+    
+    def __call__(self, card):
+        if any(card_filter_value(card, field) != value for field, value in self.wanted.items()):
+            return False
+        if self.min_overall is None and self.max_overall is None:
+            return True
+        overall = card_filter_value(card, 'overall')
+        if overall is None:
+            return False
+        return (self.min_overall is None or overall >= self.min_overall) and \
+            (self.max_overall is None or overall <= self.max_overall)
+
+def card_weight(card):
+    """Weight of a card with overall weighting, between 1 and WEIGHT_FULL_OVERALL"""
+    overall = card_filter_value(card, 'overall') or 0
+    return min(max(overall, 1), WEIGHT_FULL_OVERALL)
+
+class BucketSampler:
+    """
+    Random draws among the cards of the JSON index matching a CardFilter
+    
+    Each filter value reads from a bucket of positions: its posting list, or the overall lists of the
+    range. A single bucket is drawn from as is; several are intersected starting from the smallest,
+    so the candidate lists and their sizes are built once per sample_cards call and every draw is a
+    couple of random choices.
+    """
+    
+    def __init__(self, index, matches):
+        self.cards = index.cards
+        equal = sorted((index.postings.get(key, []) for key in matches.wanted.items()), key=len)
+        in_range = None
+        if matches.min_overall is not None or matches.max_overall is not None:
+            in_range = [postings for postings in index.overall_range_postings(matches.min_overall, matches.max_overall)
+                        if postings]
+        
+        if not equal:
+            self.lists = [range(len(self.cards))] if in_range is None else in_range
+        elif in_range is None and len(equal) == 1:
+            self.lists = equal
+        else:
+            if in_range is not None and sum(map(len, in_range)) < len(equal[0]):
+                positions, others = sorted(itertools.chain(*in_range)), equal
+            else:
+                positions, others = equal[0], equal[1:]
+            for postings in others:
+                positions = [position for position in positions if in_postings(postings, position)]
+            if in_range is not None:
+                positions = [position for position in positions if matches(self.cards[position])]
+            self.lists = [positions]
+        self.cum_sizes = list(itertools.accumulate(map(len, self.lists)))
+        self.size = self.cum_sizes[-1] if self.cum_sizes else 0
+    
+    def draw(self):
+        """One random matching card (there are none when size is 0)"""
+        if len(self.lists) == 1:
+            return self.cards[random.choice(self.lists[0])]
+        positions = random.choices(self.lists, cum_weights=self.cum_sizes)[0]
+        return self.cards[random.choice(positions)]
+    
+    def list_if_few(self):
+        """Nothing to do, the size of a BucketSampler is always known"""
+    
+    def cards_left(self, exclude_ids):
+        """Every matching card whose id isn't in exclude_ids"""
+        return [self.cards[position] for positions in self.lists for position in positions
+                if self.cards[position]['id'] not in exclude_ids]
+
+def sample_cards(count=6, slots=None, filters=None, min_overall=None, max_overall=None, weight='uniform'):
+    """
+    Draw distinct random cards for a formation
+    
+    Args:
+        count (int): Number of cards, when no slots are given
+        slots (list): Position of each wanted card (e.g. ['GK', 'CB', 'CB', 'ST']), one card per slot
+        filters (dict): Wanted value of any of QUERY_FILTER_FIELDS, for every card
+        min_overall (int): Lowest overall rating, inclusive
+        max_overall (int): Highest overall rating, inclusive
+        weight (str): 'uniform', or 'overall' to favour higher rated cards (see SAMPLE_WEIGHTS)
+    
+    Each distinct slot gets one sampler, made once per call: the candidate buckets of the JSON index
+    (see BucketSampler) or the seq bounds of the matching SQLite rows (see sqlite_store.CardSampler).
+    Cards are then drawn from it until one isn't already chosen and passes the weighting, so a card
+    costs a few lookups instead of a scan.
+    
+    Returns:
+        list: (slot, card) pairs of the filled slots (slot is None without slots)
+    
+    Raises:
+        ValueError: If the weight or a filter is invalid
+    """
+    if weight not in SAMPLE_WEIGHTS:
+        raise ValueError(f"Invalid weight ({weight}), expected one of: {', '.join(SAMPLE_WEIGHTS)}")
+    filters = check_filters(filters)
+    slots = list(slots) if slots else [None] * count
+    
+    chosen = []
+    chosen_ids = set()
+    samplers = {}
+    with _card_index_lock:
+        index = None if use_sqlite() else get_card_index()
+        for slot in slots:
+            sampler = samplers.get(slot)
+            if sampler is None:
+                slot_filters = dict(filters, position=slot) if slot else filters
+                if index is None:
+                    sampler = get_sqlite_store().sampler(slot_filters, min_overall, max_overall)
+                else:
+                    sampler = BucketSampler(index, CardFilter(slot_filters, min_overall, max_overall))
+                samplers[slot] = sampler
+            card = sample_card(sampler, weight, chosen_ids)
+            if card is not None:
+                chosen_ids.add(card['id'])
+                chosen.append((slot, dict(card)))
+    return chosen
+
+def sample_card(sampler, weight, exclude_ids):
+    """
+    One random card of a sampler not in exclude_ids, or None (see sample_cards)
+    
+    While more than half of the sampler's cards may still be free, random draws are retried until one
+    is; past that point the few cards left are listed and chosen from. A sampler that doesn't know
+    its size (see sqlite_store.CardSampler) is asked to count its cards, if they are few, after
+    SAMPLE_MISSES_BEFORE_COUNT draws in a row missed or returned a chosen card.
+    """
+    misses = 0
+    while True:
+        if sampler.size is not None and sampler.size <= 2 * len(exclude_ids):
+            candidates = sampler.cards_left(exclude_ids)
+            if not candidates:
+                return None
+            if weight == 'overall':
+                return random.choices(candidates, weights=[card_weight(card) for card in candidates])[0]
+            return random.choice(candidates)
+        
+        card = sampler.draw()
+        if card is None or card['id'] in exclude_ids:
+            misses += 1
+            if misses == SAMPLE_MISSES_BEFORE_COUNT:
+                sampler.list_if_few()
+            continue
+        if weight == 'overall' and random.random() * WEIGHT_FULL_OVERALL >= card_weight(card):
+            continue
+        return card
+
+def index_card_directory(output_dir):
+    """
+    Add the cards of an output directory missing from the database, read from their metadata files
+    
+    Cards are added oldest first, with their id taken from the file name and their creation time
+    from the metadata timestamp.
+    
+    Returns:
+        int: Number of added cards
+    """
+    entries = []
+    for filename in os.listdir(output_dir):
+        if not filename.endswith('_metadata.json'):
+            continue
+        card_id = filename[:-len('_metadata.json')]
+        if get_card_by_id(card_id) is not None:
+            continue
+        try:
+            with open(os.path.join(output_dir, filename), 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+        except Exception as e:
+            print(f"Could not load metadata {filename}: {e}")
+            continue
+        if not metadata.get('filename') or not os.path.exists(os.path.join(output_dir, metadata['filename'])):
+            continue
+        card_entry = build_card_entry(card_id, metadata)
+        if metadata.get('timestamp'):
+            card_entry['created_at'] = datetime.fromtimestamp(metadata['timestamp']).isoformat()
+        # metadata timestamps are whole seconds, the file time orders cards made in the same second
+        entries.append((card_entry['created_at'], os.path.getmtime(os.path.join(output_dir, filename)), card_entry))
+    
+    entries = [card_entry for _, _, card_entry in sorted(entries, key=lambda entry: entry[:2])]
+    if not entries:
+        return 0
+    if use_sqlite():
+        return get_sqlite_store().put_many(entries)
+    with _card_index_lock:
+        index = get_card_index()
+        for card_entry in entries:
+            index.append(card_entry)
+        save_indexed_database(index)
+    return len(entries)
 
 def delete_card(card_id):
     """Delete a card from database"""
-    db = load_database()
-    db['cards'] = [card for card in db['cards'] if card['id'] != card_id]
-    return save_database(db)
+    if use_sqlite():
+        try:
+            get_sqlite_store().delete(card_id)
+            return True
+        except Exception as e:
+            print(f"Error saving database: {e}")
+            return False
+    with _card_index_lock:
+        index = get_card_index()
+        if card_id not in index.positions:
+            return True
+        index.cards[:] = [card for card in index.cards if card['id'] != card_id]
+        index.reindex()
+        return save_indexed_database(index)
+
+def migrate_to_sqlite(json_path=None, sqlite_path=None):
+    """
+    One-shot copy of the JSON database into the SQLite database
+    
+    Returns:
+        int: Number of migrated cards
+    """
+    return migrate_json_to_sqlite(json_path or DATABASE_FILE, sqlite_path or SQLITE_DATABASE_FILE)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['reindex']:
+        output_dir = sys.argv[2] if len(sys.argv) > 2 else 'finished-fut-cards'
+        added = index_card_directory(output_dir)
+        print(f"✅ Added {added} cards from {output_dir} to the {DATABASE_BACKEND} database")
+        sys.exit(0)
+    
+    if sys.argv[1:2] != ['migrate']:
+        print('Usage: python database.py migrate [cards_database.json] [cards_database.sqlite3]')
+        print('       python database.py reindex [finished-fut-cards]')
+        sys.exit(1)
+    
+    args = sys.argv[2:]
+    json_path = args[0] if len(args) > 0 else DATABASE_FILE
+    sqlite_path = args[1] if len(args) > 1 else SQLITE_DATABASE_FILE
+    migrated = migrate_to_sqlite(json_path, sqlite_path)
+    print(f"✅ Migrated {migrated} cards from {json_path} to {sqlite_path}")
+    print("Set CARDS_DATABASE_BACKEND=sqlite to use it")
@@ -0,0 +1,170 @@
+"""
+Download player images over pooled connections with timeouts, a size limit and a disk cache
+تحميل صور اللاعبين مع مهلة زمنية وحد أقصى للحجم وذاكرة مؤقتة على القرص
+
+Downloads are cached by URL in image-cache/. A cached image younger than FRESH_SECONDS is used
+as is; an older one is revalidated with If-None-Match / If-Modified-Since so an unchanged image
+costs a 304 instead of a full download.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from render_cache import DiskLRUCache
+from resources.exceptions import PlayerImageFetchError
+
+IMAGE_CACHE_DIR = 'image-cache'
+IMAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# seconds to establish the connection / between bytes received
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+# downloads larger than this are aborted while streaming
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+# cached images younger than this are used without asking the server
+FRESH_SECONDS = 300
+# keep-alive connections kept per host
+POOL_MAXSIZE = 16
+# concurrent downloads used by prefetch_images
+PREFETCH_CONCURRENCY = 8
+
+_session = None
+_session_lock = threading.Lock()
+
+image_cache = DiskLRUCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
+
+
+def get_session():
+    """Return the process wide requests session with its pool of keep-alive connections"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_MAXSIZE, pool_maxsize=POOL_MAXSIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def url_cache_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def read_cached_image(url):
+    """Return (metadata, body) of the cached download for url, or (None, None)"""
+    data = image_cache.get_bytes(url_cache_key(url), 'img')
+    if data is None:
+        return None, None
+    header, _, body = data.partition(b'\n')
+    try:
+        metadata = json.loads(header)
+    except ValueError:
+        return None, None
+    if metadata.get('url') != url:
+        return None, None
+    return metadata, body
+
+
+def write_cached_image(url, etag, last_modified, body):
+    metadata = {
+        'url': url,
+        'etag': etag,
+        'last_modified': last_modified,
+        'fetched_at': time.time(),
+    }
+    try:
+        image_cache.put(url_cache_key(url), json.dumps(metadata).encode('utf-8') + b'\n' + body, 'img')
+    except OSError as e:
+        # the image was downloaded, a failed cache write only costs a download next time
+        print(f"Error writing to the image cache: {e}")
+
+
+def read_limited_body(response, max_bytes):
+    """Read a streamed response body, aborting as soon as it grows past max_bytes"""
+    content_length = response.headers.get('Content-Length')
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise PlayerImageFetchError(f'Image is too large ({content_length} bytes, limit {max_bytes}).')
+
+    chunks = []
+    received = 0
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        received += len(chunk)
+        if received > max_bytes:
+            raise PlayerImageFetchError(f'Image is too large (more than {max_bytes} bytes).')
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def fetch_image(url, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), max_bytes=MAX_IMAGE_BYTES, use_cache=True):
+    """
+    Download an image and return its bytes
+
+    Raises:
+        PlayerImageFetchError: On a non 200/304 status, a timeout, a connection error or an
+                               image larger than max_bytes
+    """
+    metadata, cached_body = read_cached_image(url) if use_cache else (None, None)
+
+    headers = {}
+    if metadata is not None:
+        if time.time() - metadata.get('fetched_at', 0) < FRESH_SECONDS:
+            return cached_body
+        if metadata.get('etag'):
+            headers['If-None-Match'] = metadata['etag']
+        if metadata.get('last_modified'):
+            headers['If-Modified-Since'] = metadata['last_modified']
+
+    try:
+        with get_session().get(url, headers=headers, timeout=timeout, stream=True) as response:
+            if response.status_code == 304 and cached_body is not None:
+                # unchanged, refresh the cache entry so it counts as fresh again
+                write_cached_image(url, response.headers.get('ETag', metadata.get('etag')),
+                                   response.headers.get('Last-Modified', metadata.get('last_modified')), cached_body)
+                return cached_body
+            if response.status_code != 200:
+                raise PlayerImageFetchError(f'Downloading {url} failed with status {response.status_code}.')
+            body = read_limited_body(response, max_bytes)
+            etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+    except requests.RequestException as e:
+        raise PlayerImageFetchError(f'Downloading {url} failed: {e}') from e
+
+    if use_cache:
+        write_cached_image(url, etag, last_modified, body)
+    return body
+
+
+async def fetch_image_async(url, **kwargs):
+    """asyncio version of fetch_image, the blocking download runs in a worker thread"""
+    return await asyncio.to_thread(fetch_image, url, **kwargs)
+
+
+async def prefetch_images(urls, concurrency=PREFETCH_CONCURRENCY):
+    """
+    Download many images concurrently into the disk cache
+
+    Returns a dict of url -> bytes, or the PlayerImageFetchError raised for that url
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    urls = list(dict.fromkeys(urls))
+
+    async def fetch(url):
+        async with semaphore:
+            try:
+                return await fetch_image_async(url)
+            except PlayerImageFetchError as e:
+                return e
+
+    results = await asyncio.gather(*(fetch(url) for url in urls))
+    return dict(zip(urls, results))
+
+
+def prefetch_images_sync(urls, concurrency=PREFETCH_CONCURRENCY):
+    """Run prefetch_images from synchronous code"""
+    return asyncio.run(prefetch_images(urls, concurrency))
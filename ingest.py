@@ -0,0 +1,292 @@
+"""
+Stream large player files in chunks, validate them column by column and render the valid rows
+قراءة ملفات اللاعبين الكبيرة على دفعات والتحقق منها قبل إنشاء البطاقات
+
+Usage:
+    python ingest.py league.csv
+    python ingest.py league.jsonl --rejects rejects.jsonl --workers 4 --card-code RARE_GOLD
+    python ingest.py league.parquet --validate-only
+    python ingest.py league.csv --renditions 128
+
+Rows use the same fields as batch.py (name, position, club, country, overall, pac, dri, sho, def,
+pas, phy, cardType, and the optional id, language, image and dynamic). Files are read CHUNK_SIZE
+rows at a time: CSV and JSON lines through batch.read_players, Parquet (with pyarrow installed)
+one record batch at a time. Each chunk is turned into columns and every check runs as one pass
+over a column against sets built once per process: the languages, the positions of each language,
+the country codes of assets/nations/countries.json, the club ids of assets/clubs and the card codes.
+
+Rejected rows are reported with their row number (1 = first data row) and every reason they
+failed, optionally to a JSON lines file. A JSON line that can't be parsed is a rejected row too,
+reported with its raw text, and reading goes on with the next line. Valid rows are handed to batch.render_batch as they are
+validated, so only a chunk and the rows in flight are ever in memory.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+
+from batch import IN_FLIGHT_PER_WORKER, InvalidLine, create_render_pool, read_players, render_batch
+from output_encoder import OUTPUT_PRESETS, get_output_options
+from renditions import RENDITION_WIDTHS, parse_rendition_widths
+from resources.cardcode_to_card import cardcode_to_card
+from resources.languages_dictionary import languages_dict
+from resources.positions import position_lookup
+
+# rows validated together
+CHUNK_SIZE = int(os.environ.get('INGEST_CHUNK_SIZE', 5000))
+COUNTRIES_FILE = 'assets/nations/countries.json'
+CLUBS_DIR = 'assets/clubs'
+REQUIRED_FIELDS = ('name', 'position', 'club', 'country', 'overall', 'pac', 'dri', 'sho', 'def', 'pas', 'phy')
+STAT_FIELDS = ('overall', 'pac', 'dri', 'sho', 'def', 'pas', 'phy')
+# inclusive range of the overall rating and attribute values (two digits on the card)
+STAT_RANGE = (0, 99)
+
+# row_number counts data rows from 1, reasons lists every check the row failed
+RejectedRow = namedtuple('RejectedRow', 'row_number row reasons')
+
+_country_codes = None
+_club_ids = None
+
+
+def country_codes():
+    """Upper case country codes of assets/nations/countries.json, loaded once"""
+    global _country_codes
+    if _country_codes is None:
+        with open(COUNTRIES_FILE, encoding='utf-8') as f:
+            _country_codes = frozenset(code.upper() for code in json.load(f))
+    return _country_codes
+
+
+def club_ids():
+    """Ids of the clubs with a badge in assets/clubs, listed once"""
+    global _club_ids
+    if _club_ids is None:
+        _club_ids = frozenset(os.path.splitext(name)[0] for name in os.listdir(CLUBS_DIR) if name.endswith('.png'))
+    return _club_ids
+
+
+def read_parquet_chunks(path, chunk_size):
+    """
+    Yield the record batches of a Parquet file as {field: [values]} columns
+
+    Raises:
+        ValueError: If pyarrow is not installed
+    """
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError('Reading Parquet files needs pyarrow (pip install pyarrow)')
+    for record_batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield record_batch.to_pydict()
+
+
+def rows_to_columns(rows):
+    """Turn a chunk of rows (dicts) into {field: [values]}, None where a row lacks the field"""
+    fields = dict.fromkeys(field for row in rows if isinstance(row, dict) for field in row)
+    return {field: [row.get(field) if isinstance(row, dict) else None for row in rows] for field in fields}
+
+
+def columns_to_rows(columns, size):
+    fields = list(columns)
+    return [dict(zip(fields, values)) for values in zip(*columns.values())] if fields else [{}] * size
+
+
+def rows_and_invalid_lines(path):
+    """Rows of batch.read_players, with an InvalidLine in the place of each JSON line that couldn't be parsed"""
+    invalid_lines = []
+    for row in read_players(path, invalid_lines.append):
+        # read_players reports the bad lines before the row that follows them
+        yield from invalid_lines
+        invalid_lines.clear()
+        yield row
+    yield from invalid_lines
+
+
+def read_column_chunks(path, chunk_size=CHUNK_SIZE):
+    """
+    Yield (rows, columns) chunks of at most chunk_size rows of a CSV, JSON / JSON lines or Parquet file
+
+    JSON lists are parsed whole by batch.read_players; use JSON lines for files that don't fit in memory.
+    """
+    if path.lower().endswith('.parquet'):
+        for columns in read_parquet_chunks(path, chunk_size):
+            yield columns_to_rows(columns, len(next(iter(columns.values()), ()))), columns
+        return
+
+    rows = rows_and_invalid_lines(path)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk, rows_to_columns(chunk)
+
+
+def is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def parse_stat(value):
+    """Integer value of a rating or attribute, None if it isn't a whole number in STAT_RANGE"""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return number if STAT_RANGE[0] <= number <= STAT_RANGE[1] else None
+
+
+def validate_columns(columns, size, default_card_code=None):
+    """
+    Check a chunk of rows given as {field: [values]}, one pass per column
+
+    Args:
+        columns (dict): Field -> list of size values (None where a row lacks the field)
+        size (int): Number of rows in the chunk
+        default_card_code (str): Card code for rows without a cardType
+
+    Returns:
+        list: The reasons each row is invalid, an empty list for valid rows
+    """
+    reasons = [[] for _ in range(size)]
+    missing = [None] * size
+
+    def reject(failed, reason):
+        for index in itertools.compress(range(size), failed):
+            reasons[index].append(reason(index))
+
+    for field in REQUIRED_FIELDS:
+        reject([is_blank(value) for value in columns.get(field, missing)], lambda i, f=field: f'Missing {f}')
+
+    languages = [str(value or 'EN').upper() for value in columns.get('language', missing)]
+    reject([language not in languages_dict for language in languages],
+           lambda i: f'Invalid language ({languages[i]})')
+
+    # positions are checked in the row's language, English abbreviations are accepted in every language
+    positions = [str(value).upper() for value in columns.get('position', missing)]
+    reject([not is_blank(value) and language in position_lookup and position not in position_lookup[language]
+            for value, position, language in zip(columns.get('position', missing), positions, languages)],
+           lambda i: f'Invalid position ({positions[i]}) for language {languages[i]}')
+
+    countries = [str(value).upper() for value in columns.get('country', missing)]
+    valid_countries = country_codes()
+    reject([not is_blank(value) and country not in valid_countries
+            for value, country in zip(columns.get('country', missing), countries)],
+           lambda i: f'Unknown country ({countries[i]})')
+
+    clubs = [str(value) for value in columns.get('club', missing)]
+    valid_clubs = club_ids()
+    reject([not is_blank(value) and club not in valid_clubs
+            for value, club in zip(columns.get('club', missing), clubs)],
+           lambda i: f'Unknown club ({clubs[i]})')
+
+    for field in STAT_FIELDS:
+        values = columns.get(field, missing)
+        reject([not is_blank(value) and parse_stat(value) is None for value in values],
+               lambda i, f=field, v=values: f'Invalid {f} ({v[i]}), expected {STAT_RANGE[0]}-{STAT_RANGE[1]}')
+
+    card_codes = [str(value).upper() if not is_blank(value) else (default_card_code or '').upper()
+                  for value in columns.get('cardType', missing)]
+    reject([card_code not in cardcode_to_card for card_code in card_codes],
+           lambda i: f'Invalid cardType ({card_codes[i]})' if card_codes[i] else 'Missing cardType')
+
+    return reasons
+
+
+def validated_rows(path, on_reject=None, chunk_size=CHUNK_SIZE, default_card_code=None):
+    """
+    Yield the valid rows of a player file, chunk by chunk
+
+    Rows that aren't objects, or fail validate_columns, are passed to on_reject as RejectedRow.
+    """
+    row_number = 0
+    for rows, columns in read_column_chunks(path, chunk_size):
+        chunk_reasons = validate_columns(columns, len(rows), default_card_code)
+        for row, reasons in zip(rows, chunk_reasons):
+            row_number += 1
+            if isinstance(row, InvalidLine):
+                row, reasons = row.text, [f'Invalid JSON: {row.error}']
+            elif not isinstance(row, dict):
+                reasons = ['Row is not an object']
+            if reasons:
+                if on_reject is not None:
+                    on_reject(RejectedRow(row_number, row, reasons))
+                continue
+            yield row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate a large player file in chunks and render its valid rows')
+    parser.add_argument('input', help='CSV, JSON lines or Parquet file of players')
+    parser.add_argument('--rejects', default=None, help='write the rejected rows and their reasons to this JSON lines '
+                                                        'file (default: print them)')
+    parser.add_argument('--validate-only', action='store_true', help="check the file without rendering")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='rows validated together')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: all cores)')
+    parser.add_argument('--card-code', default=None, help='card code for rows without a cardType')
+    parser.add_argument('--id-prefix', default=None, help='prefix for the ids of rows without an id')
+    parser.add_argument('--no-prefetch', action='store_true', help="don't download image URLs ahead of rendering")
+    parser.add_argument('--output', default=None,
+                        help=f"output preset or format ({', '.join(OUTPUT_PRESETS)}, png, webp, jpeg, avif)")
+    parser.add_argument('--renditions', default='all',
+                        help=f"comma separated widths of the smaller renditions written next to each card "
+                             f"({', '.join(str(width) for width in RENDITION_WIDTHS)}), all or none (default: all)")
+    args = parser.parse_args(argv)
+
+    try:
+        output_options = get_output_options(args.output)
+        rendition_widths = parse_rendition_widths(args.renditions)
+    except ValueError as e:
+        parser.error(str(e))
+
+    counts = {'valid': 0, 'rejected': 0, 'rendered': 0, 'failed': 0}
+    rejects_file = open(args.rejects, 'w', encoding='utf-8') if args.rejects else None
+
+    def on_reject(rejected):
+        counts['rejected'] += 1
+        if rejects_file is not None:
+            rejects_file.write(json.dumps(rejected._asdict(), ensure_ascii=False, default=str) + '\n')
+        else:
+            print(f"⚠️  row {rejected.row_number}: {'; '.join(rejected.reasons)}", file=sys.stderr)
+
+    def counted(rows):
+        for row in rows:
+            counts['valid'] += 1
+            yield row
+
+    start = time.perf_counter()
+    try:
+        rows = counted(validated_rows(args.input, on_reject, args.chunk_size, args.card_code))
+        if args.validate_only:
+            for _ in rows:
+                pass
+        else:
+            workers = args.workers or os.cpu_count()
+            with create_render_pool(workers) as pool:
+                for result in render_batch(rows, pool, args.id_prefix, args.card_code, workers * IN_FLIGHT_PER_WORKER,
+                                           not args.no_prefetch, output_options, rendition_widths):
+                    if result['success']:
+                        counts['rendered'] += 1
+                        print(f"✅ {result['id']}: {result['path']}")
+                    else:
+                        counts['failed'] += 1
+                        print(f"❌ {result['id']}: {result['error']}", file=sys.stderr)
+    except ValueError as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+    finally:
+        if rejects_file is not None:
+            rejects_file.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Validated {counts['valid'] + counts['rejected']} rows in {elapsed:.1f}s: {counts['valid']} valid, "
+          f"{counts['rejected']} rejected")
+    if not args.validate_only:
+        print(f"Rendered {counts['rendered']}/{counts['valid']} cards, {counts['failed']} failed")
+    return 1 if counts['rejected'] or counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
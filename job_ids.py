@@ -0,0 +1,60 @@
+"""
+Unique render job ids and private scratch directories
+معرّفات فريدة لعمليات الإنشاء ومجلدات عمل مؤقتة خاصة بكل عملية
+
+Ids combine the creation second (so they still sort roughly by time) with 64 random bits, so
+requests in the same second, threads and worker processes never share an id. Files are written
+to a uniquely named hidden file next to their destination and renamed over it (publish_file), so
+readers never see a partially written card, concurrent jobs never touch the same file and the
+rename never crosses filesystems.
+"""
+
+import os
+import time
+import uuid
+
+# suffix of the files being written by publish_file
+PARTIAL_SUFFIX = '.partial'
+# partial files left behind by crashed processes are removed after this many seconds
+STALE_PARTIAL_SECONDS = 60 * 60
+
+
+def new_job_id(prefix='job'):
+    """Return a new unique job id such as web_1700000000_3f2a9c1b7d4e6a80"""
+    return f'{prefix}_{int(time.time())}_{uuid.uuid4().hex[:16]}'
+
+
+def publish_file(destination, data):
+    """Atomically write bytes to destination, through a private partial file in the same directory"""
+    directory = os.path.dirname(destination) or '.'
+    os.makedirs(directory, exist_ok=True)
+    partial_path = os.path.join(directory, f'.{os.path.basename(destination)}.{uuid.uuid4().hex}{PARTIAL_SUFFIX}')
+    try:
+        with open(partial_path, 'wb') as f:
+            f.write(data)
+        os.replace(partial_path, destination)
+    except BaseException:
+        try:
+            os.remove(partial_path)
+        except OSError:
+            pass
+        raise
+    return destination
+
+
+def cleanup_partial_files(directory, max_age=STALE_PARTIAL_SECONDS):
+    """Remove partial files older than max_age seconds from a directory, returns how many were removed"""
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    cutoff = time.time() - max_age
+    for entry in os.scandir(directory):
+        if not (entry.name.startswith('.') and entry.name.endswith(PARTIAL_SUFFIX)):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
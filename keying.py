@@ -0,0 +1,61 @@
+"""
+Whole-image white background keying for player images
+إزالة الخلفية البيضاء من صورة اللاعب دفعة واحدة
+"""
+
+from PIL import Image, ImageChops
+
+# white distance (|r - 255| + |g - 255| + |b - 255|) below which a pixel is made fully transparent
+DEFAULT_HARD_THRESHOLD = 30
+# white distance below which a pixel gets a gradual alpha of (distance / soft threshold) * 255
+DEFAULT_SOFT_THRESHOLD = 60
+
+
+def validate_thresholds(hard_threshold, soft_threshold):
+    """Raise a ValueError unless 0 <= hard_threshold <= soft_threshold <= 255"""
+    if not 0 <= hard_threshold <= soft_threshold <= 255:
+        raise ValueError(f'Invalid keying thresholds ({hard_threshold}, {soft_threshold}): '
+                         f'expected 0 <= hard <= soft <= 255.')
+
+
+def key_out_white_background(player_img, hard_threshold=DEFAULT_HARD_THRESHOLD, soft_threshold=DEFAULT_SOFT_THRESHOLD):
+    """
+    Make white/near-white pixels of an image transparent
+
+    Produces the same result as walking every pixel and computing its distance from white, but
+    works on whole bands with lookup tables so no per-pixel Python code runs.
+
+    Args:
+        player_img (PIL.Image.Image): Source image (converted to RGBA if needed)
+        hard_threshold (int): Distance from white under which pixels become fully transparent
+        soft_threshold (int): Distance from white under which pixels become partially transparent
+
+    Returns:
+        PIL.Image.Image: A new RGBA image
+    """
+    validate_thresholds(hard_threshold, soft_threshold)
+
+    if player_img.mode != 'RGBA':
+        player_img = player_img.convert('RGBA')
+
+    r, g, b, a = player_img.split()
+
+    # Per-band distance from white, clipped at the soft threshold. A pixel whose true distance is
+    # under the soft threshold has no clipped band, so the clipped sum is exact where it matters
+    # and at least the soft threshold everywhere else.
+    band_distance_lut = [min(255 - value, soft_threshold) for value in range(256)]
+    white_distance = ImageChops.add(ImageChops.add(r.point(band_distance_lut), g.point(band_distance_lut)),
+                                    b.point(band_distance_lut))
+
+    keyed_mask = white_distance.point([255 if d < soft_threshold else 0 for d in range(256)])
+    hard_mask = white_distance.point([255 if d < hard_threshold else 0 for d in range(256)])
+
+    keyed_alpha = white_distance.point([0 if d < hard_threshold else
+                                        int((d / soft_threshold) * 255) if d < soft_threshold else 255
+                                        for d in range(256)])
+    alpha = Image.composite(keyed_alpha, a, keyed_mask)
+
+    keyed_img = Image.merge('RGBA', (r, g, b, alpha))
+    # fully transparent pixels are stored as pure white, matching the previous behaviour
+    keyed_img.paste((255, 255, 255, 0), (0, 0) + keyed_img.size, hard_mask)
+    return keyed_img
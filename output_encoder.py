@@ -0,0 +1,208 @@
+"""
+Output formats and compression presets for finished cards
+صيغ حفظ البطاقات الجاهزة وإعدادات الضغط
+
+Cards are RGBA images of roughly 500x700 px. PNG with Pillow's default settings (the historic
+output) is lossless but slow and heavy; the presets below trade encode time against file size:
+
+    default   PNG, Pillow defaults (zlib level 6), what render_card always wrote
+    fast      PNG, zlib level 1: the quickest lossless encode, slightly bigger files
+    small     palette PNG (256 colours) with optimize: the smallest PNG, slow to encode
+    web       lossy WebP, quality 90: a fraction of the PNG size, keeps transparency
+    lossless  lossless WebP: smaller than PNG, slower to encode
+    jpeg      JPEG, quality 90, transparent corners flattened on a white background
+    avif      lossy AVIF, quality 70: the smallest files, the slowest encode
+
+Compare them with python -m benchmarks.encode.
+"""
+
+from io import BytesIO
+
+from PIL import Image, features
+
+# format name -> (Pillow format, file extension, mimetype)
+OUTPUT_FORMATS = {
+    'png': ('PNG', 'png', 'image/png'),
+    'webp': ('WEBP', 'webp', 'image/webp'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+    'avif': ('AVIF', 'avif', 'image/avif'),
+}
+# extensions of every file a card may be saved as
+CARD_IMAGE_EXTENSIONS = tuple(f'.{extension}' for _, extension, _ in OUTPUT_FORMATS.values())
+# colour under the transparent parts of a card saved in a format without alpha (JPEG)
+DEFAULT_BACKGROUND = (255, 255, 255)
+
+OUTPUT_PRESETS = {
+    'default': {'format': 'png'},
+    'fast': {'format': 'png', 'compress_level': 1},
+    'small': {'format': 'png', 'optimize': True, 'quantize': 256},
+    'web': {'format': 'webp', 'quality': 90},
+    'lossless': {'format': 'webp', 'lossless': True},
+    'jpeg': {'format': 'jpeg', 'quality': 90},
+    'avif': {'format': 'avif', 'quality': 70},
+}
+
+
+def check_bool(name, value):
+    """Return value if it is a real boolean (JSON true/false), raising ValueError for "false", 0 or anything else"""
+    if not isinstance(value, bool):
+        raise ValueError(f'{name} must be true or false')
+    return value
+
+
+def check_background(value):
+    """
+    Return a background colour as an (r, g, b) tuple
+
+    Raises:
+        ValueError: If it isn't three integers between 0 and 255
+    """
+    if isinstance(value, (str, bytes)) or not isinstance(value, (list, tuple)) or len(value) != 3 or \
+            not all(isinstance(channel, int) and not isinstance(channel, bool) and 0 <= channel <= 255
+                    for channel in value):
+        raise ValueError('background must be three integers between 0 and 255, e.g. [255, 255, 255]')
+    return tuple(value)
+
+
+class OutputOptions:
+    """
+    How a finished card is encoded: format, compression and optional palette quantization
+
+    Raises:
+        ValueError: If a value is out of range or doesn't apply to the format
+    """
+
+    def __init__(self, format='png', compress_level=None, optimize=False, quality=None, lossless=False,
+                 quantize=None, background=DEFAULT_BACKGROUND):
+        format = str(format).lower()
+        if format == 'jpg':
+            format = 'jpeg'
+        if format not in OUTPUT_FORMATS:
+            raise ValueError(f"Invalid output format ({format}), expected one of: {', '.join(OUTPUT_FORMATS)}")
+        if format == 'avif' and not features.check('avif'):
+            raise ValueError('AVIF output is not supported by this Pillow build')
+        optimize = check_bool('optimize', optimize)
+        lossless = check_bool('lossless', lossless)
+        background = check_background(background)
+        if compress_level is not None and (format != 'png' or not 0 <= int(compress_level) <= 9):
+            raise ValueError('compress_level must be between 0 and 9 and only applies to PNG')
+        if quality is not None and (format == 'png' or not 1 <= int(quality) <= 100):
+            raise ValueError('quality must be between 1 and 100 and only applies to WebP, JPEG and AVIF')
+        if lossless and format != 'webp':
+            raise ValueError('lossless only applies to WebP')
+        if quantize is not None and (format != 'png' or not 2 <= int(quantize) <= 256):
+            raise ValueError('quantize must be between 2 and 256 colours and only applies to PNG')
+
+        self.format = format
+        self.compress_level = None if compress_level is None else int(compress_level)
+        self.optimize = optimize
+        self.quality = None if quality is None else int(quality)
+        self.lossless = lossless
+        self.quantize = None if quantize is None else int(quantize)
+        self.background = background
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build options from a dict such as {"preset": "web", "quality": 80} or {"format": "png", "optimize": true}"""
+        data = dict(data)
+        preset = data.pop('preset', None)
+        if preset is not None:
+            if preset not in OUTPUT_PRESETS:
+                raise ValueError(f"Invalid output preset ({preset}), expected one of: {', '.join(OUTPUT_PRESETS)}")
+            data = {**OUTPUT_PRESETS[preset], **data}
+        unknown = set(data) - {'format', 'compress_level', 'optimize', 'quality', 'lossless', 'quantize', 'background'}
+        if unknown:
+            raise ValueError(f"Unknown output options: {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+    @property
+    def pillow_format(self):
+        return OUTPUT_FORMATS[self.format][0]
+
+    @property
+    def extension(self):
+        return OUTPUT_FORMATS[self.format][1]
+
+    @property
+    def mimetype(self):
+        return OUTPUT_FORMATS[self.format][2]
+
+    def to_dict(self):
+        return {
+            'format': self.format,
+            'compress_level': self.compress_level,
+            'optimize': self.optimize,
+            'quality': self.quality,
+            'lossless': self.lossless,
+            'quantize': self.quantize,
+        }
+
+    def cache_fields(self):
+        """Render cache key fields; the default PNG output keeps the key cards had before these options existed"""
+        fields = {'image_format': self.pillow_format}
+        settings = [f'{name}={value}' for name, value in self.to_dict().items()
+                    if name != 'format' and value not in (None, False)]
+        if self.format == 'jpeg':
+            settings.append(f'background={self.background}')
+        if settings:
+            fields['output'] = ','.join(settings)
+        return fields
+
+    def save_kwargs(self):
+        """Keyword arguments for Image.save"""
+        kwargs = {}
+        if self.format == 'png':
+            if self.compress_level is not None:
+                kwargs['compress_level'] = self.compress_level
+            if self.optimize:
+                kwargs['optimize'] = True
+        elif self.format == 'webp':
+            if self.lossless:
+                kwargs['lossless'] = True
+            if self.quality is not None:
+                kwargs['quality'] = self.quality
+        else:
+            if self.quality is not None:
+                kwargs['quality'] = self.quality
+            if self.optimize and self.format == 'jpeg':
+                kwargs['optimize'] = True
+        return kwargs
+
+    def prepare(self, card_img):
+        """Convert the card to what the format can store: flattened RGB for JPEG, a palette for quantized PNG"""
+        if self.format == 'jpeg':
+            if card_img.mode in ('RGBA', 'LA', 'P'):
+                card_img = card_img.convert('RGBA')
+                flattened = Image.new('RGB', card_img.size, self.background)
+                flattened.paste(card_img, mask=card_img.getchannel('A'))
+                return flattened
+            return card_img.convert('RGB')
+        if self.quantize is not None:
+            # fast octree is the quantizer that keeps the alpha channel of RGBA images
+            return card_img.convert('RGBA').quantize(colors=self.quantize, method=Image.Quantize.FASTOCTREE)
+        return card_img
+
+    def encode(self, card_img):
+        """Encode a card image and return the bytes"""
+        buffer = BytesIO()
+        self.prepare(card_img).save(buffer, self.pillow_format, **self.save_kwargs())
+        return buffer.getvalue()
+
+
+def get_output_options(value=None):
+    """
+    Return OutputOptions for None (default PNG), a preset or format name, a dict or OutputOptions
+
+    Raises:
+        ValueError: If the preset, format or an option is invalid
+    """
+    if value is None:
+        return OutputOptions()
+    if isinstance(value, OutputOptions):
+        return value
+    if isinstance(value, dict):
+        return OutputOptions.from_dict(value)
+    name = str(value).lower()
+    if name in OUTPUT_PRESETS:
+        return OutputOptions.from_dict(OUTPUT_PRESETS[name])
+    return OutputOptions(format=name)
@@ -0,0 +1,109 @@
+"""
+Staged preparation of the player image stamped on a card
+تجهيز صورة اللاعب على مراحل قبل لصقها على البطاقة
+
+The upload is shrunk close to its final size before any filtering or keying so the expensive
+stages only touch the pixels that end up on the card. The high quality mode keeps the original
+order (filter and key at full resolution, then resize).
+"""
+
+import time
+
+from PIL import Image, ImageFilter
+
+from keying import DEFAULT_HARD_THRESHOLD, DEFAULT_SOFT_THRESHOLD, key_out_white_background
+
+# maximum size of the player image on the card
+MAX_PLAYER_IMAGE_WIDTH = 420
+MAX_PLAYER_IMAGE_HEIGHT = 380
+
+# the working image is kept at least this many times larger than the final size so that
+# smoothing/keying still happen above the card resolution and the final LANCZOS resize antialiases
+WORKING_SIZE_MARGIN = 2
+
+
+def fit_player_image_size(size):
+    """Return the (width, height) a player image of the given size is resized to on the card"""
+    original_width, original_height = size
+
+    target_height = MAX_PLAYER_IMAGE_HEIGHT
+    aspect_ratio = original_width / original_height
+    target_width = int(target_height * aspect_ratio)
+
+    # if the width is too large, adjust based on the width
+    if target_width > MAX_PLAYER_IMAGE_WIDTH:
+        target_width = MAX_PLAYER_IMAGE_WIDTH
+        target_height = int(target_width / aspect_ratio)
+
+    return target_width, target_height
+
+
+def prepare_player_image(source, hard_threshold=DEFAULT_HARD_THRESHOLD, soft_threshold=DEFAULT_SOFT_THRESHOLD,
+                         high_quality=False, stage_report=None):
+    """
+    Load, shrink, smooth, key and resize a player image ready to be pasted on a card
+
+    Args:
+        source: File path, file object or PIL.Image.Image of the uploaded player image
+        hard_threshold (int): Keying distance from white under which pixels become fully transparent
+        soft_threshold (int): Keying distance from white under which pixels become partially transparent
+        high_quality (bool): Filter and key at full resolution instead of downscaling first
+        stage_report (list): Optional list which receives one dict per stage with its name, duration
+                             in seconds, output size and the memory held by the output image in bytes
+
+    Returns:
+        PIL.Image.Image: RGBA image at its final card size
+    """
+    stage_start = time.perf_counter()
+
+    def finish_stage(stage, img):
+        nonlocal stage_start
+        now = time.perf_counter()
+        if stage_report is not None:
+            stage_report.append({
+                'stage': stage,
+                'seconds': now - stage_start,
+                'size': img.size,
+                'bytes': img.width * img.height * len(img.getbands()),
+            })
+        stage_start = now
+
+    player_img = source if isinstance(source, Image.Image) else Image.open(source)
+    target_size = fit_player_image_size(player_img.size)
+
+    if not high_quality:
+        working_width = max(target_size[0], 1) * WORKING_SIZE_MARGIN
+        working_height = max(target_size[1], 1) * WORKING_SIZE_MARGIN
+
+        # JPEG files can be decoded directly at 1/2, 1/4 or 1/8 scale
+        if player_img.format == 'JPEG':
+            player_img.draft('RGB', (working_width, working_height))
+        player_img.load()
+        finish_stage('decode', player_img)
+
+        # Image.reduce only supports non-palette modes
+        if player_img.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+            player_img = player_img.convert('RGBA')
+
+        reduce_factor = min(player_img.width // working_width, player_img.height // working_height)
+        if reduce_factor >= 2:
+            player_img = player_img.reduce(reduce_factor)
+        finish_stage('reduce', player_img)
+    else:
+        player_img.load()
+        finish_stage('decode', player_img)
+
+    player_img = player_img.convert('RGBA')
+    finish_stage('convert', player_img)
+
+    # apply a light filter to smooth edges
+    player_img = player_img.filter(ImageFilter.SMOOTH_MORE)
+    finish_stage('smooth', player_img)
+
+    player_img = key_out_white_background(player_img, hard_threshold, soft_threshold)
+    finish_stage('key', player_img)
+
+    player_img = player_img.resize(target_size, Image.Resampling.LANCZOS)
+    finish_stage('resize', player_img)
+
+    return player_img
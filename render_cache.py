@@ -0,0 +1,208 @@
+"""
+Content-addressed cache of finished cards
+ذاكرة مؤقتة للبطاقات الجاهزة حسب محتوى المدخلات
+
+A card is identified by a hash of everything that affects its pixels: the normalized player
+fields, the card code, a digest of the player image and the render options. Rendering the same
+inputs again returns the stored bytes without drawing or encoding anything.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+from PIL import Image
+
+RENDER_CACHE_DIR = 'render-cache'
+# default cap for the total size of the cached files
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# eviction goes down to this fraction of max_bytes, so the puts that follow fit without listing the directory
+EVICT_TO_FRACTION = 0.9
+# seconds between listings of the cache directory while it stays under the cap, so the running
+# total also counts the files added by other processes
+RESCAN_SECONDS = int(os.environ.get('RENDER_CACHE_RESCAN_SECONDS', 60))
+# bump whenever a renderer change alters the output for the same inputs
+RENDER_CACHE_VERSION = 1
+
+
+def image_digest(image_source):
+    """sha256 of the player image (bytes or PIL image), None when there is no image"""
+    if image_source is None:
+        return None
+    if isinstance(image_source, Image.Image):
+        digest = hashlib.sha256(f'{image_source.mode}:{image_source.size}:'.encode('utf-8'))
+        digest.update(image_source.tobytes())
+        return digest.hexdigest()
+    return hashlib.sha256(image_source).hexdigest()
+
+
+def render_cache_key(player, card_code, image_source, **render_options):
+    """Hash the normalized card inputs into a cache key"""
+    fields = [
+        f'v{RENDER_CACHE_VERSION}',
+        player.name,
+        player.position.name,
+        player.language.name,
+        str(player.club),
+        player.country,
+        player.overall, player.pac, player.dri, player.sho, player.deff, player.pas, player.phy,
+        card_code.upper(),
+        image_digest(image_source) or '',
+    ]
+    fields += [f'{name}={render_options[name]}' for name in sorted(render_options)]
+    return hashlib.sha256('\x1f'.join(str(field) for field in fields).encode('utf-8')).hexdigest()
+
+
+class DiskLRUCache:
+    """
+    Directory of cached files named by cache key, bounded in total size with LRU eviction
+
+    The directory itself is the index: file mtimes give the LRU order, so every process sharing the
+    directory (the render pool workers, the server) evicts against the same max_bytes. Each process
+    keeps a running total of the directory size, updated by its own puts and evictions; the
+    directory is only listed again when that total goes over max_bytes, or every RESCAN_SECONDS to
+    count the files other processes added. A file removed by another process is simply a miss.
+    Only the counters are per process.
+    """
+
+    def __init__(self, cache_dir=RENDER_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # bytes in the directory as last listed plus the puts since, None until the first put
+        self._total = None
+        self._scanned_at = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _scan(self):
+        """(mtime, name, size) of every cached file, partial writes (dot files) excluded"""
+        files = []
+        try:
+            entries = os.scandir(self.cache_dir)
+        except FileNotFoundError:
+            return files
+        with entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # evicted by another process while listing
+                    continue
+                files.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        return files
+
+    def path_for(self, key, extension='png'):
+        return os.path.join(self.cache_dir, f'{key}.{extension}')
+
+    def get_path(self, key, extension='png'):
+        """Return the path of the cached file for key, or None on a miss"""
+        path = self.path_for(key, extension)
+        try:
+            # touching the file is both the existence check and the LRU bump, seen by every process
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def get_bytes(self, key, extension='png'):
+        """Return the cached bytes for key, or None on a miss"""
+        path = self.get_path(key, extension)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key, data, extension='png'):
+        """
+        Store bytes under key, evicting the least recently used files over the cap
+
+        Raises:
+            OSError: If the file can't be written (the partial file is removed)
+        """
+        if len(data) > self.max_bytes:
+            return None
+        path = self.path_for(key, extension)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # write then rename so readers never see a partial file
+        tmp_path = os.path.join(self.cache_dir, f'.{uuid.uuid4().hex}.tmp')
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            if self._total is not None:
+                self._total += len(data) - replaced
+            rescan = self._total is None or self._total > self.max_bytes or \
+                time.monotonic() - self._scanned_at >= RESCAN_SECONDS
+        if rescan:
+            self.evict()
+        return path
+
+    def evict(self):
+        """List the directory and remove the least recently used files until it is within max_bytes
+
+        Once over max_bytes, files are removed down to EVICT_TO_FRACTION of it.
+        """
+        with self._lock:
+            self._scanned_at = time.monotonic()
+        files = sorted(self._scan())
+        total = sum(size for _, _, size in files)
+        target = self.max_bytes * EVICT_TO_FRACTION if total > self.max_bytes else self.max_bytes
+        evicted = 0
+        for _, name, size in files:
+            if total <= target:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                evicted += 1
+            except OSError:
+                # already evicted by another process
+                pass
+            total -= size
+        with self._lock:
+            self._total = total
+            self.evictions += evicted
+
+    def stats(self):
+        """Return the cache counters as a dict, with the entries and bytes of the shared directory"""
+        files = self._scan()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(files),
+                'bytes': sum(size for _, _, size in files),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+# cache shared by every render in the process
+render_cache = DiskLRUCache()
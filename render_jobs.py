@@ -0,0 +1,162 @@
+"""
+In-process queue of asynchronous render jobs
+قائمة انتظار لعمليات إنشاء البطاقات في الخلفية
+
+A job is submitted with the function that does its work and gets an id straight away; worker
+threads run the jobs in submission order while clients poll the job status. The backlog of jobs
+waiting for a worker is bounded, and finished jobs are forgotten once their result TTL expires.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from job_ids import new_job_id
+from resources.exceptions import RenderQueueFullError
+
+# jobs allowed to wait for a worker thread before submissions are rejected
+DEFAULT_MAX_BACKLOG = 256
+# seconds a finished job (and its result) is kept after it ends
+DEFAULT_RESULT_TTL = 15 * 60
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+
+
+class RenderJob:
+    """A unit of work on the queue, its status, timings and result (or error)"""
+
+    def __init__(self, job_id, kind, func):
+        self.id = job_id
+        self.kind = kind
+        self.func = func
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def wait(self, timeout=None):
+        """Block until the job has finished, returns False if timeout expired first"""
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        """Status and timings of the job as a JSON-ready dict"""
+        now = time.time()
+        started_at = self.started_at or now
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'submittedAt': self.submitted_at,
+            'startedAt': self.started_at,
+            'finishedAt': self.finished_at,
+            'queueSeconds': started_at - self.submitted_at,
+            'runSeconds': (self.finished_at or now) - self.started_at if self.started_at else None,
+            'error': self.error
+        }
+
+
+class RenderJobQueue:
+    """
+    Bounded FIFO of render jobs run by a pool of worker threads
+
+    Jobs are plain callables taking the RenderJob; whatever they return becomes job.result and
+    any exception they raise marks the job failed with its message.
+    """
+
+    def __init__(self, max_workers=None, max_backlog=DEFAULT_MAX_BACKLOG, result_ttl=DEFAULT_RESULT_TTL):
+        self.max_workers = max_workers or os.cpu_count()
+        self.max_backlog = max_backlog
+        self.result_ttl = result_ttl
+        self._queue = queue.Queue(maxsize=max_backlog)
+        self._jobs = {}
+        # finished jobs in the order they ended, so expiring them never scans every job
+        self._finished = deque()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._closed = False
+
+    def _start_workers(self):
+        # threads are started on the first submission so importing the module has no side effects
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(target=self._worker, name=f'render-job-{len(self._threads)}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job.status = 'running'
+            job.started_at = time.time()
+            try:
+                job.result = job.func(job)
+                job.status = 'done'
+            except Exception as e:
+                job.error = str(e)
+                job.status = 'failed'
+            job.finished_at = time.time()
+            job.func = None
+            with self._lock:
+                self._finished.append(job)
+            job._done.set()
+
+    def submit(self, func, kind='card', prefix='job'):
+        """
+        Queue func(job) and return the new RenderJob
+
+        Raises:
+            RenderQueueFullError: If the backlog is full or the queue is shutting down
+        """
+        job = RenderJob(new_job_id(prefix), kind, func)
+        with self._lock:
+            if self._closed:
+                raise RenderQueueFullError('The render queue is shutting down.')
+            self._purge_expired()
+            self._start_workers()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise RenderQueueFullError(f'Too many render jobs waiting (max {self.max_backlog}), '
+                                           f'please retry shortly.')
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        """Return the job with this id, or None if it is unknown or its result has expired"""
+        with self._lock:
+            self._purge_expired()
+            return self._jobs.get(job_id)
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.result_ttl
+        while self._finished and self._finished[0].finished_at < cutoff:
+            self._jobs.pop(self._finished.popleft().id, None)
+
+    def stats(self):
+        """Number of known jobs by status"""
+        with self._lock:
+            counts = {status: 0 for status in JOB_STATUSES}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs; the queued ones still run, and wait blocks until they have"""
+        with self._lock:
+            self._closed = True
+            threads = list(self._threads)
+        for _ in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,249 @@
+"""
+Per-stage timing of card renders, exported as callbacks, Server-Timing headers and Prometheus metrics
+قياس زمن كل مرحلة من مراحل إنشاء البطاقة
+
+Each render (render_card, render_card_to_bytes, render_card_image) opens a RenderTiming with
+render_timer(card_code), and the code inside times its stages with stage(name):
+
+    with render_timer(card_code):
+        with stage('template'):
+            ...
+
+Finished timings are recorded in process-wide histograms by stage and card code (see
+prometheus_text), handed to every listener registered with add_listener and to the lists opened
+with collect_timings() on the same thread.
+
+When METRICS_ENABLED is False and nothing is listening or collecting, render_timer and stage
+return a shared no-op context, so an untimed render pays one attribute lookup per stage.
+"""
+
+import os
+import threading
+import time
+
+from resources.cardcode_to_card import cardcode_to_card
+
+# Record every render in the process-wide histograms (set RENDER_METRICS=0 to turn them off)
+METRICS_ENABLED = os.environ.get('RENDER_METRICS', '1') != '0'
+# Histogram bucket upper bounds, in seconds
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRIC_PREFIX = 'fut_card'
+
+_local = threading.local()
+_listeners = []
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+class RenderTiming:
+    """Durations of the stages of one render, in the order they ran"""
+
+    def __init__(self, card_code):
+        self.card_code = card_code
+        self.stages = []
+        self.start = time.perf_counter()
+        self.seconds = None
+
+    def add(self, name, seconds):
+        self.stages.append((name, seconds))
+
+    def as_dict(self):
+        return {'cardCode': self.card_code, 'seconds': self.seconds, 'stages': dict(self.stages)}
+
+
+class _NullContext:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class _Stage:
+    def __init__(self, timing, name):
+        self.timing = timing
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self.timing
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timing.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _RenderTimer:
+    def __init__(self, card_code):
+        self.timing = RenderTiming(card_code)
+
+    def __enter__(self):
+        _local.timing = self.timing
+        return self.timing
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.timing = None
+        self.timing.seconds = time.perf_counter() - self.timing.start
+        # failed renders are not recorded, their partial stages would skew the histograms
+        if exc_type is None:
+            record(self.timing)
+        return False
+
+
+def is_timing():
+    """True when renders on this thread should be timed"""
+    return METRICS_ENABLED or bool(_listeners) or bool(getattr(_local, 'collectors', None))
+
+
+def render_timer(card_code):
+    """Context manager timing one render, a no-op inside another render or when nothing would use the timing"""
+    if getattr(_local, 'timing', None) is not None or not is_timing():
+        return _NULL_CONTEXT
+    return _RenderTimer(card_code)
+
+
+def stage(name):
+    """Context manager timing one stage of the current render, a no-op outside a timed render"""
+    timing = getattr(_local, 'timing', None)
+    if timing is None:
+        return _NULL_CONTEXT
+    return _Stage(timing, name)
+
+
+def current_timing():
+    """The RenderTiming of the render running on this thread, or None"""
+    return getattr(_local, 'timing', None)
+
+
+def record(timing):
+    """
+    Record a finished RenderTiming: histograms, listeners and collectors of this thread
+
+    Also used for timings measured in worker processes and sent back with their results.
+    """
+    if METRICS_ENABLED:
+        card_code = timing.card_code.upper() if isinstance(timing.card_code, str) else ''
+        if card_code not in cardcode_to_card:
+            card_code = 'unknown'
+        observe('render_seconds', (('card_code', card_code),), timing.seconds)
+        for name, seconds in timing.stages:
+            observe('render_stage_seconds', (('stage', name), ('card_code', card_code)), seconds)
+
+    for collector in getattr(_local, 'collectors', None) or ():
+        collector.append(timing)
+    for listener in list(_listeners):
+        try:
+            listener(timing)
+        except Exception as e:
+            print(f"Warning: render timing listener failed: {str(e)}")
+
+
+def add_listener(callback):
+    """Call callback(timing) with the RenderTiming of every render in this process"""
+    _listeners.append(callback)
+
+
+def remove_listener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+class collect_timings:
+    """
+    Collect the RenderTiming of every render that finishes on this thread inside the block
+
+    Usage:
+        with collect_timings() as timings:
+            render_card_to_bytes(...)
+        print(timings[0].stages)
+    """
+
+    def __enter__(self):
+        self.timings = []
+        if getattr(_local, 'collectors', None) is None:
+            _local.collectors = []
+        _local.collectors.append(self.timings)
+        return self.timings
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.collectors.remove(self.timings)
+        return False
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values"""
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, upper_bound in enumerate(self.buckets):
+            if value <= upper_bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def observe(metric, labels, value):
+    """Add a value to the histogram of metric with these labels (a tuple of (name, value) pairs)"""
+    with _histograms_lock:
+        histogram = _histograms.get((metric, labels))
+        if histogram is None:
+            histogram = _histograms[(metric, labels)] = Histogram()
+        histogram.observe(value)
+
+
+def reset_metrics():
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def format_labels(labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels)
+
+
+def prometheus_text(extra_lines=()):
+    """Every recorded histogram in the Prometheus text exposition format"""
+    help_texts = {
+        'render_seconds': 'Total card render time in seconds',
+        'render_stage_seconds': 'Card render time per pipeline stage in seconds',
+    }
+    with _histograms_lock:
+        snapshot = sorted(((metric, labels, list(h.counts), h.sum, h.count, h.buckets)
+                           for (metric, labels), h in _histograms.items()))
+
+    lines = []
+    last_metric = None
+    for metric, labels, counts, total, count, buckets in snapshot:
+        name = f'{METRIC_PREFIX}_{metric}'
+        if metric != last_metric:
+            lines.append(f'# HELP {name} {help_texts.get(metric, metric)}')
+            lines.append(f'# TYPE {name} histogram')
+            last_metric = metric
+        label_text = format_labels(labels)
+        cumulative = 0
+        for upper_bound, bucket_count in zip(buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{label_text},le="{upper_bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {count}')
+        lines.append(f'{name}_sum{{{label_text}}} {total}')
+        lines.append(f'{name}_count{{{label_text}}} {count}')
+    lines.extend(extra_lines)
+    return '\n'.join(lines) + '\n'
+
+
+def server_timing_header(timings):
+    """Server-Timing header value (durations in ms) summing the stages of one or more renders"""
+    totals = {}
+    for timing in timings:
+        for name, seconds in timing.stages:
+            totals[name] = totals.get(name, 0) + seconds
+        totals['render'] = totals.get('render', 0) + (timing.seconds or 0)
+    return ', '.join(f'{name};dur={seconds * 1000:.2f}' for name, seconds in totals.items())
@@ -0,0 +1,108 @@
+"""
+Bounded pool of render worker processes for the web server
+مجموعة محدودة من العمليات لإنشاء البطاقات في وضع الإنتاج
+
+At most max_workers renders run at once and at most queue_size more wait for a worker. A render
+submitted while both are full is rejected straight away (the web server answers 503) instead of
+piling up behind slow renders. Batches and background jobs, which have no client waiting on a
+single render, wait for a slot instead (submit with block, or the waiting() view).
+"""
+
+import os
+import threading
+from concurrent.futures import TimeoutError
+
+from batch import create_render_pool, player_from_row
+from cardcreator import render_card_with_renditions
+from render_metrics import collect_timings
+from resources.exceptions import RenderDeadlineExceededError, RenderPoolBusyError
+
+# renders allowed to wait for a free worker, per worker
+DEFAULT_QUEUE_PER_WORKER = 4
+
+
+def render_row_to_bytes(row, card_code, player_image=None, dynamic_img_fl=False, output_options=None):
+    """
+    Render a card and its renditions from an input row on a worker process
+
+    Returns (card bytes, {width: rendition bytes}, list of RenderTiming) so the parent process can
+    record the render stages.
+    """
+    # rows are sent to the workers instead of Player objects, so they are validated where they are rendered
+    with collect_timings() as timings:
+        card_bytes, renditions = render_card_with_renditions(
+            player=player_from_row(row),
+            card_code=card_code,
+            player_image=player_image,
+            dynamic_img_fl=dynamic_img_fl,
+            output_options=output_options
+        )
+    return card_bytes, renditions, timings
+
+
+class BoundedRenderPool:
+    def __init__(self, max_workers=None, queue_size=None):
+        self.max_workers = max_workers or os.cpu_count()
+        self.queue_size = self.max_workers * DEFAULT_QUEUE_PER_WORKER if queue_size is None else queue_size
+        self.executor = create_render_pool(self.max_workers)
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.queue_size)
+        self._closed = False
+
+    def submit(self, fn, *args, block=False, **kwargs):
+        """
+        Queue fn(*args, **kwargs) on a worker process and return its future
+
+        With block, waits for a free worker or queue slot instead of raising when the pool is full.
+
+        Raises:
+            RenderPoolBusyError: If every worker is busy and the queue is full (without block), or the
+                                 pool is shutting down
+        """
+        if self._closed or not self._slots.acquire(blocking=block):
+            raise RenderPoolBusyError('The server is busy rendering other cards, please retry shortly.')
+        if self._closed:
+            self._slots.release()
+            raise RenderPoolBusyError('The server is shutting down.')
+        try:
+            future = self.executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        # the slot is only freed once the render really ends, even if its caller gave up waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args, deadline=None, block=False, **kwargs):
+        """
+        Run fn on a worker process and wait at most deadline seconds (None: no limit) for its result
+
+        Raises:
+            RenderPoolBusyError: If the pool is full (without block)
+            RenderDeadlineExceededError: If the render takes longer than deadline
+        """
+        future = self.submit(fn, *args, block=block, **kwargs)
+        try:
+            return future.result(timeout=deadline)
+        except TimeoutError:
+            future.cancel()
+            raise RenderDeadlineExceededError(f'Rendering took longer than {deadline} seconds.')
+
+    def waiting(self):
+        """Executor-like view of the pool whose submit waits for a slot, for batch.render_batch"""
+        return WaitingRenderPool(self)
+
+    def shutdown(self, wait=True):
+        """Stop accepting renders and (by default) wait for the queued ones to finish"""
+        self._closed = True
+        self.executor.shutdown(wait=wait)
+
+
+class WaitingRenderPool:
+    """Submits to a BoundedRenderPool, waiting for a slot when it is full (see BoundedRenderPool.waiting)"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.executor = pool.executor
+
+    def submit(self, fn, *args, **kwargs):
+        return self.pool.submit(fn, *args, block=True, **kwargs)
@@ -0,0 +1,132 @@
+"""
+Smaller renditions of finished cards for galleries and thumbnails
+نسخ مصغّرة من البطاقات الجاهزة لصفحات العرض
+
+Next to every card (web_..._3f2a.png) the render pipeline stores one scaled down copy per width
+in RENDITION_WIDTHS (web_..._3f2a_128w.png), encoded with the same output options as the card.
+Cards created before renditions existed get theirs the first time they are asked for.
+"""
+
+import os
+import re
+from io import BytesIO
+
+from PIL import Image
+
+from job_ids import publish_file
+from output_encoder import CARD_IMAGE_EXTENSIONS, get_output_options
+
+# widths (px) of the renditions stored next to each card
+RENDITION_WIDTHS = (64, 128, 256)
+
+_RENDITION_RE = re.compile(r'_(\d+)w\.[a-z]+$')
+
+
+def rendition_filename(filename, width):
+    """File name of the rendition of a card at a given width: card.png -> card_128w.png"""
+    stem, extension = os.path.splitext(filename)
+    return f'{stem}_{width}w{extension}'
+
+
+def is_rendition_filename(filename):
+    return _RENDITION_RE.search(filename) is not None
+
+
+def is_card_filename(filename):
+    """True for full size card images, False for renditions, metadata and other files"""
+    return filename.endswith(CARD_IMAGE_EXTENSIONS) and not is_rendition_filename(filename)
+
+
+def parse_rendition_width(value):
+    """
+    Validate a requested rendition width, None means the full card
+
+    Raises:
+        ValueError: If the width is not one of RENDITION_WIDTHS
+    """
+    if value in (None, '', 'full'):
+        return None
+    try:
+        width = int(value)
+    except (TypeError, ValueError):
+        width = None
+    if width not in RENDITION_WIDTHS:
+        raise ValueError(f"Invalid width ({value}), expected one of: {', '.join(str(w) for w in RENDITION_WIDTHS)}")
+    return width
+
+
+def parse_rendition_widths(value):
+    """
+    Rendition widths from a comma separated list such as "64,128", "all" or "none"
+
+    Raises:
+        ValueError: If a width is not one of RENDITION_WIDTHS
+    """
+    value = str(value).strip().lower()
+    if value == 'all':
+        return RENDITION_WIDTHS
+    if value in ('', 'none'):
+        return ()
+    return tuple(sorted({parse_rendition_width(width.strip()) for width in value.split(',')} - {None}))
+
+
+def make_renditions(card_img, widths=RENDITION_WIDTHS):
+    """
+    Scale a card down to each width (keeping its aspect ratio), returns {width: image}
+
+    Each rendition is made from the next bigger one: a box filter reduce by the largest whole factor
+    (cheap, and exact for the 256 -> 128 -> 64 chain), then a bicubic resize for what remains, which
+    is always less than 2x. Far cheaper than a Lanczos resize from the full card, with the same look.
+    """
+    renditions = {}
+    # palette images can only be resized with nearest neighbour sampling
+    source = card_img.convert('RGBA') if card_img.mode == 'P' else card_img
+    for width in sorted(set(widths), reverse=True):
+        if width >= card_img.width:
+            continue
+        size = (width, max(1, round(card_img.height * width / card_img.width)))
+        factor = source.width // width
+        if factor > 1:
+            source = source.reduce(factor)
+        if source.size != size:
+            source = source.resize(size, Image.BICUBIC)
+        renditions[width] = source
+    return renditions
+
+
+def encode_renditions(card_img, output_options=None, widths=RENDITION_WIDTHS):
+    """Scale a card down to each width and encode it like the card, returns {width: bytes}"""
+    output_options = get_output_options(output_options)
+    return {width: output_options.encode(img) for width, img in make_renditions(card_img, widths).items()}
+
+
+def ensure_rendition(output_dir, filename, width):
+    """
+    Return the file name of the rendition of a card at width, creating it if it doesn't exist yet
+
+    Returns the card's own file name when the card isn't wider than width.
+
+    Raises:
+        ValueError: If filename is not a full size card (a rendition, metadata or other file)
+        FileNotFoundError: If the card doesn't exist
+    """
+    if not is_card_filename(filename):
+        raise ValueError(f'Renditions can only be made of full size cards ({filename})')
+    name = rendition_filename(filename, width)
+    if os.path.exists(os.path.join(output_dir, name)):
+        return name
+
+    with Image.open(os.path.join(output_dir, filename)) as card_img:
+        card_img.load()
+        if card_img.width <= width:
+            return filename
+        rendition = make_renditions(card_img, (width,))[width]
+        # keep the card's format; palette and alpha are preserved by a plain save in that format
+        card_format = card_img.format
+
+    if card_format == 'JPEG':
+        rendition = rendition.convert('RGB')
+    buffer = BytesIO()
+    rendition.save(buffer, card_format)
+    publish_file(os.path.join(output_dir, name), buffer.getvalue())
+    return name
@@ -21,3 +21,23 @@ class InvalidPositionError(Exception):
 class InvalidLanguageError(Exception):
     """Raised when an invalid language is passed to the cardcreator"""
     pass
+
+
+class PlayerImageFetchError(Exception):
+    """Raised when a player image URL can't be downloaded (bad status, timeout or too large)"""
+    pass
+
+
+class RenderPoolBusyError(Exception):
+    """Raised when the render worker pool and its queue are full"""
+    pass
+
+
+class RenderDeadlineExceededError(Exception):
+    """Raised when a render doesn't finish before its deadline"""
+    pass
+
+
+class RenderQueueFullError(Exception):
+    """Raised when the render job backlog is full"""
+    pass
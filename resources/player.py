@@ -1,12 +1,13 @@
-from enum import Enum
-
-from resources.languages_dictionary import languages_dict
 from resources.language import Language
 from resources.exceptions import InvalidPositionError, InvalidLanguageError
-from resources.en_position import EnPosition
+from resources.positions import position_lookup
 
 
 class Player:
+    # no per-instance __dict__: batch imports create millions of players
+    __slots__ = ('name', 'language', 'position', 'club', 'country',
+                 'overall', 'pac', 'dri', 'sho', 'deff', 'pas', 'phy')
+
     def __init__(self, name, pos, club, country, overall=99, pac=99, dri=99, sho=99, deff=99, pas=99, phy=99, language='EN'):
         self.name = name.upper()
 
@@ -15,18 +16,12 @@ class Player:
         except KeyError:
             raise InvalidLanguageError(f'Language ({language}) is not a valid language.')
 
-        try:
-            position = Enum('Position', languages_dict.get(language).get('positions'))
-            self.position = position[pos.upper()]
-        except KeyError:
-            try:
-                en_position = EnPosition[pos.upper()]
-                position = Enum('Position', languages_dict.get(language).get('positions'))
-                index = en_position.value - 1
-                self.position = position[languages_dict.get(language).get('positions')[index]]
-            except (KeyError, IndexError):
-                raise InvalidPositionError(f'Position ({pos}) is not available in language {language}.'
-                                           f'Conversion of {pos} from English position to {language} unsuccessful.')
+        # the language's own abbreviation, or the English one translated (see resources.positions)
+        position = position_lookup.get(language, {}).get(pos.upper())
+        if position is None:
+            raise InvalidPositionError(f'Position ({pos}) is not available in language {language}.'
+                                       f'Conversion of {pos} from English position to {language} unsuccessful.')
+        self.position = position
 
         self.club = club
         self.country = country.lower()
@@ -0,0 +1,30 @@
+from enum import Enum
+
+from resources.en_position import EnPosition
+from resources.languages_dictionary import languages_dict
+
+
+def _position_enum(language_code):
+    # module and qualname point at the module attribute below, so positions can be pickled
+    return Enum('Position', languages_dict[language_code]['positions'], module=__name__,
+                qualname=f'{language_code}_POSITION')
+
+
+# the Position enum of each language, built once (EN_POSITION, FR_POSITION, ...)
+position_enums = {}
+for _language_code in languages_dict:
+    position_enums[_language_code] = globals()[f'{_language_code}_POSITION'] = _position_enum(_language_code)
+
+# EnPosition member -> Position member of each language (languages list their positions in EnPosition order)
+en_position_translations = {
+    language_code: {en_position: position_enum[languages_dict[language_code]['positions'][en_position.value - 1]]
+                    for en_position in EnPosition if en_position.value <= len(position_enum)}
+    for language_code, position_enum in position_enums.items()
+}
+
+# position abbreviation -> Position member of each language: its own abbreviations, then the English ones
+position_lookup = {
+    language_code: {**{en_position.name: position for en_position, position in translations.items()},
+                    **position_enums[language_code].__members__}
+    for language_code, translations in en_position_translations.items()
+}
@@ -0,0 +1,319 @@
+"""
+SQLite storage for player cards (indexed by id, written one row at a time)
+تخزين البطاقات في قاعدة بيانات SQLite مع فهرس على المعرّف
+"""
+
+import json
+import random
+import sqlite3
+import threading
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cards (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+)
+'''
+
+# card fields copied into their own indexed columns so listings can filter without parsing the JSON
+# column -> (card entry field, normalize function applied to stored and requested values)
+FILTER_COLUMNS = {
+    'card_type': ('cardType', lambda value: str(value).upper()),
+    'position': ('position', lambda value: str(value).upper()),
+    'club': ('club', str),
+    'country': ('country', lambda value: str(value).lower()),
+    'overall': ('overall', int),
+}
+# (column, seq) indexes walk the newest cards of one value first, the same order listings use
+FILTER_INDEXES = '''
+CREATE INDEX IF NOT EXISTS cards_card_type ON cards (card_type, seq);
+CREATE INDEX IF NOT EXISTS cards_position ON cards (position, seq);
+CREATE INDEX IF NOT EXISTS cards_club ON cards (club, seq);
+CREATE INDEX IF NOT EXISTS cards_country ON cards (country, seq);
+CREATE INDEX IF NOT EXISTS cards_overall ON cards (overall, seq);
+'''
+
+UPSERT = (f'INSERT INTO cards (id, data, {", ".join(FILTER_COLUMNS)}) VALUES (?, ?{", ?" * len(FILTER_COLUMNS)}) '
+          f'ON CONFLICT(id) DO UPDATE SET data = excluded.data, '
+          f'{", ".join(f"{column} = excluded.{column}" for column in FILTER_COLUMNS)}')
+
+# random seq probes tried per requested card before random sampling falls back to a full scan
+RANDOM_PROBES_PER_CARD = 20
+# when its draws keep missing, CardSampler lists the seqs of at most this many matching cards and draws from them
+SAMPLER_LISTED_SEQS = 2000
+
+
+_FIELD_NORMALIZERS = {field: normalize for field, normalize in FILTER_COLUMNS.values()}
+
+
+def normalize_filter_value(field, value):
+    """
+    Normalized value of a filter field (upper case card type and position, lower case country)
+
+    Raises:
+        ValueError: If the value doesn't fit the field (a non numeric overall)
+    """
+    try:
+        return _FIELD_NORMALIZERS[field](value)
+    except TypeError:
+        raise ValueError(f'Invalid {field} ({value})')
+
+
+def card_filter_value(card_entry, field):
+    """Normalized value of a filter field of a stored card, None if it can't be normalized"""
+    try:
+        return normalize_filter_value(field, card_entry.get(field, ''))
+    except ValueError:
+        return None
+
+
+def filter_values(card_entry):
+    """Values of the filter columns for a card entry, in FILTER_COLUMNS order"""
+    return tuple(card_filter_value(card_entry, field) for field, _ in FILTER_COLUMNS.values())
+
+
+def filter_conditions(filters=None, min_overall=None, max_overall=None):
+    """SQL conditions and parameters selecting the cards with the filter values and overall range"""
+    conditions = []
+    params = []
+    for column, (field, _) in FILTER_COLUMNS.items():
+        if filters and filters.get(field) is not None:
+            conditions.append(f'{column} = ?')
+            params.append(normalize_filter_value(field, filters[field]))
+    if min_overall is not None:
+        conditions.append('overall >= ?')
+        params.append(normalize_filter_value('overall', min_overall))
+    if max_overall is not None:
+        conditions.append('overall <= ?')
+        params.append(normalize_filter_value('overall', max_overall))
+    return conditions, params
+
+
+class SqliteCardStore:
+    """
+    Card entries (the same dicts the JSON database holds) stored as JSON rows keyed by card id
+
+    The database runs in WAL mode so readers never block the writer. Each thread gets its own
+    connection.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        self._add_filter_columns(connection)
+        connection.executescript(FILTER_INDEXES)
+
+    def _add_filter_columns(self, connection):
+        """Add the filter columns to databases created before they existed, filling them from the JSON data"""
+        existing = {row[1] for row in connection.execute('PRAGMA table_info(cards)')}
+        missing = [column for column in FILTER_COLUMNS if column not in existing]
+        if not missing:
+            return
+        with connection:
+            for column in missing:
+                column_type = 'INTEGER' if column == 'overall' else 'TEXT'
+                connection.execute(f'ALTER TABLE cards ADD COLUMN {column} {column_type}')
+            rows = connection.execute('SELECT seq, data FROM cards').fetchall()
+            connection.executemany(f'UPDATE cards SET {", ".join(f"{column} = ?" for column in FILTER_COLUMNS)} '
+                                   f'WHERE seq = ?',
+                                   (filter_values(json.loads(data)) + (seq,) for seq, data in rows))
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def put(self, card_entry):
+        """Insert a card, or replace it in place (keeping its position) if the id already exists"""
+        self.put_many((card_entry,))
+
+    def put_many(self, card_entries):
+        """Insert or replace many cards in a single transaction, returns the number written"""
+        connection = self._connection()
+        written = 0
+        with connection:
+            for card_entry in card_entries:
+                connection.execute(UPSERT, (card_entry['id'], json.dumps(card_entry, ensure_ascii=False)) +
+                                   filter_values(card_entry))
+                written += 1
+        return written
+
+    def get(self, card_id):
+        row = self._connection().execute('SELECT data FROM cards WHERE id = ?', (card_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def all(self):
+        """Return every card in insertion order"""
+        return [json.loads(data) for data, in self._connection().execute('SELECT data FROM cards ORDER BY seq')]
+
+    def count(self):
+        return self._connection().execute('SELECT COUNT(*) FROM cards').fetchone()[0]
+
+    def random(self, count):
+        """
+        Return up to count distinct cards chosen uniformly at random
+
+        Random seq values are probed directly through the integer primary key, so sampling a few cards doesn't
+        scan the table unless it has been left very sparse by deletes.
+        """
+        connection = self._connection()
+        max_seq = connection.execute('SELECT MAX(seq) FROM cards').fetchone()[0]
+
+        if max_seq is None:
+            return []
+
+        # If we have fewer cards than requested, return all (COUNT(*) would scan the whole table)
+        first_rows = connection.execute('SELECT data FROM cards ORDER BY seq LIMIT ?', (count + 1,)).fetchall()
+        if len(first_rows) <= count:
+            return [json.loads(data) for data, in first_rows]
+
+        chosen = {}
+        for _ in range(count * RANDOM_PROBES_PER_CARD):
+            seq = random.randint(1, max_seq)
+            if seq in chosen:
+                continue
+            row = connection.execute('SELECT data FROM cards WHERE seq = ?', (seq,)).fetchone()
+            if row:
+                chosen[seq] = json.loads(row[0])
+                if len(chosen) == count:
+                    return list(chosen.values())
+
+        rows = connection.execute('SELECT data FROM cards ORDER BY RANDOM() LIMIT ?', (count,))
+        return [json.loads(data) for data, in rows]
+
+    def query(self, filters=None, min_overall=None, max_overall=None, cursor=None, limit=20):
+        """
+        Newest first page of the cards matching every filter, see database.query_cards
+
+        filters maps card fields (cardType, position, club, country) to the wanted value.
+        Returns (cards, next cursor or None).
+
+        Raises:
+            ValueError: If the cursor is not the id of a stored card or a filter value is invalid
+        """
+        connection = self._connection()
+        conditions, params = filter_conditions(filters, min_overall, max_overall)
+        if cursor is not None:
+            row = connection.execute('SELECT seq FROM cards WHERE id = ?', (cursor,)).fetchone()
+            if row is None:
+                raise ValueError(f'Invalid cursor ({cursor})')
+            conditions.append('seq < ?')
+            params.append(row[0])
+
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        rows = connection.execute(f'SELECT data FROM cards {where} ORDER BY seq DESC LIMIT ?',
+                                  params + [limit + 1]).fetchall()
+        cards = [json.loads(data) for data, in rows[:limit]]
+        next_cursor = cards[-1]['id'] if len(rows) > limit else None
+        return cards, next_cursor
+
+    def matching(self, filters=None, min_overall=None, max_overall=None):
+        """Every card matching the filters (see query), in insertion order"""
+        conditions, params = filter_conditions(filters, min_overall, max_overall)
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        rows = self._connection().execute(f'SELECT data FROM cards {where} ORDER BY seq', params)
+        return [json.loads(data) for data, in rows]
+
+    def sampler(self, filters=None, min_overall=None, max_overall=None):
+        """Return a CardSampler drawing random cards among those matching the filters (see query)"""
+        conditions, params = filter_conditions(filters, min_overall, max_overall)
+        return CardSampler(self._connection(), conditions, params)
+
+    def delete(self, card_id):
+        connection = self._connection()
+        with connection:
+            connection.execute('DELETE FROM cards WHERE id = ?', (card_id,))
+
+
+class CardSampler:
+    """
+    Random draws among the cards matching SQL conditions (see filter_conditions)
+
+    Only the seq bounds of the matching cards are read when the sampler is made, through the
+    (column, seq) indexes like random() reads MAX(seq), so its cost doesn't grow with the number of
+    matches. Each draw jumps to a random seq between the bounds and takes the next matching card. A
+    card following a gap of g seqs (left by other cards or deletes) is reached g times as often, so
+    it is kept with probability 1/g and the draw returns None otherwise: every matching card is
+    equally likely. size stays None (unknown) until draws keep missing and list_if_few counts the
+    matches; when there are at most SAMPLER_LISTED_SEQS, their seqs are drawn from directly.
+    """
+
+    def __init__(self, connection, conditions, params):
+        self.connection = connection
+        self.conditions = conditions
+        self.params = params
+        self.first = connection.execute(f'SELECT MIN(seq) FROM cards {self.where()}', params).fetchone()[0]
+        self.last = connection.execute(f'SELECT MAX(seq) FROM cards {self.where()}', params).fetchone()[0]
+        self.size = 0 if self.first is None else None
+        self.seqs = None
+        self.listed = False
+
+    def where(self, *extra):
+        conditions = self.conditions + list(extra)
+        return f'WHERE {" AND ".join(conditions)}' if conditions else ''
+
+    def draw(self):
+        """One random matching card, or None if the draw missed (there are no matching cards when size is 0)"""
+        if self.size == 0:
+            return None
+        if self.seqs is not None:
+            row = self.connection.execute('SELECT data FROM cards WHERE seq = ?',
+                                          (random.choice(self.seqs),)).fetchone()
+            return json.loads(row[0]) if row else None
+
+        row = self.connection.execute(f'SELECT seq, data FROM cards {self.where("seq >= ?")} ORDER BY seq LIMIT 1',
+                                      self.params + [random.randint(self.first, self.last)]).fetchone()
+        if row is None:
+            return None
+        previous = self.connection.execute(f'SELECT MAX(seq) FROM cards {self.where("seq < ?")}',
+                                           self.params + [row[0]]).fetchone()[0]
+        gap = row[0] - (self.first - 1 if previous is None else previous)
+        if random.random() * gap >= 1:
+            return None
+        return json.loads(row[1])
+
+    def list_if_few(self):
+        """List the seqs of the matching cards once, if there are at most SAMPLER_LISTED_SEQS (sets size)"""
+        if self.listed:
+            return
+        self.listed = True
+        seqs = [seq for seq, in self.connection.execute(f'SELECT seq FROM cards {self.where()} LIMIT ?',
+                                                        self.params + [SAMPLER_LISTED_SEQS + 1])]
+        if len(seqs) <= SAMPLER_LISTED_SEQS:
+            self.seqs = seqs
+            self.size = len(seqs)
+
+    def cards_left(self, exclude_ids):
+        """Every matching card whose id isn't in exclude_ids"""
+        rows = self.connection.execute(f'SELECT data FROM cards {self.where()} ORDER BY seq', self.params)
+        return [card for card in (json.loads(data) for data, in rows) if card['id'] not in exclude_ids]
+
+
+def migrate_json_to_sqlite(json_path, sqlite_path):
+    """
+    Copy every card of a JSON database file into a SQLite database
+
+    Cards already in the SQLite database with the same id are replaced. Returns the number of
+    migrated cards.
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        db = json.load(f)
+
+    store = SqliteCardStore(sqlite_path)
+    try:
+        return store.put_many(db.get('cards', []))
+    finally:
+        store.close()
@@ -0,0 +1,131 @@
+"""
+Tests of parallel renders and database writes on the JSON and SQLite backends
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+import cardcreator
+import database
+import web_server
+from cardcreator import render_card
+from job_ids import PARTIAL_SUFFIX, new_job_id
+from render_cache import DiskLRUCache
+from resources.player import Player
+
+BACKENDS = ('json', 'sqlite')
+CARD_CODES = ('RARE_GOLD', 'TOTY', 'RARE_UCL', 'IF_GOLD')
+JOBS = 16
+THREADS = 8
+
+
+class ConcurrencyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.tmp_dir, 'finished-fut-cards')
+        self.saved = (cardcreator.OUTPUT_DIR, cardcreator.render_cache, web_server.OUTPUT_DIR, database.DATABASE_FILE,
+                      database.SQLITE_DATABASE_FILE, database.DATABASE_BACKEND)
+        cardcreator.OUTPUT_DIR = web_server.OUTPUT_DIR = self.output_dir
+        cardcreator.render_cache = DiskLRUCache(os.path.join(self.tmp_dir, 'render-cache'))
+        database.DATABASE_FILE = os.path.join(self.tmp_dir, 'cards_database.json')
+        database.SQLITE_DATABASE_FILE = os.path.join(self.tmp_dir, 'cards_database.sqlite3')
+        self.client = web_server.app.test_client()
+        # renders used to write scratch files to temp/ in the working directory
+        self.temp_existed = os.path.exists('temp')
+
+    def tearDown(self):
+        (cardcreator.OUTPUT_DIR, cardcreator.render_cache, web_server.OUTPUT_DIR, database.DATABASE_FILE,
+         database.SQLITE_DATABASE_FILE, database.DATABASE_BACKEND) = self.saved
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def render_direct(self, index):
+        status_id = new_job_id('test')
+        player = Player(f'PLAYER {index}', 'ST', '1', 'eg', overall=index % 100)
+        return status_id, render_card(player, CARD_CODES[index % len(CARD_CODES)], None, False, status_id)
+
+    def render_web(self, index):
+        response = self.client.post('/api/create-card?mode=url', json={
+            'name': f'WEB {index}', 'position': 'CM', 'club': '10', 'country': 'eg',
+            'overall': index % 100, 'pac': 80, 'dri': 80, 'sho': 80, 'def': 80, 'pas': 80, 'phy': 80,
+            'cardType': CARD_CODES[index % len(CARD_CODES)]
+        })
+        self.assertEqual(response.status_code, 200, response.get_json())
+        body = response.get_json()
+        return os.path.splitext(body['filename'])[0], body['path']
+
+    def check_parallel_renders(self, backend):
+        database.DATABASE_BACKEND = backend
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            direct = list(executor.map(self.render_direct, range(JOBS)))
+            web = list(executor.map(self.render_web, range(JOBS)))
+
+        ids = [status_id for status_id, _ in direct + web]
+        self.assertEqual(len(set(ids)), len(ids))
+        for _, path in direct + web:
+            with Image.open(path) as img:
+                img.load()
+
+        for status_id, path in web:
+            with open(os.path.splitext(path)[0] + '_metadata.json', encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['filename'], os.path.basename(path))
+            self.assertIsNotNone(database.get_card_by_id(status_id))
+        self.assertEqual(len(database.get_all_cards()), JOBS)
+
+        self.assertEqual([name for name in os.listdir(self.output_dir) if name.endswith(PARTIAL_SUFFIX)], [])
+        if not self.temp_existed:
+            self.assertFalse(os.path.exists('temp'))
+
+    def check_parallel_database_writes(self, backend):
+        database.DATABASE_BACKEND = backend
+
+        def add(index):
+            return database.add_card_to_database(f'card_{index}', {'name': f'P{index}', 'position': 'ST',
+                                                                   'overall': index % 100, 'cardType': 'RARE_GOLD'})
+
+        read_errors = []
+
+        def read_while_writing(writes):
+            # the JSON file is replaced atomically, so a reader never sees it half written
+            while not writes.done():
+                try:
+                    with open(database.DATABASE_FILE, encoding='utf-8') as f:
+                        json.load(f)
+                except FileNotFoundError:
+                    pass
+                except ValueError as e:
+                    read_errors.append(e)
+
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            writes = executor.submit(lambda: all(executor.map(add, range(200))))
+            reader = executor.submit(read_while_writing, writes)
+            self.assertTrue(writes.result())
+            reader.result()
+        self.assertEqual(read_errors, [])
+        self.assertEqual(sorted(card['id'] for card in database.get_all_cards()),
+                         sorted(f'card_{index}' for index in range(200)))
+
+    def test_parallel_renders_json(self):
+        self.check_parallel_renders('json')
+
+    def test_parallel_renders_sqlite(self):
+        self.check_parallel_renders('sqlite')
+
+    def test_parallel_database_writes_json(self):
+        self.check_parallel_database_writes('json')
+
+    def test_parallel_database_writes_sqlite(self):
+        self.check_parallel_database_writes('sqlite')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+"""
+Tests of image_fetcher against a local HTTP server
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import image_fetcher
+from image_fetcher import fetch_image, prefetch_images
+from render_cache import DiskLRUCache
+from resources.exceptions import PlayerImageFetchError
+
+IMAGE = b'\x89PNG fake image body'
+ETAG = '"v1"'
+LAST_MODIFIED = 'Wed, 21 Oct 2015 07:28:00 GMT'
+SLOW_SECONDS = 1.0
+# delay of each /prefetch/ response, long enough for concurrent downloads to overlap
+PREFETCH_DELAY = 0.3
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    """Serves the test routes, recording the validators each request sent"""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.headers.get('If-None-Match'),
+                                    self.headers.get('If-Modified-Since')))
+        if self.path == '/etag.png':
+            if self.headers.get('If-None-Match') == ETAG:
+                return self.reply(304)
+            return self.reply(200, IMAGE, {'ETag': ETAG})
+        if self.path == '/last-modified.png':
+            if self.headers.get('If-Modified-Since') == LAST_MODIFIED:
+                return self.reply(304)
+            return self.reply(200, IMAGE, {'Last-Modified': LAST_MODIFIED})
+        if self.path == '/large.png':
+            # no Content-Length, so the limit can only be hit while streaming
+            self.send_response(200)
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            try:
+                for _ in range(64):
+                    self.wfile.write(b'x' * 1024)
+            except OSError:
+                pass
+            self.close_connection = True
+            return
+        if self.path == '/slow.png':
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(IMAGE)))
+            self.end_headers()
+            self.wfile.flush()
+            time.sleep(SLOW_SECONDS)
+            try:
+                self.wfile.write(IMAGE)
+            except OSError:
+                pass
+            return
+        if self.path.startswith('/prefetch/'):
+            with server.lock:
+                server.in_flight += 1
+                server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            time.sleep(PREFETCH_DELAY)
+            with server.lock:
+                server.in_flight -= 1
+            return self.reply(200, self.path.encode('utf-8'))
+        self.reply(404, b'not found')
+
+    def reply(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ImageFetcherTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), ImageHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.in_flight = self.server.max_in_flight = 0
+        self.cache_dir = tempfile.mkdtemp()
+        self.saved = (image_fetcher.image_cache, image_fetcher.FRESH_SECONDS)
+        image_fetcher.image_cache = DiskLRUCache(self.cache_dir)
+
+    def tearDown(self):
+        image_fetcher.image_cache, image_fetcher.FRESH_SECONDS = self.saved
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def url(self, path):
+        return self.base_url + path
+
+    def test_200_is_downloaded_and_cached(self):
+        self.assertEqual(fetch_image(self.url('/etag.png')), IMAGE)
+        # still fresh: answered from the cache without a request
+        self.assertEqual(fetch_image(self.url('/etag.png')), IMAGE)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_304_revalidation_with_etag(self):
+        image_fetcher.FRESH_SECONDS = 0
+        self.assertEqual(fetch_image(self.url('/etag.png')), IMAGE)
+        self.assertEqual(fetch_image(self.url('/etag.png')), IMAGE)
+        self.assertEqual(self.server.requests, [('/etag.png', None, None), ('/etag.png', ETAG, None)])
+
+    def test_304_revalidation_with_if_modified_since(self):
+        image_fetcher.FRESH_SECONDS = 0
+        self.assertEqual(fetch_image(self.url('/last-modified.png')), IMAGE)
+        self.assertEqual(fetch_image(self.url('/last-modified.png')), IMAGE)
+        self.assertEqual(self.server.requests, [('/last-modified.png', None, None),
+                                                ('/last-modified.png', None, LAST_MODIFIED)])
+
+    def test_404_raises(self):
+        with self.assertRaisesRegex(PlayerImageFetchError, 'status 404'):
+            fetch_image(self.url('/missing.png'))
+
+    def test_size_limit_while_streaming(self):
+        with self.assertRaisesRegex(PlayerImageFetchError, 'too large'):
+            fetch_image(self.url('/large.png'), max_bytes=16 * 1024)
+
+    def test_read_timeout(self):
+        start = time.perf_counter()
+        with self.assertRaises(PlayerImageFetchError):
+            fetch_image(self.url('/slow.png'), timeout=(1, 0.2), use_cache=False)
+        self.assertLess(time.perf_counter() - start, SLOW_SECONDS)
+
+    def test_prefetch_images_fetches_concurrently(self):
+        urls = [self.url(f'/prefetch/{i}.png') for i in range(4)] + [self.url('/missing.png')]
+        start = time.perf_counter()
+        results = asyncio.run(prefetch_images(urls, concurrency=4))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([results[url] for url in urls[:4]], [f'/prefetch/{i}.png'.encode('utf-8') for i in range(4)])
+        self.assertIsInstance(results[urls[4]], PlayerImageFetchError)
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLess(elapsed, 4 * PREFETCH_DELAY)
+
+
+if __name__ == '__main__':
+    unittest.main()
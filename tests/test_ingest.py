@@ -0,0 +1,55 @@
+"""
+Tests of ingest.validated_rows and batch.read_players on JSON lines files with malformed lines
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from batch import read_players
+from ingest import validated_rows
+
+ROW = {'name': 'P', 'position': 'ST', 'club': '10', 'country': 'eg', 'overall': 80, 'pac': 80, 'dri': 80,
+       'sho': 80, 'def': 80, 'pas': 80, 'phy': 80, 'cardType': 'RARE_GOLD'}
+
+
+class InvalidJsonLinesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'players.jsonl')
+        lines = [json.dumps(dict(ROW, name='FIRST')), '{"name": "BROKEN", ', '', json.dumps(dict(ROW, name='SECOND')),
+                 json.dumps(dict(ROW, overall=150)), 'not json']
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_read_players_skips_and_reports_bad_lines(self):
+        invalid_lines = []
+        rows = list(read_players(self.path, invalid_lines.append))
+        self.assertEqual([row['name'] for row in rows], ['FIRST', 'SECOND', 'P'])
+        self.assertEqual([(line.line_number, line.text) for line in invalid_lines],
+                         [(2, '{"name": "BROKEN", '), (6, 'not json')])
+
+    def test_validated_rows_rejects_bad_lines_and_keeps_going(self):
+        rejected = []
+        for chunk_size in (1, 2, 100):
+            rejected.clear()
+            rows = list(validated_rows(self.path, rejected.append, chunk_size))
+            self.assertEqual([row['name'] for row in rows], ['FIRST', 'SECOND'])
+            self.assertEqual([(rejected_row.row_number, rejected_row.row) for rejected_row in rejected[::2]],
+                             [(2, '{"name": "BROKEN", '), (5, 'not json')])
+            self.assertTrue(rejected[0].reasons[0].startswith('Invalid JSON: '))
+            self.assertEqual(rejected[1].row_number, 4)
+            self.assertEqual(rejected[1].reasons, ['Invalid overall (150), expected 0-99'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Tests of the DiskLRUCache size cap and write errors
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import render_cache
+from render_cache import DiskLRUCache
+
+
+class DiskLRUCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_evicts_least_recently_used_over_cap(self):
+        cache = DiskLRUCache(self.cache_dir, max_bytes=3000)
+        for i in range(3):
+            cache.put(f'k{i}', b'x' * 1000)
+            os.utime(cache.path_for(f'k{i}'), ns=(i * 10 ** 9, i * 10 ** 9))
+        self.assertIsNotNone(cache.get_path('k0'))
+        cache.put('k3', b'x' * 1000)
+        self.assertIsNone(cache.get_path('k1'))
+        # down to EVICT_TO_FRACTION of the cap, oldest first: k1 then k2
+        self.assertEqual(sorted(os.listdir(self.cache_dir)), ['k0.png', 'k3.png'])
+        self.assertEqual(cache.stats()['bytes'], 2000)
+
+    def test_puts_under_cap_do_not_list_the_directory(self):
+        cache = DiskLRUCache(self.cache_dir, max_bytes=10 ** 6)
+        cache.put('first', b'x' * 100)
+        with mock.patch.object(cache, '_scan', wraps=cache._scan) as scan:
+            for i in range(20):
+                cache.put(f'k{i}', b'x' * 100)
+            # replacing a file doesn't count its bytes twice
+            cache.put('k0', b'y' * 100)
+            self.assertEqual(scan.call_count, 0)
+        self.assertEqual(cache._total, 2100)
+
+    def test_rescans_on_timer(self):
+        cache = DiskLRUCache(self.cache_dir, max_bytes=10 ** 6)
+        cache.put('first', b'x' * 100)
+        with open(cache.path_for('other'), 'wb') as f:
+            f.write(b'x' * 50)
+        with mock.patch.object(render_cache, 'RESCAN_SECONDS', 0):
+            cache.put('second', b'x' * 100)
+        self.assertEqual(cache._total, 250)
+
+    def test_failed_write_removes_partial_file(self):
+        cache = DiskLRUCache(self.cache_dir)
+        with mock.patch('render_cache.os.replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                cache.put('key', b'data')
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
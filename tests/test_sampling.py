@@ -0,0 +1,73 @@
+"""
+Tests of database.sample_cards on the JSON and SQLite backends
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import database
+
+POSITIONS = ('GK', 'CB', 'CM', 'ST')
+CARDS = 400
+
+
+class SamplingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.saved = (database.DATABASE_FILE, database.SQLITE_DATABASE_FILE, database.DATABASE_BACKEND)
+        database.DATABASE_FILE = os.path.join(self.tmp_dir, 'cards_database.json')
+        database.SQLITE_DATABASE_FILE = os.path.join(self.tmp_dir, 'cards_database.sqlite3')
+
+    def tearDown(self):
+        database.DATABASE_FILE, database.SQLITE_DATABASE_FILE, database.DATABASE_BACKEND = self.saved
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def add_cards(self, backend):
+        database.DATABASE_BACKEND = backend
+        database.add_cards_to_database([(f'card_{i}', {'name': f'P{i}', 'position': POSITIONS[i % len(POSITIONS)],
+                                                       'club': str(i % 10), 'overall': 50 + i % 50,
+                                                       'cardType': 'RARE_GOLD'}) for i in range(CARDS)])
+
+    def check_slots_and_filters(self, backend):
+        self.add_cards(backend)
+        slots = ['GK', 'CB', 'CB', 'ST']
+        for weight in database.SAMPLE_WEIGHTS:
+            chosen = database.sample_cards(slots=slots, filters={'cardType': 'rare_gold'}, min_overall=60,
+                                           weight=weight)
+            self.assertEqual([slot for slot, _ in chosen], slots)
+            self.assertEqual(len({card['id'] for _, card in chosen}), len(chosen))
+            for slot, card in chosen:
+                self.assertEqual(card['position'], slot)
+                self.assertEqual(card['cardType'], 'RARE_GOLD')
+                self.assertGreaterEqual(card['overall'], 60)
+
+    def check_exhausted_buckets(self, backend):
+        self.add_cards(backend)
+        # goalkeepers have even numbers, club 1 odd ones
+        self.assertEqual(database.sample_cards(slots=['GK'], filters={'club': '1'}), [])
+        # 4 cards have club 3, position ST and an overall of at least 90
+        chosen = database.sample_cards(slots=['ST'] * 6, filters={'club': '3'}, min_overall=90)
+        self.assertEqual(sorted(card['id'] for _, card in chosen), ['card_143', 'card_243', 'card_343', 'card_43'])
+        self.assertEqual(len(database.sample_cards(count=CARDS + 5)), CARDS)
+
+    def test_slots_and_filters_json(self):
+        self.check_slots_and_filters('json')
+
+    def test_slots_and_filters_sqlite(self):
+        self.check_slots_and_filters('sqlite')
+
+    def test_exhausted_buckets_json(self):
+        self.check_exhausted_buckets('json')
+
+    def test_exhausted_buckets_sqlite(self):
+        self.check_exhausted_buckets('sqlite')
+
+
+if __name__ == '__main__':
+    unittest.main()
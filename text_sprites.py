@@ -0,0 +1,58 @@
+"""
+Cache of pre-rasterized text sprites for the short texts drawn on every card
+ذاكرة مؤقتة للنصوص المرسومة مسبقاً: التقييم والإحصائيات والمراكز
+
+Overall ratings, attribute values (00-99) and position abbreviations are a small set of strings
+drawn with a handful of fonts (dinpro_fonts and champions_fonts in resources/fonts.py) and card
+colours. Instead of rasterizing their glyphs with draw.text on every card, the glyph mask of each
+(font path, size, colour, string) is made once and the colour is pasted through it, which gives
+exactly the pixels draw.text would. Names are too varied to be worth caching and are drawn live.
+"""
+
+import math
+import os
+from collections import namedtuple
+
+from PIL import Image, ImageColor, ImageDraw
+
+from asset_cache import AssetCache
+
+# memory cap of the sprite cache; a two digit attribute value is about 3 KB
+TEXT_SPRITE_MAX_BYTES = int(os.environ.get('TEXT_SPRITE_CACHE_MB', 8)) * 1024 * 1024
+
+# mask is the glyph coverage (mode L), offset its position relative to the text origin, colour RGBA
+TextSprite = namedtuple('TextSprite', 'mask offset colour')
+
+
+def sprite_nbytes(sprite):
+    return sprite.mask.width * sprite.mask.height
+
+
+# sprites shared by every render in the process
+text_sprite_cache = AssetCache(TEXT_SPRITE_MAX_BYTES, sizeof=sprite_nbytes)
+
+
+def make_text_sprite(text, font, fill, start):
+    """Rasterize text once; start is the fractional part of the position, which shifts the glyphs"""
+    colour = ImageColor.getcolor(fill, 'RGBA') if isinstance(fill, str) else tuple(fill)
+    left, top, right, bottom = font.getbbox(text, anchor='la')
+    # the start shifts the glyphs by less than a pixel, so one more column and row hold them; the text is
+    # drawn at a whole number plus start (draw.text takes the start from the fraction of its position)
+    origin = (max(0, -left), max(0, -top))
+    canvas = Image.new('L', (origin[0] + right + 1, origin[1] + bottom + 1))
+    ImageDraw.Draw(canvas).text((origin[0] + start[0], origin[1] + start[1]), text, fill=255, font=font, anchor='la')
+    mask = canvas.crop((origin[0] + left, origin[1] + top, canvas.width, canvas.height))
+    return TextSprite(mask, (left, top), colour)
+
+
+def paste_text(card_img, xy, text, font, fill):
+    """Draw text on an RGBA image like ImageDraw.text(xy, text, fill=fill, font=font), from the sprite cache"""
+    x, y = xy
+    start = (math.modf(x)[0], math.modf(y)[0])
+    sprite = text_sprite_cache.get((font.path, font.size, fill, text, start),
+                                   lambda: make_text_sprite(text, font, fill, start))
+    width, height = sprite.mask.size
+    if not width or not height:
+        return
+    left, top = int(x) + sprite.offset[0], int(y) + sprite.offset[1]
+    card_img.paste(sprite.colour, (left, top, left + width, top + height), sprite.mask)
@@ -3,11 +3,17 @@ Flask Web Server for FIFA Card Creator
 السيرفر الخلفي لمنشئ بطاقات FIFA
 """
 
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, request, jsonify, send_file, send_from_directory, Response, stream_with_context, url_for, g
 from flask_cors import CORS
 import os
 import sys
+import signal
+import argparse
 import base64
+import json
+import mimetypes
+import uuid
+from datetime import datetime
 from io import BytesIO
 from PIL import Image
 
@@ -15,8 +21,23 @@ from PIL import Image
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from resources.player import Player
-from cardcreator import render_card
-from database import add_card_to_database, get_all_cards, get_random_cards, get_card_by_id
+from cardcreator import render_card_with_renditions
+from batch import get_render_pool, render_batch
+from render_jobs import RenderJobQueue
+from render_cache import render_cache
+from render_metrics import collect_timings, prometheus_text, record, server_timing_header
+from render_pool import BoundedRenderPool, render_row_to_bytes
+from resources.exceptions import RenderDeadlineExceededError, RenderPoolBusyError, RenderQueueFullError
+from card_templates import warm_up_card_templates
+from job_ids import cleanup_partial_files, new_job_id, publish_file
+from output_encoder import get_output_options
+from renditions import ensure_rendition, parse_rendition_width, rendition_filename
+from database import (DATABASE_FILE, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, QUERY_FILTER_FIELDS, add_card_to_database,
+                      card_metadata, get_all_cards, get_card_by_id, query_cards, sample_cards, write_card_metadata)
+
+# not every platform's mimetypes table knows the newer card formats
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('image/avif', '.avif')
 
 app = Flask(__name__, static_folder='web', static_url_path='')
 CORS(app)  # Enable CORS for all routes
@@ -25,6 +46,68 @@ CORS(app)  # Enable CORS for all routes
 OUTPUT_DIR = 'finished-fut-cards'
 WEB_DIR = 'web'
 ASSETS_DIR = 'assets'
+# Decode every card background and font at startup so the first requests don't pay for it
+WARM_UP_CARD_TEMPLATES = True
+# Maximum number of cards accepted by /api/create-cards in one request
+MAX_BULK_CARDS = 500
+# How long browsers may reuse a preview image before revalidating it with its ETag
+PREVIEW_MAX_AGE = 60
+# How card images are returned by /api/create-card, /api/get-cards and /api/random-players (?mode=...):
+#   inline    - base64 data URLs inside the JSON body (default, what the web pages use)
+#   url       - JSON metadata with an imageUrl served by /api/preview/<filename>
+#   multipart - a streamed multipart/mixed response: a JSON part followed by one image part per card
+RESPONSE_MODES = ('inline', 'url', 'multipart')
+# Chunk size used when streaming card images from disk
+STREAM_CHUNK_SIZE = 64 * 1024
+# Production serving (python web_server.py --production), each can also be set on the command line:
+#   number of render worker processes (default: all cores)
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', 0)) or None
+#   renders allowed to wait for a worker before requests get 503 (default: 4 per worker)
+RENDER_QUEUE_SIZE = int(os.environ['RENDER_QUEUE_SIZE']) if os.environ.get('RENDER_QUEUE_SIZE') else None
+#   seconds a request waits for its card before getting 504
+RENDER_DEADLINE = float(os.environ.get('RENDER_DEADLINE', 30))
+#   HTTP request threads
+SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 16))
+# Seconds clients are asked to wait (Retry-After) when the render queue is full
+RETRY_AFTER_SECONDS = 5
+# Render jobs (/api/jobs and /api/create-cards): worker threads, jobs waiting for a thread before
+# submissions get 503, and seconds a finished job's result stays available
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+MAX_JOB_BACKLOG = int(os.environ.get('MAX_JOB_BACKLOG', 256))
+JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL', 15 * 60))
+# Most cards /api/random-players returns in one request (?count= or the number of ?positions= slots)
+MAX_RANDOM_PLAYERS = 50
+# Fields every card request must have
+REQUIRED_CARD_FIELDS = ['name', 'position', 'club', 'country', 'overall',
+                        'pac', 'dri', 'sho', 'def', 'pas', 'phy', 'cardType']
+
+# Bounded pool of render worker processes, only used in production mode (renders run in the request thread otherwise)
+render_pool = None
+# Queue of asynchronous render jobs
+job_queue = RenderJobQueue(JOB_WORKERS, MAX_JOB_BACKLOG, JOB_RESULT_TTL)
+
+
+@app.before_request
+def start_render_timings():
+    """Collect the stage timings of the renders done while handling this request"""
+    g.render_timings_collector = collect_timings()
+    g.render_timings = g.render_timings_collector.__enter__()
+
+
+@app.after_request
+def add_server_timing_header(response):
+    """Report the render stages of this request in a Server-Timing header"""
+    timings = g.get('render_timings')
+    if timings:
+        response.headers['Server-Timing'] = server_timing_header(timings)
+    return response
+
+
+@app.teardown_request
+def stop_render_timings(error=None):
+    collector = g.pop('render_timings_collector', None)
+    if collector is not None:
+        collector.__exit__(None, None, None)
 
 
 @app.route('/')
@@ -45,6 +128,316 @@ def serve_assets(filepath):
     return send_from_directory(ASSETS_DIR, filepath)
 
 
+def decode_uploaded_image(image_field):
+    """
+    Decode a base64 (or data URL) uploaded image, kept in memory for the renderer
+
+    Returns the image bytes, or None if they are not a readable image
+    """
+    try:
+        # Decode base64 image
+        image_data = image_field.split(',')[1] if ',' in image_field else image_field
+        image_bytes = base64.b64decode(image_data)
+        
+        # Make sure Pillow can read it (only parses the header)
+        Image.open(BytesIO(image_bytes))
+        return image_bytes
+        
+    except Exception as e:
+        print(f"Error processing image: {str(e)}")
+        return None
+
+
+def save_card_metadata(status_id, data, output_path, has_image):
+    """Save the player metadata next to the card image and in the database (for the Formation Planner)"""
+    try:
+        metadata = card_metadata(data, output_path, has_image)
+        
+        # Save metadata JSON file alongside card image (written privately, then renamed into place)
+        write_card_metadata(output_path, metadata)
+        
+        # Save to database
+        add_card_to_database(status_id, metadata)
+        print(f"✅ Card saved to database with ID: {status_id}")
+            
+    except Exception as e:
+        print(f"Warning: Could not save metadata: {str(e)}")
+
+
+def get_response_mode():
+    """Return the requested response mode (?mode=...), raising ValueError if it is unknown"""
+    mode = request.args.get('mode', 'inline').lower()
+    if mode not in RESPONSE_MODES:
+        raise ValueError(f"Invalid mode ({mode}), expected one of: {', '.join(RESPONSE_MODES)}")
+    return mode
+
+
+def get_requested_width():
+    """Return the requested rendition width (?width=...), None for the full card, raising ValueError if invalid"""
+    return parse_rendition_width(request.args.get('width'))
+
+
+def card_image_url(filename, width=None):
+    """URL of a card image (or its rendition at width) served with ETag, Last-Modified and Range support by /api/preview"""
+    return url_for('preview_card', filename=filename, width=width)
+
+
+def card_image_path(filename, width=None):
+    """Path of a card image, or of its rendition at width (created on the fly for older cards)"""
+    if width is not None:
+        filename = ensure_rendition(OUTPUT_DIR, filename, width)
+    return os.path.join(OUTPUT_DIR, filename)
+
+
+def get_card_query():
+    """
+    Filters and page of a card listing from the query string, as query_cards keyword arguments
+    
+    ?cardType=, ?position=, ?club=, ?country=, ?minOverall=, ?maxOverall=, ?cursor= and ?limit=
+    (1 to MAX_PAGE_SIZE). Raises ValueError if the limit is invalid.
+    """
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE)
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = None
+    if limit is None or not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"Invalid limit ({request.args.get('limit')}), expected 1 to {MAX_PAGE_SIZE}")
+    return {
+        'filters': {field: request.args.get(field) or None for field in QUERY_FILTER_FIELDS},
+        'min_overall': request.args.get('minOverall') or None,
+        'max_overall': request.args.get('maxOverall') or None,
+        'cursor': request.args.get('cursor') or None,
+        'limit': limit
+    }
+
+
+def get_sample_query():
+    """
+    What /api/random-players draws, from the query string, as sample_cards keyword arguments
+    
+    ?count= (default 6) or ?positions=GK,CB,CB,ST (one card per slot), the filters of get_card_query
+    except the cursor and page size, and ?weight=uniform|overall. Raises ValueError if invalid.
+    """
+    slots = [slot.strip() for slot in request.args.get('positions', '').split(',') if slot.strip()]
+    count = len(slots) if slots else request.args.get('count', 6)
+    try:
+        count = int(count)
+    except ValueError:
+        raise ValueError(f'Invalid count ({count})')
+    if not 1 <= count <= MAX_RANDOM_PLAYERS:
+        raise ValueError(f'Invalid count ({count}), expected 1 to {MAX_RANDOM_PLAYERS} cards')
+    return {
+        'count': count,
+        'slots': slots,
+        'filters': {field: request.args.get(field) or None for field in QUERY_FILTER_FIELDS},
+        'min_overall': request.args.get('minOverall') or None,
+        'max_overall': request.args.get('maxOverall') or None,
+        'weight': request.args.get('weight', 'uniform')
+    }
+
+
+def card_created_timestamp(card):
+    """Creation time of a database card entry as a Unix timestamp"""
+    try:
+        return datetime.fromisoformat(card['created_at']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def card_mimetype(filename):
+    """Mimetype of a card file from its extension (PNG, WebP, JPEG or AVIF)"""
+    return mimetypes.guess_type(filename)[0] or 'image/png'
+
+
+def inline_image_data(card_path):
+    """Read a card image and return it as a base64 data URL"""
+    with open(card_path, 'rb') as f:
+        image_data = base64.b64encode(f.read()).decode('utf-8')
+    return f'data:{card_mimetype(card_path)};base64,{image_data}'
+
+
+def get_request_output_options(data):
+    """
+    Output format of the cards of this request: the "output" field of the JSON body or the ?output= parameter
+    
+    The value is a preset or format name, or an object of options (see output_encoder). Raises ValueError if invalid.
+    """
+    value = data.get('output') if isinstance(data, dict) else None
+    if value is None:
+        value = request.args.get('output')
+    return get_output_options(value)
+
+
+def multipart_response(body, images):
+    """
+    Stream a multipart/mixed response: the JSON body first, then one image part per card
+
+    images is a list of (filename, path or bytes); files are read in chunks while streaming so
+    only one chunk is held in memory at a time.
+    """
+    boundary = uuid.uuid4().hex
+
+    def generate():
+        yield (f'--{boundary}\r\nContent-Type: application/json; charset=utf-8\r\n\r\n'
+               f'{json.dumps(body, ensure_ascii=False)}\r\n').encode('utf-8')
+        for filename, image in images:
+            yield (f'--{boundary}\r\nContent-Type: {card_mimetype(filename)}\r\n'
+                   f'Content-Disposition: inline; filename="{filename}"\r\n\r\n').encode('utf-8')
+            if isinstance(image, bytes):
+                yield image
+            else:
+                with open(image, 'rb') as f:
+                    while True:
+                        chunk = f.read(STREAM_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        yield chunk
+            yield b'\r\n'
+        yield f'--{boundary}--\r\n'.encode('utf-8')
+
+    return Response(stream_with_context(generate()), mimetype=f'multipart/mixed; boundary={boundary}')
+
+
+def missing_card_field(data):
+    """Return the first required field missing from card data, or None"""
+    for field in REQUIRED_CARD_FIELDS:
+        if field not in data:
+            return field
+    return None
+
+
+def busy_response(error):
+    """503 response asking the client to retry after RETRY_AFTER_SECONDS"""
+    response = jsonify({
+        'success': False,
+        'error': str(error)
+    })
+    response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+    return response, 503
+
+
+def render_and_save_card(data, status_id, output_options=None, wait_for_worker=False):
+    """
+    Render a card from /api/create-card data, publish it to OUTPUT_DIR and save its metadata
+
+    output_options is the OutputOptions of the card (default: PNG). In production, a request
+    fails fast when the render pool is full and waits at most RENDER_DEADLINE; background jobs
+    (wait_for_worker) wait for a worker as long as it takes, they already queued for their turn.
+
+    Returns (output_path, card_bytes)
+    """
+    # Handle uploaded image
+    player_image = None
+    if 'image' in data and data['image']:
+        player_image = decode_uploaded_image(data['image'])
+    
+    # Create player object
+    player = Player(
+        name=data['name'].upper(),
+        pos=data['position'],
+        club=data['club'],
+        country=data['country'],
+        overall=int(data['overall']),
+        pac=int(data['pac']),
+        dri=int(data['dri']),
+        sho=int(data['sho']),
+        deff=int(data['def']),
+        pas=int(data['pas']),
+        phy=int(data['phy']),
+        language='EN'
+    )
+    
+    # Create card (and its smaller renditions) in memory, then write them once for downloads and previews
+    output_options = get_output_options(output_options)
+    if render_pool is None:
+        card_bytes, renditions = render_card_with_renditions(
+            player=player,
+            card_code=data['cardType'],
+            player_image=player_image,
+            dynamic_img_fl=False,
+            output_options=output_options
+        )
+    else:
+        row = {key: value for key, value in data.items() if key not in ('image', 'output')}
+        row['language'] = 'EN'
+        card_bytes, renditions, timings = render_pool.run(render_row_to_bytes, row, data['cardType'], player_image,
+                                                          output_options=output_options,
+                                                          deadline=None if wait_for_worker else RENDER_DEADLINE,
+                                                          block=wait_for_worker)
+        for timing in timings:
+            record(timing)
+    card_filename = f'{status_id}.{output_options.extension}'
+    output_path = os.path.join(OUTPUT_DIR, card_filename)
+    # renditions first, so a card that is visible always has its renditions
+    for width, rendition_bytes in renditions.items():
+        publish_file(os.path.join(OUTPUT_DIR, rendition_filename(card_filename, width)), rendition_bytes)
+    publish_file(output_path, card_bytes)
+    
+    # Save player metadata for Formation Planner
+    save_card_metadata(status_id, data, output_path, player_image is not None)
+    return output_path, card_bytes
+
+
+def render_and_save_cards(cards, id_prefix, output_options=None):
+    """
+    Render a list of /api/create-cards cards in parallel on the process pool and save their metadata
+
+    Returns the /api/create-cards response body
+    """
+    rows = []
+    for index, card in enumerate(cards):
+        if not isinstance(card, dict):
+            card = {}
+        row = {key: value for key, value in card.items() if key not in ('image', 'dynamic')}
+        row['id'] = f"{id_prefix}_{index}"
+        row['language'] = 'EN'
+        # uploaded images are base64 only, never paths or URLs
+        if card.get('image'):
+            row['image'] = decode_uploaded_image(card['image'])
+        rows.append(row)
+    
+    results = []
+    # through the bounded pool's slots, waiting for them rather than failing rows half way through the batch
+    pool = render_pool.waiting() if render_pool is not None else get_render_pool()
+    # render_batch saves the metadata and database entry of each card
+    for result in render_batch(rows, pool, id_prefix, output_options=output_options):
+        if result['success']:
+            results.append({
+                'index': result['index'],
+                'id': result['id'],
+                'success': True,
+                'filename': result['filename'],
+                'previewUrl': f"/api/preview/{result['filename']}"
+            })
+        else:
+            results.append({
+                'index': result['index'],
+                'id': result['id'],
+                'success': False,
+                'error': result['error']
+            })
+    
+    results.sort(key=lambda r: r['index'])
+    created = sum(1 for r in results if r['success'])
+    return {
+        'success': True,
+        'message': f'{created} of {len(results)} cards created',
+        'created': created,
+        'failed': len(results) - created,
+        'cards': results
+    }
+
+
+def validate_bulk_cards(data):
+    """Return an error message if /api/create-cards data is invalid, or None"""
+    if not data or not isinstance(data.get('cards'), list):
+        return 'Missing required field: cards'
+    if len(data['cards']) > MAX_BULK_CARDS:
+        return f'Too many cards, the maximum per request is {MAX_BULK_CARDS}'
+    return None
+
+
 @app.route('/api/create-card', methods=['POST'])
 def create_card():
     """
@@ -69,117 +462,181 @@ def create_card():
     try:        # Get JSON data
         data = request.get_json()
         
-        # Validate data
-        required_fields = ['name', 'position', 'club', 'country', 'overall', 
-                          'pac', 'dri', 'sho', 'def', 'pas', 'phy', 'cardType']
+        try:
+            mode = get_response_mode()
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
         
-        for field in required_fields:
-            if field not in data:
-                return jsonify({
-                    'success': False,
-                    'error': f'Missing required field: {field}'
-                }), 400
-          # Handle uploaded image
-        player_image_path = None
-        if 'image' in data and data['image']:
-            try:
-                # Decode base64 image
-                image_data = data['image'].split(',')[1] if ',' in data['image'] else data['image']
-                image_bytes = base64.b64decode(image_data)
-                
-                # Save temporary image in the temp/ folder (same as cardcreator expects)
-                temp_dir = 'temp'
-                if not os.path.exists(temp_dir):
-                    os.makedirs(temp_dir)
-                
-                import time
-                temp_image_name = f"uploaded_{int(time.time())}.png"
-                player_image_path = os.path.join(temp_dir, temp_image_name)
-                
-                # Open and save image
-                img = Image.open(BytesIO(image_bytes))
-                img.save(player_image_path, 'PNG')
-                
-                # Convert to absolute path
-                player_image_path = os.path.abspath(player_image_path)
-                print(f"Saved uploaded image to: {player_image_path}")
-                
-            except Exception as e:
-                print(f"Error processing image: {str(e)}")
-                player_image_path = None
+        # Validate data
+        missing_field = missing_card_field(data)
+        if missing_field:
+            return jsonify({
+                'success': False,
+                'error': f'Missing required field: {missing_field}'
+            }), 400
         
-        # Create player object
-        player = Player(
-            name=data['name'].upper(),
-            pos=data['position'],
-            club=data['club'],
-            country=data['country'],
-            overall=int(data['overall']),
-            pac=int(data['pac']),
-            dri=int(data['dri']),
-            sho=int(data['sho']),
-            deff=int(data['def']),
-            pas=int(data['pas']),
-            phy=int(data['phy']),
-            language='EN'
-        )
-          # Generate unique status_id
-        import time
-        status_id = f"web_{int(time.time())}"
-          # Create card
-        output_path = render_card(
-            player=player,
-            card_code=data['cardType'],
-            player_image_url=player_image_path,
-            dynamic_img_fl=False,
-            status_id=status_id
-        )
-          # Save player metadata for Formation Planner
         try:
-            import json
-            metadata = {
-                'name': data['name'].upper(),
-                'position': data['position'],
-                'overall': int(data['overall']),
-                'pac': int(data['pac']),
-                'dri': int(data['dri']),
-                'sho': int(data['sho']),
-                'def': int(data['def']),
-                'pas': int(data['pas']),
-                'phy': int(data['phy']),
-                'club': data['club'],
-                'country': data['country'],
-                'cardType': data['cardType'],
-                'timestamp': int(time.time()),
-                'hasImage': player_image_path is not None,
-                'filename': os.path.basename(output_path)
-            }
-            
-            # Save metadata JSON file alongside card image
-            metadata_path = output_path.replace('.png', '_metadata.json')
-            with open(metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, indent=2, ensure_ascii=False)
-            
-            # Save to database
-            add_card_to_database(status_id, metadata)
-            print(f"✅ Card saved to database with ID: {status_id}")
-                
-        except Exception as e:
-            print(f"Warning: Could not save metadata: {str(e)}")
+            output_options = get_request_output_options(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
         
-        # Read the generated image and convert to base64 for preview
-        with open(output_path, 'rb') as f:
-            image_data = base64.b64encode(f.read()).decode('utf-8')
+        # Generate unique status_id (unique even for requests in the same second)
+        status_id = new_job_id('web')
+        output_path, card_bytes = render_and_save_card(data, status_id, output_options)
         
-        # Return success response with image data
-        return jsonify({
+        body = {
             'success': True,
             'message': 'Card created successfully!',
             'filename': os.path.basename(output_path),
             'path': output_path,
-            'imageData': f'data:image/png;base64,{image_data}'
-        }), 200
+            'imageUrl': card_image_url(os.path.basename(output_path))
+        }
+        
+        if mode == 'url':
+            return jsonify(body), 200
+        
+        if mode == 'multipart':
+            return multipart_response(body, [(body['filename'], card_bytes)])
+        
+        # Convert the generated image to base64 for preview
+        image_data = base64.b64encode(card_bytes).decode('utf-8')
+        body['imageData'] = f'data:{output_options.mimetype};base64,{image_data}'
+        
+        # Return success response with image data
+        return jsonify(body), 200
+        
+    except RenderPoolBusyError as e:
+        return busy_response(e)
+    
+    except RenderDeadlineExceededError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 504
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/create-cards', methods=['POST'])
+def create_cards():
+    """
+    Create many FIFA cards in one request, rendered in parallel on the shared process pool
+    
+    Expected JSON format:
+    {
+        "cards": [ {same fields as /api/create-card}, ... ]
+    }
+    
+    A card that fails doesn't stop the others; each result has its own success flag.
+    Images are not returned inline, use the previewUrl of each card instead.
+    The batch runs on the render job queue like a job submitted to /api/jobs, this request waits for it.
+    """
+    try:
+        data = request.get_json()
+        error = validate_bulk_cards(data)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        try:
+            output_options = get_request_output_options(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        cards = data['cards']
+        job = job_queue.submit(lambda job: render_and_save_cards(cards, job.id, output_options), kind='batch',
+                               prefix='web')
+        job.wait()
+        if job.status == 'failed':
+            raise RuntimeError(job.error)
+        return jsonify(job.result), 200
+    
+    except RenderQueueFullError as e:
+        return busy_response(e)
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def job_status_body(job):
+    """JSON body describing a render job, with the URLs to poll it and fetch its result"""
+    return {
+        'success': True,
+        'jobId': job.id,
+        'status': job.status,
+        'job': job.to_dict(),
+        'statusUrl': url_for('get_job', job_id=job.id),
+        'resultUrl': url_for('get_job_result', job_id=job.id)
+    }
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Submit a render job and return its id straight away (202), without waiting for the card
+    
+    The body is either a single card (same fields as /api/create-card) or a batch
+    ({"cards": [...]}, same as /api/create-cards). Poll /api/jobs/<id> for the status and
+    fetch /api/jobs/<id>/result once it is done.
+    """
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({
+                'success': False,
+                'error': 'Expected a JSON object'
+            }), 400
+        
+        try:
+            output_options = get_request_output_options(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        if 'cards' in data:
+            error = validate_bulk_cards(data)
+            if error:
+                return jsonify({
+                    'success': False,
+                    'error': error
+                }), 400
+            cards = data['cards']
+            job = job_queue.submit(lambda job: render_and_save_cards(cards, job.id, output_options), kind='batch')
+        else:
+            missing_field = missing_card_field(data)
+            if missing_field:
+                return jsonify({
+                    'success': False,
+                    'error': f'Missing required field: {missing_field}'
+                }), 400
+            job = job_queue.submit(lambda job: os.path.basename(
+                render_and_save_card(data, job.id, output_options, wait_for_worker=True)[0]))
         
+        return jsonify(job_status_body(job)), 202
+    
+    except RenderQueueFullError as e:
+        return busy_response(e)
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -187,6 +644,46 @@ def create_card():
         }), 500
 
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status and timings of a render job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown job, or its result has expired'
+        }), 404
+    return jsonify(job_status_body(job))
+
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """
+    Result of a finished render job: the card image for a single card, the /api/create-cards body for a batch
+    
+    Returns 202 with the job status while it is still queued or running.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown job, or its result has expired'
+        }), 404
+    
+    if not job.finished:
+        return jsonify(job_status_body(job)), 202
+    
+    if job.status == 'failed':
+        return jsonify({
+            'success': False,
+            'error': job.error
+        }), 500
+    
+    if job.kind == 'batch':
+        return jsonify(job.result)
+    return preview_card(job.result)
+
+
 @app.route('/api/download/<filename>')
 def download_card(filename):
     """Download a created card"""
@@ -205,9 +702,28 @@ def download_card(filename):
 
 @app.route('/api/preview/<filename>')
 def preview_card(filename):
-    """Preview a created card"""
+    """
+    Preview a created card (supports ETag / Last-Modified revalidation and Range requests)
+    
+    ?width=64|128|256 serves a smaller rendition of the card instead.
+    """
+    try:
+        width = get_requested_width()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
     try:
-        return send_from_directory(OUTPUT_DIR, filename)
+        if width is not None:
+            filename = ensure_rendition(OUTPUT_DIR, filename, width)
+        return send_from_directory(OUTPUT_DIR, filename, conditional=True, etag=True, max_age=PREVIEW_MAX_AGE)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -217,32 +733,53 @@ def preview_card(filename):
 
 @app.route('/api/cards', methods=['GET'])
 def list_cards():
-    """List all created cards"""
+    """
+    List the created cards newest first, with the URL of the card or of its rendition at ?width=
+    
+    Cards come from the database index, one page at a time: pass the returned nextCursor as ?cursor=
+    to get the next page. Filters are listed in get_card_query.
+    """
     try:
-        if not os.path.exists(OUTPUT_DIR):
-            return jsonify({
-                'success': True,
-                'cards': []
-            })
+        width = get_requested_width()
+        query = get_card_query()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    try:
+        page, next_cursor = query_cards(**query)
         
         cards = []
-        for filename in os.listdir(OUTPUT_DIR):
-            if filename.endswith('.png'):
-                file_path = os.path.join(OUTPUT_DIR, filename)
-                cards.append({
-                    'filename': filename,
-                    'size': os.path.getsize(file_path),
-                    'created': os.path.getctime(file_path)
-                })
-        
-        # Sort by creation time (newest first)
-        cards.sort(key=lambda x: x['created'], reverse=True)
+        for card in page:
+            filename = card.get('filename')
+            if not filename:
+                continue
+            try:
+                size = os.path.getsize(os.path.join(OUTPUT_DIR, filename))
+            except OSError:
+                # the image was removed from disk
+                continue
+            cards.append({
+                'id': card['id'],
+                'filename': filename,
+                'imageUrl': card_image_url(filename, width),
+                'size': size,
+                'created': card_created_timestamp(card)
+            })
         
         return jsonify({
             'success': True,
-            'cards': cards
+            'cards': cards,
+            'nextCursor': next_cursor
         })
-        
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -253,59 +790,83 @@ def list_cards():
 @app.route('/api/get-cards', methods=['GET'])
 def get_cards():
     """
-    Get list of all created FIFA cards with metadata
-    Returns card images as base64 for display along with player info
+    Get the created FIFA cards with metadata, newest first (20 per page by default)
+    Returns card images as base64 for display along with player info,
+    or as image URLs / a multipart stream depending on ?mode= (see RESPONSE_MODES)
+    ?width=64|128|256 returns smaller renditions of the cards instead of the full images
+    Pages, filters and ?cursor= work like /api/cards
     """
     try:
-        import json
+        mode = get_response_mode()
+        width = get_requested_width()
+        query = get_card_query()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    try:
+        page, next_cursor = query_cards(**query)
         cards = []
-        output_path = os.path.abspath(OUTPUT_DIR)
+        images = []
         
-        if os.path.exists(output_path):
-            # Get all PNG files in the output directory
-            card_files = [f for f in os.listdir(output_path) if f.endswith('.png')]
+        for card in page:
+            card_file = card.get('filename')
+            if not card_file or not os.path.exists(os.path.join(OUTPUT_DIR, card_file)):
+                continue
             
-            # Sort by modification time (newest first)
-            card_files.sort(key=lambda x: os.path.getmtime(os.path.join(output_path, x)), reverse=True)
+            timestamp = card_created_timestamp(card)
+            card_data = {
+                'filename': card_file,
+                'imageUrl': card_image_url(card_file, width),
+                'timestamp': timestamp,
+                # the fields of the metadata file saved next to the card
+                'metadata': {
+                    'name': card.get('name', ''),
+                    'position': card.get('position', ''),
+                    'overall': card.get('overall', 0),
+                    'pac': card.get('pac', 0),
+                    'dri': card.get('dri', 0),
+                    'sho': card.get('sho', 0),
+                    'def': card.get('def', 0),
+                    'pas': card.get('pas', 0),
+                    'phy': card.get('phy', 0),
+                    'club': card.get('club', ''),
+                    'country': card.get('country', ''),
+                    'cardType': card.get('cardType', ''),
+                    'timestamp': int(timestamp) if timestamp is not None else None,
+                    'hasImage': card.get('hasImage', False),
+                    'filename': card_file
+                }
+            }
             
-            # Limit to last 20 cards to avoid large response
-            card_files = card_files[:20]
+            # Read and encode image (or its rendition)
+            image_path = card_image_path(card_file, width)
+            if mode == 'inline':
+                card_data['imageData'] = inline_image_data(image_path)
+            else:
+                images.append((os.path.basename(image_path), image_path))
             
-            for card_file in card_files:
-                card_path = os.path.join(output_path, card_file)
-                
-                # Read and encode image
-                with open(card_path, 'rb') as f:
-                    image_data = base64.b64encode(f.read()).decode('utf-8')
-                
-                # Try to load metadata
-                metadata_path = card_path.replace('.png', '_metadata.json')
-                metadata = None
-                if os.path.exists(metadata_path):
-                    try:
-                        with open(metadata_path, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
-                    except Exception as e:
-                        print(f"Could not load metadata for {card_file}: {e}")
-                
-                card_data = {
-                    'filename': card_file,
-                    'imageData': f'data:image/png;base64,{image_data}',
-                    'timestamp': os.path.getmtime(card_path)
-                }
-                
-                # Add metadata if available
-                if metadata:
-                    card_data['metadata'] = metadata
-                
-                cards.append(card_data)
+            cards.append(card_data)
         
-        return jsonify({
+        body = {
             'success': True,
             'cards': cards,
-            'total': len(cards)
-        })
+            'total': len(cards),
+            'nextCursor': next_cursor
+        }
+        
+        if mode == 'multipart':
+            return multipart_response(body, images)
+        
+        return jsonify(body)
     
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -323,28 +884,57 @@ def health_check():
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Render timings by stage and card code, render cache and job counters, in the Prometheus text format"""
+    cache_stats = render_cache.stats()
+    extra_lines = [
+        '# HELP fut_card_render_cache_hits_total Render cache hits',
+        '# TYPE fut_card_render_cache_hits_total counter',
+        f"fut_card_render_cache_hits_total {cache_stats['hits']}",
+        '# HELP fut_card_render_cache_misses_total Render cache misses',
+        '# TYPE fut_card_render_cache_misses_total counter',
+        f"fut_card_render_cache_misses_total {cache_stats['misses']}",
+        '# HELP fut_card_render_jobs Render jobs by status',
+        '# TYPE fut_card_render_jobs gauge',
+    ]
+    extra_lines += [f'fut_card_render_jobs{{status="{status}"}} {count}'
+                    for status, count in job_queue.stats().items()]
+    return Response(prometheus_text(extra_lines), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/api/random-players', methods=['GET'])
 def get_random_players():
-    """Get random players for formation (default 6)"""
+    """
+    Get random players for formation (default 6), images are returned according to ?mode= and ?width=
+    ?positions=GK,CB,CB,ST draws one card per position slot (each card has its "slot"), filtered by
+    ?cardType=, ?club=, ?country=, ?minOverall=, ?maxOverall= and weighted by rating with ?weight=overall
+    """
     try:
-        count = int(request.args.get('count', 6))
-        cards = get_random_cards(count)
+        mode = get_response_mode()
+        width = get_requested_width()
+        query = get_sample_query()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    try:
+        sampled = sample_cards(**query)
         
         # Load images for each card
-        import base64
         result_cards = []
+        images = []
         
-        for card in cards:
+        for slot, card in sampled:
             if 'filename' in card and card['filename']:
                 card_path = os.path.join(OUTPUT_DIR, card['filename'])
                 if os.path.exists(card_path):
                     try:
-                        with open(card_path, 'rb') as f:
-                            image_data = base64.b64encode(f.read()).decode('utf-8')
-                        
-                        result_cards.append({
+                        card_data = {
                             'filename': card['filename'],
-                            'imageData': f'data:image/png;base64,{image_data}',
+                            'imageUrl': card_image_url(card['filename'], width),
                             'metadata': {
                                 'name': card.get('name', ''),
                                 'position': card.get('position', ''),
@@ -356,16 +946,36 @@ def get_random_players():
                                 'def': card.get('def', 0),
                                 'phy': card.get('phy', 0)
                             }
-                        })
+                        }
+                        if slot:
+                            card_data['slot'] = slot
+                        
+                        image_path = card_image_path(card['filename'], width)
+                        if mode == 'inline':
+                            card_data['imageData'] = inline_image_data(image_path)
+                        else:
+                            images.append((os.path.basename(image_path), image_path))
+                        
+                        result_cards.append(card_data)
                     except Exception as e:
                         print(f"Error loading card image: {e}")
         
-        return jsonify({
+        body = {
             'success': True,
             'cards': result_cards,
             'total': len(result_cards)
-        })
+        }
+        
+        if mode == 'multipart':
+            return multipart_response(body, images)
+        
+        return jsonify(body)
     
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -391,24 +1001,96 @@ def internal_error(error):
     }), 500
 
 
+def serve_production(host, port, threads=SERVER_THREADS):
+    """
+    Serve the app with a production WSGI server, rendering on the bounded worker pool
+
+    Uses waitress when it is installed, otherwise the threaded werkzeug server without the debugger.
+    On CTRL+C or SIGTERM the server stops accepting requests, then waits for the queued renders.
+    """
+    def ignore_stop_signals():
+        # a second CTRL+C or SIGTERM must not interrupt the graceful shutdown
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    def stop(signum, frame):
+        # render workers run in forkserver (or spawn) processes, which don't inherit this handler
+        ignore_stop_signals()
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        try:
+            from waitress import serve
+        except ImportError:
+            print("⚠️  waitress is not installed (pip install waitress), using the werkzeug server")
+            from werkzeug.serving import make_server
+            server = make_server(host, port, app, threaded=True)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+        else:
+            serve(app, host=host, port=port, threads=threads)
+    finally:
+        ignore_stop_signals()
+        print("🛑 Stopping: waiting for queued renders to finish...")
+        try:
+            job_queue.shutdown(wait=True)
+        finally:
+            render_pool.shutdown(wait=True)
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='FIFA Card Creator web server')
+    parser.add_argument('--production', action='store_true',
+                        help='serve with a production WSGI server and render on a bounded pool of worker processes')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=RENDER_WORKERS, help='render worker processes (default: all cores)')
+    parser.add_argument('--queue-size', type=int, default=RENDER_QUEUE_SIZE,
+                        help='renders waiting for a worker before requests get 503 (default: 4 per worker)')
+    parser.add_argument('--deadline', type=float, default=RENDER_DEADLINE,
+                        help='seconds a request waits for its card before getting 504')
+    parser.add_argument('--threads', type=int, default=SERVER_THREADS, help='HTTP request threads')
+    args = parser.parse_args()
+
     # Create output directory if it doesn't exist
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
+
+    # remove partial files left behind by a previous run that crashed
+    cleanup_partial_files(OUTPUT_DIR)
+    cleanup_partial_files(os.path.dirname(DATABASE_FILE) or '.')
+
+    if WARM_UP_CARD_TEMPLATES:
+        print(f"🃏 Preloaded {warm_up_card_templates()} card templates")
     
     print("=" * 60)
     print("🎮 FIFA Card Creator Web Server")
     print("=" * 60)
-    print(f"🌐 Server running at: http://localhost:5000")
+    print(f"🌐 Server running at: http://localhost:{args.port}")
     print(f"📁 Output directory: {os.path.abspath(OUTPUT_DIR)}")
     print(f"📂 Web directory: {os.path.abspath(WEB_DIR)}")
     print("=" * 60)
-    print("\n✅ Server is ready! Open http://localhost:5000 in your browser")
+    if args.production:
+        RENDER_DEADLINE = args.deadline
+        render_pool = BoundedRenderPool(args.workers, args.queue_size)
+        print(f"⚙️  Production mode: {render_pool.max_workers} render workers, "
+              f"{render_pool.queue_size} queued renders, {RENDER_DEADLINE:g}s deadline")
+    print("=" * 60)
+    print(f"\n✅ Server is ready! Open http://localhost:{args.port} in your browser")
     print("⚠️  Press CTRL+C to stop the server\n")
     
     # Run the server
-    app.run(
-        host='0.0.0.0',
-        port=5000,
-        debug=True
-    )
+    if args.production:
+        serve_production(args.host, args.port, args.threads)
+    else:
+        app.run(
+            host=args.host,
+            port=args.port,
+            debug=True
+        )